@@ -6,34 +6,46 @@ from flask_login import LoginManager
 from flask_cors import CORS
 from flask_migrate import Migrate
 from dotenv import load_dotenv
+from .database import RoutingSession, apply_sqlite_pragmas, configure_database, init_replica
+from services.geocoding import Geocoding
+from services.metrics import PrometheusMetrics
+from services.profiler import RequestProfiler
+from services.query_counter import QueryCounter
+from services.station_events import StationEvents
+from services.structured_logging import StructuredLogging
 
 # Load environment variables
 load_dotenv()
 
 # Initialize extensions
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 migrate = Migrate()
+metrics = PrometheusMetrics()
+profiler = RequestProfiler()
+query_counter = QueryCounter()
+station_events = StationEvents()
+geocoding = Geocoding()
+structured_logging = StructuredLogging()
 
 def create_app(config_name='development'):
     """Application factory pattern"""
-    # Serve React build as static in production
-    react_build_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../frontend/build'))
-    if not os.path.exists(react_build_dir):
-        # If the build directory does not exist, use a fallback static folder
-        app = Flask(__name__)
-    else:
-        app = Flask(__name__, static_folder=react_build_dir, static_url_path='/')
+    # React build is served from an in-memory manifest (see serve_react below)
+    app = Flask(__name__, static_folder=None)
+    from .json_provider import FastJSONProvider
+    app.json = FastJSONProvider(app)
     
     # Configuration
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key')
-    # Force SQLite for tests
+    # Force SQLite for tests (TEST_DATABASE_URL selects a per-worker file or Postgres database)
     if 'test' in config_name.lower():
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('TEST_DATABASE_URL', 'sqlite:///:memory:')
     else:
         app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///evxchange.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Pool sizing, statement timeout, optional read replica (see database.py)
+    configure_database(app, config_name)
     
     # OAuth Configuration
     app.config['GOOGLE_CLIENT_ID'] = os.getenv('GOOGLE_CLIENT_ID')
@@ -42,12 +54,99 @@ def create_app(config_name='development'):
     app.config['FACEBOOK_APP_SECRET'] = os.getenv('FACEBOOK_APP_SECRET')
     app.config['LINKEDIN_CLIENT_ID'] = os.getenv('LINKEDIN_CLIENT_ID')
     app.config['LINKEDIN_CLIENT_SECRET'] = os.getenv('LINKEDIN_CLIENT_SECRET')
+
+    # Stripe Configuration
+    app.config['STRIPE_SECRET_KEY'] = os.getenv('STRIPE_SECRET_KEY', 'sk_test_dummy')
+    # Optional override, e.g. a local stripe-mock at http://localhost:12111
+    app.config['STRIPE_API_BASE'] = os.getenv('STRIPE_API_BASE')
+    app.config['STRIPE_CHECKOUT_CACHE_TTL'] = int(os.getenv('STRIPE_CHECKOUT_CACHE_TTL', '300'))
+
+    # Prometheus metrics at /metrics
+    app.config['METRICS_ENABLED'] = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+
+    # Opt-in sampling profiler for slow requests (see services/profiler.py)
+    app.config['PROFILER_ENABLED'] = os.getenv('PROFILER_ENABLED', 'false').lower() == 'true'
+    app.config['PROFILER_SLOW_MS'] = int(os.getenv('PROFILER_SLOW_MS', '1000'))
+    app.config['PROFILER_INTERVAL_MS'] = int(os.getenv('PROFILER_INTERVAL_MS', '10'))
+    if os.getenv('PROFILER_DIR'):
+        app.config['PROFILER_DIR'] = os.getenv('PROFILER_DIR')
+    app.config['PROFILER_ADMIN_TOKEN'] = os.getenv('PROFILER_ADMIN_TOKEN')
+
+    # Warn when one statement repeats this often in a request (likely N+1)
+    app.config['QUERY_REPEAT_THRESHOLD'] = int(os.getenv('QUERY_REPEAT_THRESHOLD', '5'))
+    app.config['QUERY_COUNTER_HEADERS'] = os.getenv('QUERY_COUNTER_HEADERS', 'false').lower() == 'true'
+
+    # Queue-based JSON logging (see services/structured_logging.py); tests keep pytest's handlers
+    default_structured = 'false' if 'test' in config_name.lower() else 'true'
+    app.config['STRUCTURED_LOGGING'] = os.getenv('STRUCTURED_LOGGING', default_structured).lower() == 'true'
+    app.config['LOG_LEVEL'] = os.getenv('LOG_LEVEL', 'INFO').upper()
+    app.config['LOG_FORMAT'] = os.getenv('LOG_FORMAT', 'json')
+    app.config['LOG_SAMPLE_RATE'] = float(os.getenv('LOG_SAMPLE_RATE', '1.0'))
+
+    # POST /api/batch limits (see services/batch.py)
+    app.config['BATCH_MAX_REQUESTS'] = int(os.getenv('BATCH_MAX_REQUESTS', '20'))
+    app.config['BATCH_MAX_WORKERS'] = int(os.getenv('BATCH_MAX_WORKERS', '4'))
+
+    # Offline station snapshot written by jobs/station_snapshot.py, served at /api/stations/snapshot
+    app.config['STATION_SNAPSHOT_DIR'] = os.getenv('STATION_SNAPSHOT_DIR', os.path.abspath(
+        os.path.join(os.path.dirname(__file__), '../snapshots')))
+    app.config['STATION_SNAPSHOT_MAX_AGE'] = int(os.getenv('STATION_SNAPSHOT_MAX_AGE', '300'))
+
+    # Dynamic pricing (see services/pricing.py); bands are (start_hour, end_hour, multiplier)
+    app.config['PRICING_DEFAULT_BASE_PRICE'] = float(os.getenv('PRICING_DEFAULT_BASE_PRICE', '0.30'))
+    app.config['PRICING_OCCUPANCY_WEIGHT'] = float(os.getenv('PRICING_OCCUPANCY_WEIGHT', '0.5'))
+    app.config['PRICING_WINDOW_HOURS'] = float(os.getenv('PRICING_WINDOW_HOURS', '4'))
+    app.config['PRICING_BUCKET_MINUTES'] = int(os.getenv('PRICING_BUCKET_MINUTES', '15'))
+
+    # Occupancy forecasts written by jobs/demand_forecast.py, read by availability and pricing
+    # (tests opt in explicitly so a locally trained table cannot change their results)
+    default_forecast = None if 'test' in config_name.lower() else os.path.abspath(
+        os.path.join(os.path.dirname(__file__), '../forecasts/occupancy.npz'))
+    app.config['DEMAND_FORECAST_PATH'] = os.getenv('DEMAND_FORECAST_PATH', default_forecast)
+
+    # Address geocoding for station creation (see services/geocoding.py)
+    app.config['GEOCODER'] = os.getenv('GEOCODER')
+    app.config['GOOGLE_MAPS_API_KEY'] = os.getenv('GOOGLE_MAPS_API_KEY')
+    app.config['GEOCODE_CACHE_SIZE'] = int(os.getenv('GEOCODE_CACHE_SIZE', '10000'))
+    app.config['GEOCODE_CACHE_TTL'] = int(os.getenv('GEOCODE_CACHE_TTL', str(30 * 86400)))
+    app.config['GEOCODE_BATCH_SIZE'] = int(os.getenv('GEOCODE_BATCH_SIZE', '100'))
+    app.config['GEOCODE_MAX_ADDRESSES'] = int(os.getenv('GEOCODE_MAX_ADDRESSES', '500'))
+
+    # Bulk station import, /api/host/stations/import (see services/station_import.py)
+    app.config['IMPORT_BATCH_SIZE'] = int(os.getenv('IMPORT_BATCH_SIZE', '500'))
+    app.config['IMPORT_DUPLICATE_METERS'] = float(os.getenv('IMPORT_DUPLICATE_METERS', '25'))
+    app.config['IMPORT_MAX_ROWS'] = int(os.getenv('IMPORT_MAX_ROWS', '100000'))
+    app.config['IMPORT_MAX_ERRORS'] = int(os.getenv('IMPORT_MAX_ERRORS', '100'))
+
+    # Ranked nearby search, /api/nearby_stations?rank=best (see services/ranking.py)
+    app.config['RANKING_RADIUS_KM'] = float(os.getenv('RANKING_RADIUS_KM', '10'))
+    app.config['RANKING_MAX_RADIUS_KM'] = float(os.getenv('RANKING_MAX_RADIUS_KM', '100'))
+    app.config['RANKING_MAX_K'] = int(os.getenv('RANKING_MAX_K', '50'))
+
+    # Charging-session telemetry (see services/telemetry.py); ingestion is disabled without a token
+    app.config['TELEMETRY_DIR'] = os.getenv('TELEMETRY_DIR')
+    app.config['TELEMETRY_INGEST_TOKEN'] = os.getenv('TELEMETRY_INGEST_TOKEN')
+    app.config['TELEMETRY_MAX_BATCH'] = int(os.getenv('TELEMETRY_MAX_BATCH', '5000'))
+
+    # Live station updates over SSE (see services/station_events.py). Each open stream holds a
+    # gunicorn thread for up to SSE_MAX_STREAM_SECONDS; size GUNICORN_THREADS (gunicorn.conf.py) for it
+    app.config['EVENT_BROKER'] = os.getenv('EVENT_BROKER')
+    app.config['SSE_HEARTBEAT_SECONDS'] = float(os.getenv('SSE_HEARTBEAT_SECONDS', '15'))
+    app.config['SSE_MAX_STREAM_SECONDS'] = float(os.getenv('SSE_MAX_STREAM_SECONDS', '300'))
     
     # Initialize extensions with app
 
+    structured_logging.init_app(app)
     db.init_app(app)
+    init_replica(app)
+    apply_sqlite_pragmas(app, db)
     login_manager.init_app(app)
     migrate.init_app(app, db)
+    metrics.init_app(app)
+    profiler.init_app(app)
+    query_counter.init_app(app)
+    station_events.init_app(app)
+    geocoding.init_app(app)
     CORS(app)
     
     # Configure Flask-Login
@@ -76,23 +175,27 @@ def create_app(config_name='development'):
     app.register_blueprint(api_bp, url_prefix='/api')
 
 
-    # Serve React index.html for all non-API routes
-    from flask import send_from_directory
+    # Serve the React build for all non-API routes from a startup-time manifest
+    from flask import request
+    from .static_assets import StaticAssetManifest, asset_response
+
+    react_build_dir = os.getenv('REACT_BUILD_DIR') or os.path.abspath(
+        os.path.join(os.path.dirname(__file__), '../../frontend/build'))
+    if os.path.isdir(react_build_dir):
+        app.extensions['static_assets'] = StaticAssetManifest(react_build_dir)
 
     @app.route('/', defaults={'path': ''})
     @app.route('/<path:path>')
     def serve_react(path):
         if path.startswith('api') or path.startswith('auth'):
             return "Not Found", 404
+        manifest = app.extensions.get('static_assets')
         # If the React build does not exist, show a clear error
-        if not os.path.exists(app.static_folder or ""):
+        if manifest is None:
             return ("React frontend build not found. Please run 'npm run build' in the frontend directory and redeploy.", 501)
-        if path != "":
-            abs_static_folder = os.path.abspath(app.static_folder)
-            normalized_path = os.path.normpath(os.path.join(abs_static_folder, path))
-            if normalized_path.startswith(abs_static_folder) and os.path.exists(normalized_path):
-                rel_path = os.path.relpath(normalized_path, abs_static_folder)
-                return send_from_directory(abs_static_folder, rel_path)
-        return send_from_directory(app.static_folder, 'index.html')
+        asset = manifest.get(path) or manifest.get('index.html')
+        if asset is None:
+            return "Not Found", 404
+        return asset_response(asset, request)
 
     return app
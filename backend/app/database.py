@@ -0,0 +1,169 @@
+"""Database engine configuration, read-replica routing and SQLite tuning.
+
+- ``engine_options()`` returns pool settings per environment and backend.
+- ``RoutingSession`` sends reads from views decorated with
+  ``@read_replica`` to the replica engine (``DATABASE_REPLICA_URL``), while
+  writes -- and every read after a write in the same session -- stay on the
+  primary.
+- ``apply_sqlite_pragmas`` installs a WAL/mmap performance profile on every
+  new SQLite connection.
+- A connection stored in ``app.extensions['db_connection']`` is used by every
+  session of that app; tests use it to roll back each test's writes.
+- ``separate_transaction`` commits side writes (e.g. caches) on their own,
+  without committing or depending on the request's session.
+"""
+import functools
+import os
+from contextlib import contextmanager
+
+from flask import current_app, g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+
+REPLICA_EXTENSION = 'db_replica'
+# A Connection every session of the app should use, e.g. a test's outer transaction
+BOUND_CONNECTION_EXTENSION = 'db_connection'
+
+SQLITE_PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('temp_store', 'MEMORY'),
+    ('mmap_size', 268435456),   # 256 MiB
+    ('cache_size', -65536),     # 64 MiB
+    ('busy_timeout', 5000),
+)
+
+POOL_PROFILES = {
+    'production': {'pool_size': 10, 'max_overflow': 20, 'pool_timeout': 10, 'pool_recycle': 1800},
+    'development': {'pool_size': 5, 'max_overflow': 5, 'pool_timeout': 30, 'pool_recycle': 3600},
+    'testing': {'pool_size': 2, 'max_overflow': 2, 'pool_timeout': 5, 'pool_recycle': -1},
+}
+
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def engine_options(url, config_name='development'):
+    """Engine options for a database URL in the given environment"""
+    backend = make_url(url).get_backend_name()
+    options = {'pool_pre_ping': backend != 'sqlite'}
+    if backend == 'sqlite':
+        # SQLite uses SingletonThreadPool/QueuePool defaults; pool sizing does not apply
+        return options
+
+    profile = POOL_PROFILES.get(config_name, POOL_PROFILES['production'])
+    options.update({
+        'pool_size': _env_int('DB_POOL_SIZE', profile['pool_size']),
+        'max_overflow': _env_int('DB_MAX_OVERFLOW', profile['max_overflow']),
+        'pool_timeout': _env_int('DB_POOL_TIMEOUT', profile['pool_timeout']),
+        'pool_recycle': _env_int('DB_POOL_RECYCLE', profile['pool_recycle']),
+    })
+    statement_timeout = _env_int('DB_STATEMENT_TIMEOUT_MS', 5000)
+    if backend == 'postgresql' and statement_timeout:
+        options['connect_args'] = {'options': f'-c statement_timeout={statement_timeout}'}
+    return options
+
+
+def configure_database(app, config_name='development'):
+    """Fill in SQLAlchemy engine options and the optional replica URL"""
+    env = 'testing' if 'test' in config_name.lower() else config_name
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'], env)
+    replica_url = os.getenv('DATABASE_REPLICA_URL')
+    if replica_url and replica_url.startswith('postgres://'):
+        replica_url = replica_url.replace('postgres://', 'postgresql://', 1)
+    app.config['DATABASE_REPLICA_URL'] = replica_url
+    app.config['DATABASE_REPLICA_OPTIONS'] = engine_options(replica_url, env) if replica_url else {}
+    app.config.setdefault('SQLITE_PRAGMAS', os.getenv('SQLITE_PRAGMAS', 'true').lower() == 'true')
+
+
+def init_replica(app):
+    """Create the replica engine, if configured, alongside Flask-SQLAlchemy's engines.
+
+    The replica is kept out of ``SQLALCHEMY_BINDS`` on purpose: it mirrors
+    the primary's tables rather than owning a separate metadata.
+    """
+    replica_url = app.config.get('DATABASE_REPLICA_URL')
+    if replica_url:
+        app.extensions[REPLICA_EXTENSION] = create_engine(
+            replica_url, **app.config.get('DATABASE_REPLICA_OPTIONS', {}))
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS:
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+
+def apply_sqlite_pragmas(app, db):
+    """Install the SQLite performance profile on the app's SQLite engines"""
+    if not app.config.get('SQLITE_PRAGMAS'):
+        return
+    with app.app_context():
+        engines = list(db.engines.values())
+    if REPLICA_EXTENSION in app.extensions:
+        engines.append(app.extensions[REPLICA_EXTENSION])
+    for engine in engines:
+        if engine.dialect.name == 'sqlite' and not event.contains(engine, 'connect', _set_sqlite_pragmas):
+            event.listen(engine, 'connect', _set_sqlite_pragmas)
+
+
+@contextmanager
+def separate_transaction(engine):
+    """A connection in its own transaction, committed on exit independently of ``db.session``.
+
+    With a bound connection (tests) a SAVEPOINT on it stands in, so the
+    writes are still rolled back with the test.
+    """
+    connection = current_app.extensions.get(BOUND_CONNECTION_EXTENSION) if has_app_context() else None
+    if connection is not None:
+        with connection.begin_nested():
+            yield connection
+        return
+    with engine.begin() as connection:
+        yield connection
+
+
+def read_replica(view):
+    """Mark a read-only view so its queries may be served by the replica"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        g._use_read_replica = True
+        try:
+            return view(*args, **kwargs)
+        finally:
+            g._use_read_replica = False
+    return wrapper
+
+
+class RoutingSession(Session):
+    """Session that routes reads of ``@read_replica`` views to the replica bind"""
+
+    def __init__(self, db, **kwargs):
+        super().__init__(db, **kwargs)
+        self._wrote = False
+        event.listen(self, 'after_flush', self._mark_written)
+
+    def _mark_written(self, session, flush_context):
+        self._wrote = True
+
+    def _use_replica(self, clause):
+        if self._wrote or self._flushing or not has_app_context() or not g.get('_use_read_replica'):
+            return False
+        return clause is None or getattr(clause, 'is_select', False)
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._use_replica(clause):
+            replica = current_app.extensions.get(REPLICA_EXTENSION)
+            if replica is not None:
+                return replica
+        if bind is None and has_app_context():
+            connection = current_app.extensions.get(BOUND_CONNECTION_EXTENSION)
+            if connection is not None:
+                return connection
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
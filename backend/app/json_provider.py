@@ -0,0 +1,112 @@
+"""JSON provider with an orjson fast path.
+
+When ``orjson`` is installed, responses and request bodies are encoded and
+decoded with it; otherwise the provider behaves exactly like Flask's
+``DefaultJSONProvider`` (same bytes for the same payload). In both modes
+datetimes keep Flask's HTTP-date format, so switching providers does not
+change the API's wire format, and NumPy scalars/arrays are serialized as
+plain JSON numbers and lists.
+"""
+import dataclasses
+import datetime
+import decimal
+import uuid
+
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+
+_DAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+_MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+
+def _encode_datetime(o):
+    """Format like werkzeug's ``http_date`` without the email.utils detour"""
+    if o.tzinfo is not None:
+        o = o.astimezone(datetime.timezone.utc)
+    return (f"{_DAYS[o.weekday()]}, {o.day:02d} {_MONTHS[o.month - 1]} {o.year:04d} "
+            f"{o.hour:02d}:{o.minute:02d}:{o.second:02d} GMT")
+
+
+def _encode_numpy(o):
+    if isinstance(o, np.ndarray):
+        return o.tolist()
+    return o.item()
+
+
+_TYPE_ENCODERS = {
+    datetime.datetime: _encode_datetime,
+    datetime.date: http_date,
+    decimal.Decimal: str,
+    uuid.UUID: str,
+}
+
+
+def default(o):
+    """Serialize types the JSON encoder does not know about.
+
+    Exact-type lookups handle the common cases (datetimes in booking
+    dicts) before falling back to the slower ``isinstance`` chain.
+    """
+    encoder = _TYPE_ENCODERS.get(type(o))
+    if encoder is not None:
+        return encoder(o)
+    if isinstance(o, datetime.datetime):
+        return _encode_datetime(o)
+    if isinstance(o, datetime.date):
+        return http_date(o)
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if np is not None and isinstance(o, (np.generic, np.ndarray)):
+        return _encode_numpy(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Drop-in replacement for Flask's default provider backed by orjson"""
+
+    default = staticmethod(default)
+
+    #: orjson options: Flask sorts keys; bookings use int keys in places;
+    #: datetimes are passed through so they keep the HTTP-date format.
+    orjson_options = 0
+    if orjson is not None:
+        orjson_options = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+                          | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_SERIALIZE_NUMPY)
+
+    @property
+    def accelerated(self):
+        return orjson is not None
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self.orjson_options).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        pretty = (self.compact is None and self._app.debug) or self.compact is False
+        if orjson is None or pretty:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default,
+                            option=self.orjson_options | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
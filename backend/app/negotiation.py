@@ -0,0 +1,62 @@
+"""Sparse fieldsets and MessagePack responses for list endpoints.
+
+``?fields=id,lat,lng`` trims every item in a response's collections to
+those keys. ``?fields[bookings]=booking_id,start_time`` targets one
+collection and wins over the plain form, e.g. on ``/api/dashboard``, which
+returns several lists. Unknown field names are ignored.
+
+Clients sending ``Accept: application/msgpack`` get the same payload
+encoded as MessagePack. Datetimes are encoded as the same HTTP-date
+strings the JSON provider produces, so both encodings decode to the same
+values. Without ``msgpack`` installed, responses stay JSON.
+"""
+from flask import current_app, request
+
+from .json_provider import default
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPE = 'application/msgpack'
+
+
+def requested_fields(collection):
+    """Field names requested for ``collection``, or None for all fields"""
+    raw = request.args.get(f'fields[{collection}]', request.args.get('fields'))
+    if raw is None:
+        return None
+    return [name for name in (part.strip() for part in raw.split(',')) if name]
+
+
+def select_fields(items, fields):
+    """Project each dict in ``items`` onto ``fields`` (in the requested order)"""
+    if fields is None:
+        return items
+    return [{name: item[name] for name in fields if name in item} for item in items]
+
+
+def wants_msgpack():
+    if msgpack is None:
+        return False
+    best = request.accept_mimetypes.best_match([JSON_MIMETYPE, MSGPACK_MIMETYPE])
+    return best == MSGPACK_MIMETYPE
+
+
+def api_response(payload, *collections, status=200):
+    """Respond with ``payload`` after applying ``?fields=`` to ``collections``, as JSON or MessagePack"""
+    selected = {collection: requested_fields(collection) for collection in collections}
+    if any(fields is not None for fields in selected.values()):
+        payload = dict(payload)
+        for collection, fields in selected.items():
+            payload[collection] = select_fields(payload[collection], fields)
+    if wants_msgpack():
+        response = current_app.response_class(msgpack.packb(payload, default=default),
+                                              mimetype=MSGPACK_MIMETYPE, status=status)
+    else:
+        response = current_app.json.response(payload)
+        response.status_code = status
+    response.vary.add('Accept')
+    return response
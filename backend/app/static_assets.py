@@ -0,0 +1,123 @@
+"""In-memory manifest for serving the React production build.
+
+The ``frontend/build`` tree is read once at startup. Every file is kept in
+memory together with its ETag, MIME type, cache policy and precomputed
+brotli and gzip variants, so requests are answered without touching the
+filesystem. ``Brotli`` is in the requirements; an environment without it
+still serves gzip (and any ``.br`` files the frontend build wrote).
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - listed in requirements.txt
+    brotli = None
+
+# CRA emits content-hashed names such as main.3f2a9c1b.js / 453.8e1b2f3c.chunk.css
+HASHED_ASSET_RE = re.compile(r'\.[0-9a-f]{8,}\.')
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json',
+                      'image/svg+xml', 'application/xml', 'application/manifest+json')
+MIN_COMPRESS_SIZE = 1024
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+
+class StaticAsset:
+    """A single build file and its precomputed encodings"""
+
+    __slots__ = ('path', 'body', 'mimetype', 'etag', 'cache_control', 'encodings')
+
+    def __init__(self, path, body, mimetype, etag, cache_control, encodings):
+        self.path = path
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = etag
+        self.cache_control = cache_control
+        self.encodings = encodings
+
+    def select(self, accept_encoding):
+        """Pick the best available encoding for an Accept-Encoding header"""
+        accepted = {token.split(';')[0].strip() for token in (accept_encoding or '').split(',')}
+        for encoding in ('br', 'gzip'):
+            if encoding in self.encodings and encoding in accepted:
+                return encoding, self.encodings[encoding]
+        return None, self.body
+
+
+class StaticAssetManifest:
+    """Startup-time index of the React build, keyed by relative URL path"""
+
+    def __init__(self, root, compress_level=9):
+        self.root = os.path.abspath(root)
+        self.compress_level = compress_level
+        self.assets = {}
+        self._scan()
+
+    def __contains__(self, path):
+        return path in self.assets
+
+    def __len__(self):
+        return len(self.assets)
+
+    def get(self, path):
+        return self.assets.get(path)
+
+    def _scan(self):
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith(('.gz', '.br')):
+                    continue
+                full_path = os.path.join(dirpath, filename)
+                rel_path = os.path.relpath(full_path, self.root).replace(os.sep, '/')
+                self.assets[rel_path] = self._load(rel_path, full_path)
+
+    def _load(self, rel_path, full_path):
+        with open(full_path, 'rb') as f:
+            body = f.read()
+        mimetype = mimetypes.guess_type(rel_path)[0] or 'application/octet-stream'
+        etag = hashlib.sha1(body).hexdigest()[:20]
+        if HASHED_ASSET_RE.search(os.path.basename(rel_path)):
+            cache_control = IMMUTABLE_CACHE_CONTROL
+        else:
+            cache_control = REVALIDATE_CACHE_CONTROL
+        return StaticAsset(rel_path, body, mimetype, etag, cache_control,
+                           self._encode(full_path, body, mimetype))
+
+    def _encode(self, full_path, body, mimetype):
+        encodings = {}
+        if len(body) < MIN_COMPRESS_SIZE or not mimetype.startswith(COMPRESSIBLE_TYPES):
+            return encodings
+        # Prefer variants produced by the frontend build, if any
+        for encoding, suffix in (('gzip', '.gz'), ('br', '.br')):
+            if os.path.exists(full_path + suffix):
+                with open(full_path + suffix, 'rb') as f:
+                    encodings[encoding] = f.read()
+        if 'gzip' not in encodings:
+            encodings['gzip'] = gzip.compress(body, compresslevel=self.compress_level, mtime=0)
+        if 'br' not in encodings and brotli is not None:
+            encodings['br'] = brotli.compress(body)
+        # Drop variants that do not actually save bytes
+        return {k: v for k, v in encodings.items() if len(v) < len(body)}
+
+
+def asset_response(asset, request):
+    """Build a response for an asset, honouring conditional and encoding headers"""
+    encoding, body = asset.select(request.headers.get('Accept-Encoding'))
+    etag = f'{asset.etag}-{encoding}' if encoding else asset.etag
+    headers = {
+        'Cache-Control': asset.cache_control,
+        'ETag': f'"{etag}"',
+        'Vary': 'Accept-Encoding',
+    }
+    if etag in request.if_none_match:
+        return Response(status=304, headers=headers)
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    return Response(body, mimetype=asset.mimetype, headers=headers)
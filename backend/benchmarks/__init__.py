@@ -0,0 +1,2 @@
+# evxchange Benchmarks Module
+# Contains performance benchmarks that are run on demand, not in CI
@@ -0,0 +1,143 @@
+"""Scaling curves for the booking, availability, review, dashboard, pricing and ranking hot paths.
+
+Each path is timed in isolation on synthetic in-memory stores of 10^3 up to
+10^6 records. Besides the per-size timings, a log-log fit gives the scaling
+exponent: ~1.0 for a linear scan, ~0 for an indexed lookup. A change in the
+exponent flags an algorithmic regression even when absolute timings are noisy.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_hotpaths --max-records 1000000 --out curves.json
+    pytest -m benchmark
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from routes.api import available_slots, build_dashboard, find_booking_conflict, reviews_for_station
+from services.pricing import PricingEngine, StationArrays
+from services.ranking import StationCatalogue, StationRanker
+
+SIZES = (10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6)
+N_STATIONS = 1000
+N_USERS = 5000
+EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def make_bookings(n, n_stations=N_STATIONS, n_users=N_USERS):
+    """``n`` non-overlapping one-hour bookings spread over stations and users"""
+    return [
+        {
+            "booking_id": i + 1,
+            "station_id": i % n_stations + 1,
+            "user_id": i % n_users + 1,
+            "start_time": EPOCH + timedelta(hours=i // n_stations),
+            "end_time": EPOCH + timedelta(hours=i // n_stations + 1),
+            "status": "confirmed",
+        }
+        for i in range(n)
+    ]
+
+
+def make_reviews(n, n_stations=N_STATIONS, n_users=N_USERS):
+    return [
+        {"review_id": i + 1, "booking_id": i + 1, "station_id": i % n_stations + 1,
+         "user_id": i % n_users + 1, "rating": i % 5 + 1, "review": "Fast charger, easy access"}
+        for i in range(n)
+    ]
+
+
+def make_pricing_inputs(n):
+    """``n`` stations (one per host) and ``n`` bookings as pricing engine arrays"""
+    rng = np.random.default_rng(0)
+    ids = np.arange(1, n + 1)
+    stations = StationArrays(ids, ids, rng.uniform(25, 49, n), rng.uniform(-124, -67, n), rng.uniform(0.2, 0.5, n))
+    start = EPOCH.timestamp() + rng.integers(0, 24, n) * 3600.0
+    rules = {int(h): {'multiplier': 0.9, 'max_price': 0.6} for h in ids[::100]}
+    return stations, (rng.integers(1, n + 1, n), start, start + 3600.0), rules
+
+
+def make_ranking_inputs(n):
+    """``n`` stations spread over the continental US, and a flat price quote for each"""
+    rng = np.random.default_rng(1)
+    ids = np.arange(1, n + 1)
+    lat, lng, available = rng.uniform(25, 49, n), rng.uniform(-124, -67, n), rng.random(n) < 0.8
+    reviews = (rng.integers(1, n + 1, n), rng.integers(1, 6, n))
+    quotes = (ids, rng.uniform(0.2, 0.5, n), rng.random(n))
+    catalogue = StationCatalogue(ids, lat, lng, available, reviews, connectors=1 << rng.integers(0, 7, n),
+                                 max_kw=rng.choice([7.2, 11.0, 50.0, 150.0, 350.0], n))
+    return catalogue, quotes
+
+
+def _cases(bookings, reviews):
+    """Worst-case call for each hot path: nothing matches early, so stores are scanned in full"""
+    free = EPOCH + timedelta(days=3650)
+    engine = PricingEngine()
+    stations, booking_arrays, rules = make_pricing_inputs(len(bookings))
+    ranker = StationRanker()
+    catalogue, quotes = make_ranking_inputs(len(bookings))
+    return {
+        'booking_overlap': lambda: find_booking_conflict(bookings, 1, free, free + timedelta(hours=1)),
+        'availability_slots': lambda: available_slots(bookings, 1, free),
+        'station_reviews': lambda: reviews_for_station(reviews, 1),
+        'dashboard': lambda: build_dashboard(1, bookings, reviews),
+        'pricing': lambda: engine.price(stations, booking_arrays, rules, int(EPOCH.timestamp())),
+        # The catalogue and its grid index are cached; a query only touches cells near the point
+        'ranking': lambda: ranker.rank(catalogue, 37.7749, -122.4194, 25.0, 10, quotes),
+        # Connector and power filters are bitwise/scalar masks over the same grid candidates
+        'ranking_filtered': lambda: ranker.rank(catalogue, 37.7749, -122.4194, 25.0, 10, quotes,
+                                                connectors=0b100100, min_kw=50.0),
+    }
+
+
+def time_call(fn, min_time=0.05):
+    """Best per-call seconds, with the loop count grown until a run takes ``min_time``"""
+    number = 1
+    while timeit.timeit(fn, number=number) < min_time:
+        number *= 2
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number
+
+
+def scaling_exponent(sizes, seconds):
+    """Slope of log(time) against log(n)"""
+    slope, _ = np.polyfit(np.log10(sizes), np.log10(seconds), 1)
+    return float(slope)
+
+
+def run(sizes=SIZES, min_time=0.05):
+    """{path: {'sizes': [...], 'seconds': [...], 'exponent': float}}"""
+    curves = {}
+    for n in sizes:
+        bookings, reviews = make_bookings(n), make_reviews(n)
+        for name, fn in _cases(bookings, reviews).items():
+            curve = curves.setdefault(name, {'sizes': [], 'seconds': []})
+            curve['sizes'].append(n)
+            curve['seconds'].append(time_call(fn, min_time))
+    for curve in curves.values():
+        curve['exponent'] = round(scaling_exponent(curve['sizes'], curve['seconds']), 3)
+    return curves
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--max-records', type=int, default=10 ** 6)
+    parser.add_argument('--min-time', type=float, default=0.1)
+    parser.add_argument('--out', help='Write the curves as JSON')
+    args = parser.parse_args(argv)
+
+    sizes = [n for n in SIZES if n <= args.max_records]
+    curves = run(sizes, args.min_time)
+    print(f"{'path':<20}" + ''.join(f'{n:>12,}' for n in sizes) + f"{'exponent':>10}")
+    for name, curve in curves.items():
+        timings = ''.join(f'{s * 1e3:>10.3f}ms' for s in curve['seconds'])
+        print(f'{name:<20}{timings}{curve["exponent"]:>10.2f}')
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(curves, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
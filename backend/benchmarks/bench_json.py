@@ -0,0 +1,88 @@
+"""Compare Flask's default JSON provider with FastJSONProvider.
+
+Payloads mirror what ``/api/dashboard`` (bookings with raw datetimes,
+payments, reviews) and ``/api/stations/<id>/availability`` return.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.bench_json --bookings 1000 --repeat 200
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime, timedelta, timezone
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from backend.app.json_provider import FastJSONProvider
+
+
+def dashboard_payload(n_bookings):
+    start = datetime(2025, 8, 10, 8, tzinfo=timezone.utc)
+    bookings = [
+        {
+            "booking_id": i,
+            "station_id": i % 50,
+            "user_id": 1,
+            "start_time": start + timedelta(hours=i),
+            "end_time": start + timedelta(hours=i + 1),
+            "status": "confirmed",
+        }
+        for i in range(1, n_bookings + 1)
+    ]
+    payments = [
+        {"payment_id": b["booking_id"], "booking_id": b["booking_id"],
+         "amount": 1000, "currency": "usd", "status": "paid"}
+        for b in bookings
+    ]
+    reviews = [
+        {"review_id": i, "booking_id": i, "station_id": 1, "user_id": 1,
+         "rating": 5, "review": "Great experience!"}
+        for i in range(1, n_bookings // 2 + 1)
+    ]
+    return {"bookings": bookings, "payments": payments, "reviews": reviews}
+
+
+def availability_payload():
+    day = datetime(2025, 8, 10, tzinfo=timezone.utc)
+    return {"available_slots": [
+        {"start": day.replace(hour=h).isoformat(), "end": day.replace(hour=h + 1).isoformat()}
+        for h in range(8, 20)
+    ]}
+
+
+def bench(provider, payload, repeat):
+    with provider._app.app_context():
+        seconds = min(timeit.repeat(lambda: provider.response(payload), number=repeat, repeat=5))
+    return seconds / repeat * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--bookings', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args(argv)
+
+    app = Flask(__name__)
+    default_provider = DefaultJSONProvider(app)
+    fast_provider = FastJSONProvider(app)
+
+    payloads = {
+        f"dashboard ({args.bookings} bookings)": dashboard_payload(args.bookings),
+        "availability (12 slots)": availability_payload(),
+    }
+    print(f"orjson accelerated: {fast_provider.accelerated}")
+    print(f"{'payload':<32}{'default us':>12}{'fast us':>12}{'speedup':>10}")
+    for name, payload in payloads.items():
+        with app.app_context():
+            same = (json.loads(default_provider.response(payload).data)
+                    == json.loads(fast_provider.response(payload).data))
+        default_us = bench(default_provider, payload, args.repeat)
+        fast_us = bench(fast_provider, payload, args.repeat)
+        flag = '' if same else '  (OUTPUT DIFFERS)'
+        print(f"{name:<32}{default_us:>12.1f}{fast_us:>12.1f}{default_us / fast_us:>9.1f}x{flag}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,431 @@
+"""Synthetic load driver for the EVXchange API.
+
+Starts ``gunicorn wsgi:app`` locally (SQLite by default, or any
+``--database-url`` such as a local Postgres), seeds a few users, then
+replays a weighted traffic mix from concurrent clients:
+
+- map browsing (``/api/nearby_stations``, viewport price quotes) around a handful of metros,
+- availability polling, batched station-detail loads, bookings with a
+  configurable conflict rate,
+- review reads and writes, host station management (bulk import, geocoding) and station delta sync,
+  dashboard/profile loads, charger telemetry batches and session usage charts,
+- the remaining routes (auth, geolocation, Stripe webhook/checkout) at a low rate.
+
+Throughput and p50/p95/p99 latency are reported per route and written as
+JSON so runs can be diffed with ``--compare``.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.load_test --duration 30 --concurrency 16 \
+        --out benchmarks/results/$(git rev-parse --short HEAD).json
+    python -m benchmarks.load_test --compare old.json new.json
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+import requests
+from flask import Flask
+
+METROS = [(37.7749, -122.4194), (34.0522, -118.2437), (40.7128, -74.0060),
+          (47.6062, -122.3321), (30.2672, -97.7431)]
+SECRET_KEY = 'load-test-secret-key'
+TELEMETRY_TOKEN = 'load-test-telemetry-token'
+N_USERS = 50
+N_STATIONS = 200
+
+
+class Scenario:
+    """One weighted traffic pattern; ``fn(ctx, rng)`` returns (route, response)"""
+
+    def __init__(self, name, weight, fn):
+        self.name = name
+        self.weight = weight
+        self.fn = fn
+
+
+def _day(rng):
+    return (date(2025, 9, 1) + timedelta(days=rng.randrange(30))).isoformat()
+
+
+def nearby(ctx, rng):
+    lat, lng = rng.choice(METROS)
+    params = {'lat': lat + rng.uniform(-0.1, 0.1), 'lng': lng + rng.uniform(-0.1, 0.1)}
+    if rng.random() < 0.3:
+        params['rank'] = 'best'
+        if rng.random() < 0.5:
+            params.update(connectors=rng.choice(['ccs1', 'nacs', 'j1772', 'ccs1,chademo']), min_kw=rng.choice([0, 50]))
+    return 'nearby_stations', ctx.get('/api/nearby_stations', params=params)
+
+
+def availability(ctx, rng):
+    station = rng.randrange(1, N_STATIONS + 1)
+    return 'availability', ctx.get(f'/api/stations/{station}/availability', params={'date': _day(rng)})
+
+
+def booking(ctx, rng):
+    # A small slot space per station makes conflicts (409) happen at the requested rate
+    if rng.random() < ctx.conflict_rate and ctx.booked:
+        station, start = rng.choice(ctx.booked)
+    else:
+        station = rng.randrange(1, N_STATIONS + 1)
+        start = datetime(2025, 9, 1, tzinfo=timezone.utc) + timedelta(hours=rng.randrange(24 * 365))
+        ctx.booked.append((station, start))
+    payload = {'station_id': station, 'user_id': rng.randrange(1, N_USERS + 1),
+               'start_time': start.isoformat(), 'end_time': (start + timedelta(hours=1)).isoformat()}
+    return 'create_booking', ctx.post('/api/bookings/', json=payload)
+
+
+def review_read(ctx, rng):
+    if rng.random() < 0.3:
+        return 'get_review', ctx.get(f'/api/reviews/{rng.randrange(1, 100)}')
+    return 'station_reviews', ctx.get(f'/api/stations/{rng.randrange(1, 5)}/reviews')
+
+
+def review_write(ctx, rng):
+    # Full lifecycle so PUT/DELETE hit real rows; the booking id is unique per call
+    response = ctx.post(f'/api/bookings/{rng.randrange(1, 10 ** 9)}/review',
+                        json={'rating': rng.randrange(1, 6), 'review': 'ok'})
+    if response.status_code == 201 and rng.random() < 0.5:
+        review_id = response.json()['review_id']
+        ctx.record('update_review', ctx.put(f'/api/reviews/{review_id}', json={'rating': 5}))
+        ctx.record('delete_review', ctx.delete(f'/api/reviews/{review_id}'))
+    return 'add_review', response
+
+
+def pricing(ctx, rng):
+    # Every map view re-prices the stations in its viewport
+    lat, lng = rng.choice(METROS)
+    bbox = f'{lat - 0.2},{lng - 0.2},{lat + 0.2},{lng + 0.2}'
+    return 'pricing_quote', ctx.get('/api/pricing/quote', params={'bbox': bbox})
+
+
+def station_detail(ctx, rng):
+    # The mobile station screen: availability, reviews and profile in one batch
+    station = rng.randrange(1, N_STATIONS + 1)
+    requests_ = [
+        {'id': 'slots', 'path': f'/api/stations/{station}/availability?date={_day(rng)}'},
+        {'id': 'reviews', 'path': f'/api/stations/{station}/reviews'},
+        {'id': 'profile', 'path': '/api/profile'},
+    ]
+    return 'batch', ctx.post('/api/batch', json={'requests': requests_})
+
+
+def catalogue_sync(ctx, rng):
+    # Cold installs fetch the snapshot; cached clients ask for changes since their last sync
+    if rng.random() < 0.1:
+        return 'station_snapshot', ctx.get('/api/stations/snapshot')
+    return 'station_changes', ctx.get('/api/stations/changes', params={'since': rng.randrange(0, 50)})
+
+
+def telemetry(ctx, rng):
+    # Chargers flush ~a minute of 5 s readings per session; hosts chart a session now and then
+    booking_id = rng.randrange(1, len(ctx.booked) + 2)
+    if rng.random() < 0.2:
+        return 'booking_telemetry', ctx.get(f'/api/bookings/{booking_id}/telemetry',
+                                            params={'resolution': rng.choice(['1m', '1h'])})
+    start = time.time() - rng.randrange(3600)
+    readings = [[booking_id, start + 5 * i, 0.01 * i, rng.uniform(7, 50)] for i in range(12)]
+    return 'ingest_telemetry', ctx.post('/api/telemetry', json={'readings': readings},
+                                        headers={'X-Telemetry-Token': TELEMETRY_TOKEN})
+
+
+def dashboard(ctx, rng):
+    return 'dashboard', ctx.get('/api/dashboard')
+
+
+def profile(ctx, rng):
+    roll = rng.random()
+    if roll < 0.2:
+        return 'geolocation', ctx.get('/api/geolocation')
+    if roll < 0.4:
+        return 'auth_user', ctx.get('/auth/user')
+    if roll < 0.5:
+        return 'auth_providers', ctx.get('/auth/providers')
+    return 'profile', ctx.get('/api/profile')
+
+
+def host_stations(ctx, rng):
+    if rng.random() < 0.2:
+        lat, lng = rng.choice(METROS)
+        payload = {'name': 'Load Station', 'lat': lat, 'lng': lng, 'address': '1 Load St'}
+        response = ctx.post('/api/host/stations', json=payload)
+        if response.status_code == 201 and rng.random() < 0.5:
+            station_id = response.json()['station_id']
+            ctx.record('update_station', ctx.put(f'/api/host/stations/{station_id}', json={'name': 'Renamed'}))
+            ctx.record('delete_station', ctx.delete(f'/api/host/stations/{station_id}'))
+        return 'create_station', response
+    if rng.random() < 0.1:
+        # Host tooling: bulk import and batched geocoding
+        if rng.random() < 0.5:
+            addresses = [f'{rng.randrange(1, 500)} Load St' for _ in range(rng.randrange(1, 20))]
+            return 'host_geocode', ctx.post('/api/host/geocode', json={'addresses': addresses})
+        lat, lng = rng.choice(METROS)
+        rows = ''.join(f'Fleet {i},{rng.randrange(1, 10 ** 6)} Fleet St,{lat + rng.uniform(-0.05, 0.05):.5f},'
+                       f'{lng + rng.uniform(-0.05, 0.05):.5f}\n' for i in range(50))
+        return 'import_stations', ctx.post('/api/host/stations/import', data='name,address,lat,lng\n' + rows,
+                                           headers={'Content-Type': 'text/csv'})
+    if rng.random() < 0.05:
+        return 'host_pricing', ctx.put('/api/host/pricing', json={'multiplier': rng.choice([0.9, 1.0, 1.1])})
+    return 'list_host_stations', ctx.get('/api/host/stations')
+
+
+def payments(ctx, rng):
+    # Checkout calls Stripe; only enabled against a server whose STRIPE_API_BASE is a stub
+    if not ctx.include_payments or rng.random() < 0.5:
+        return 'stripe_webhook', ctx.post('/api/payments/webhook', data=b'{}',
+                                          headers={'Stripe-Signature': 't=0,v1=bad'})
+    payload = {'booking_id': rng.randrange(1, 10 ** 6), 'amount': 1000, 'currency': 'usd',
+               'success_url': 'http://localhost/success', 'cancel_url': 'http://localhost/cancel'}
+    return 'checkout', ctx.post('/api/payments/checkout', json=payload)
+
+
+def health(ctx, rng):
+    return 'health', ctx.get('/api/health')
+
+
+SCENARIOS = [
+    Scenario('map_browsing', 40, nearby),
+    Scenario('availability_polling', 25, availability),
+    Scenario('pricing', 10, pricing),
+    Scenario('booking', 8, booking),
+    Scenario('station_detail', 5, station_detail),
+    Scenario('catalogue_sync', 3, catalogue_sync),
+    Scenario('review_reads', 10, review_read),
+    Scenario('review_writes', 2, review_write),
+    Scenario('telemetry', 5, telemetry),
+    Scenario('dashboard', 8, dashboard),
+    Scenario('profile', 3, profile),
+    Scenario('host_stations', 3, host_stations),
+    Scenario('payments', 1, payments),
+    Scenario('health', 1, health),
+]
+
+
+class Client:
+    """Per-thread HTTP session bound to the target URL.
+
+    Each request is timed; scenarios return their primary (route, response)
+    and may ``record`` follow-up requests under their own route names.
+    """
+
+    def __init__(self, base_url, cookie, conflict_rate, booked, record, include_payments=False):
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+        self.session.cookies.update(cookie)
+        self.conflict_rate = conflict_rate
+        self.booked = booked
+        self.include_payments = include_payments
+        self._record = record
+        self.last_elapsed = 0.0
+
+    def request(self, method, path, **kwargs):
+        start = time.perf_counter()
+        response = self.session.request(method, self.base_url + path, **kwargs)
+        self.last_elapsed = time.perf_counter() - start
+        return response
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.request('PUT', path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request('DELETE', path, **kwargs)
+
+    def record(self, route, response):
+        self._record(route, response, self.last_elapsed)
+
+
+def session_cookie(user_id, secret_key=SECRET_KEY):
+    """Forge a Flask-Login session cookie for a seeded user"""
+    app = Flask(__name__)
+    app.secret_key = secret_key
+    serializer = app.session_interface.get_signing_serializer(app)
+    return {app.config['SESSION_COOKIE_NAME']: serializer.dumps({'_user_id': str(user_id), '_fresh': True})}
+
+
+def seed_users(database_url):
+    from backend.app import create_app, db
+    from models.user import User
+    os.environ['DATABASE_URL'] = database_url
+    app = create_app('development')
+    with app.app_context():
+        db.create_all()
+        if User.query.count() < N_USERS:
+            db.session.add_all([User(email=f'load{i}@example.com', name=f'Load {i}')
+                                for i in range(User.query.count(), N_USERS)])
+            db.session.commit()
+
+
+def start_server(database_url, port, workers):
+    env = dict(os.environ, DATABASE_URL=database_url, SECRET_KEY=SECRET_KEY,
+               PROFILER_ENABLED='false', TELEMETRY_INGEST_TOKEN=TELEMETRY_TOKEN,
+               GEOCODER='services.geocoding:LocalGeocoder', PYTHONPATH=os.pathsep.join(sys.path))
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'wsgi:app', '--bind', f'127.0.0.1:{port}',
+         '--workers', str(workers), '--threads', '4', '--log-level', 'warning'],
+        cwd=backend_dir, env=env)
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f'gunicorn exited with status {proc.returncode}')
+        try:
+            if requests.get(url + '/api/health', timeout=1).ok:
+                return proc, url
+        except requests.RequestException:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError('Server did not become healthy within 30s')
+
+
+def drive(base_url, duration, concurrency, conflict_rate, seed=0, include_payments=False, secret_key=SECRET_KEY):
+    """Run the traffic mix and return ({route: {'latencies': [...], 'statuses': {...}}}, elapsed)"""
+    results = defaultdict(lambda: {'latencies': [], 'statuses': defaultdict(int)})
+    lock = threading.Lock()
+    booked = []
+    weights = [s.weight for s in SCENARIOS]
+    deadline = time.monotonic() + duration
+
+    def record(route, response, elapsed):
+        with lock:
+            results[route]['latencies'].append(elapsed)
+            results[route]['statuses'][str(response.status_code)] += 1
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        cookie = session_cookie(rng.randrange(1, N_USERS + 1), secret_key)
+        client = Client(base_url, cookie, conflict_rate, booked, record, include_payments)
+        while time.monotonic() < deadline:
+            scenario = rng.choices(SCENARIOS, weights)[0]
+            route, response = scenario.fn(client, rng)
+            client.record(route, response)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, time.perf_counter() - started
+
+
+def summarize(results, elapsed):
+    """Per-route throughput and latency percentiles (milliseconds)"""
+    summary = {}
+    for route, data in sorted(results.items()):
+        latencies = np.asarray(data['latencies']) * 1000
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (0, 0, 0)
+        summary[route] = {
+            'requests': int(len(latencies)),
+            'throughput_rps': round(len(latencies) / elapsed, 2),
+            'p50_ms': round(float(p50), 3),
+            'p95_ms': round(float(p95), 3),
+            'p99_ms': round(float(p99), 3),
+            'statuses': dict(data['statuses']),
+        }
+    return summary
+
+
+def compare(old, new, threshold=0.10):
+    """Per-route p95/throughput deltas; routes worse than ``threshold`` are flagged"""
+    rows = []
+    for route in sorted(set(old['routes']) | set(new['routes'])):
+        before, after = old['routes'].get(route), new['routes'].get(route)
+        if not before or not after:
+            rows.append({'route': route, 'status': 'added' if after else 'removed'})
+            continue
+        p95_delta = (after['p95_ms'] - before['p95_ms']) / before['p95_ms'] if before['p95_ms'] else 0.0
+        rps_delta = ((after['throughput_rps'] - before['throughput_rps']) / before['throughput_rps']
+                     if before['throughput_rps'] else 0.0)
+        regressed = p95_delta > threshold or rps_delta < -threshold
+        rows.append({'route': route, 'p95_delta': round(p95_delta, 4), 'rps_delta': round(rps_delta, 4),
+                     'status': 'REGRESSION' if regressed else 'ok'})
+    return rows
+
+
+def print_summary(summary):
+    print(f"{'route':<22}{'req':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  statuses")
+    for route, row in summary.items():
+        print(f"{route:<22}{row['requests']:>8}{row['throughput_rps']:>10.1f}{row['p50_ms']:>10.2f}"
+              f"{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}  {row['statuses']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='EVXchange API load test')
+    parser.add_argument('--url', help='Target an already running server instead of starting one')
+    parser.add_argument('--database-url', help='Database for the started server (default: temp SQLite file)')
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--concurrency', type=int, default=8)
+    # The API keeps bookings/reviews in per-process memory, so conflicts are only
+    # realistic with a single worker; raise it to measure multi-process throughput.
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--conflict-rate', type=float, default=0.2)
+    parser.add_argument('--secret-key', default=SECRET_KEY, help='SECRET_KEY of the target server (with --url)')
+    parser.add_argument('--include-payments', action='store_true',
+                        help='Also drive /api/payments/checkout (point STRIPE_API_BASE at a Stripe stub)')
+    parser.add_argument('--out', help='Write results JSON here')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='Diff two results files and exit')
+    parser.add_argument('--threshold', type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as f_old, open(args.compare[1]) as f_new:
+            rows = compare(json.load(f_old), json.load(f_new), args.threshold)
+        print(f"{'route':<22}{'p95 delta':>12}{'rps delta':>12}  status")
+        for row in rows:
+            if 'p95_delta' in row:
+                print(f"{row['route']:<22}{row['p95_delta']:>+12.1%}{row['rps_delta']:>+12.1%}  {row['status']}")
+            else:
+                print(f"{row['route']:<22}{'':>24}  {row['status']}")
+        return 1 if any(r['status'] == 'REGRESSION' for r in rows) else 0
+
+    proc = None
+    url = args.url
+    if not url:
+        database_url = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/loadtest.db"
+        seed_users(database_url)
+        proc, url = start_server(database_url, args.port, args.workers)
+    try:
+        results, elapsed = drive(url, args.duration, args.concurrency, args.conflict_rate,
+                                 include_payments=args.include_payments, secret_key=args.secret_key)
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait()
+
+    summary = summarize(results, elapsed)
+    print_summary(summary)
+    report = {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'config': {k: v for k, v in vars(args).items() if k not in ('compare', 'out', 'secret_key')},
+        'elapsed_s': round(elapsed, 3),
+        'total_rps': round(sum(r['requests'] for r in summary.values()) / elapsed, 2),
+        'routes': summary,
+    }
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'Results written to {args.out}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
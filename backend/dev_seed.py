@@ -1,6 +1,66 @@
 # dev_seed.py: Populate the dev database with sample users, cars, and stations
+#
+# python dev_seed.py                      -> three users, two cars, three stations
+# python dev_seed.py --scale --stations 1000000 --bookings 5000000 --out-dir scale_data
+#                                         -> production-sized data for performance work
+import argparse
+import io
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
 from backend.app import db
-from models import User, Car, Station
+from models import User, Car, Station, VehicleProfile
+from services.connectors import BITS, connector_mask
+
+# (name, lat, lng, relative size, spread in degrees): stations cluster around
+# metro centres with a Gaussian falloff; a small share is scattered rurally.
+METROS = [
+    ('San Francisco', 37.7749, -122.4194, 8, 0.25),
+    ('Los Angeles', 34.0522, -118.2437, 10, 0.35),
+    ('San Diego', 32.7157, -117.1611, 4, 0.2),
+    ('Seattle', 47.6062, -122.3321, 5, 0.2),
+    ('Portland', 45.5152, -122.6784, 3, 0.15),
+    ('Denver', 39.7392, -104.9903, 3, 0.2),
+    ('Austin', 30.2672, -97.7431, 3, 0.2),
+    ('Dallas', 32.7767, -96.7970, 4, 0.3),
+    ('Chicago', 41.8781, -87.6298, 6, 0.3),
+    ('Atlanta', 33.7490, -84.3880, 4, 0.25),
+    ('Miami', 25.7617, -80.1918, 4, 0.2),
+    ('Washington', 38.9072, -77.0369, 5, 0.2),
+    ('New York', 40.7128, -74.0060, 10, 0.3),
+    ('Boston', 42.3601, -71.0589, 5, 0.2),
+]
+RURAL_SHARE = 0.05
+US_BOUNDS = ((25.0, 49.0), (-124.5, -67.0))
+STREETS = np.array(['Main St', 'Oak Ave', 'Pine Rd', 'Maple Dr', 'Cedar Ln', 'Elm St',
+                    'Park Blvd', 'Lake Rd', 'Hill St', 'Market St'])
+# Share of bookings starting at each hour of the day: commute peaks plus an overnight trough
+HOURLY_BOOKING_WEIGHTS = np.array([1, 1, 1, 1, 1, 2, 4, 7, 9, 7, 5, 5,
+                                   6, 5, 5, 6, 8, 10, 10, 8, 6, 4, 2, 1], dtype=float)
+RATING_WEIGHTS = np.array([0.04, 0.06, 0.12, 0.33, 0.45])
+# (connectors, max kW, share of stations): mostly Level 2, the rest DC fast chargers
+CHARGER_TYPES = [
+    ('j1772', 7.2, 0.45), ('j1772', 11.0, 0.15), ('ccs1,chademo', 50.0, 0.12),
+    ('ccs1', 150.0, 0.1), ('ccs1', 350.0, 0.05), ('nacs', 250.0, 0.13),
+]
+# (make, model, first model year, last model year, connectors, max kW) for common cars
+VEHICLE_PROFILES = [
+    ('tesla', 'model 3', None, None, 'nacs,j1772', 250.0),
+    ('tesla', 'model y', None, None, 'nacs,j1772', 250.0),
+    ('nissan', 'leaf', None, None, 'j1772,chademo', 50.0),
+    ('chevrolet', 'bolt', None, None, 'j1772,ccs1', 55.0),
+    ('hyundai', 'ioniq 5', None, 2024, 'j1772,ccs1', 235.0),
+    ('hyundai', 'ioniq 5', 2025, None, 'j1772,nacs', 235.0),
+    ('ford', 'mustang mach-e', None, None, 'j1772,ccs1', 150.0),
+    ('kia', 'ev6', None, None, 'j1772,ccs1', 235.0),
+    ('volkswagen', 'id.4', None, None, 'j1772,ccs1', 135.0),
+]
+CHUNK_SIZE = 100_000
+
 
 def seed_dev_data():
     from backend.app import create_app
@@ -20,16 +80,237 @@ def seed_dev_data():
         car1 = Car(user_id=alice.id, make='Tesla', model='Model 3', year=2022, license_plate='ALC123')
         car2 = Car(user_id=charlie.id, make='Nissan', model='Leaf', year=2021, license_plate='CHR456')
         db.session.add_all([car1, car2])
+        db.session.add_all(vehicle_profiles())
         db.session.commit()
 
         # Create stations for owners
-        station1 = Station(user_id=bob.id, name='Bob Station 1', address='123 Main St, City', latitude=37.7749, longitude=-122.4194, price_per_kwh=0.30)
-        station2 = Station(user_id=bob.id, name='Bob Station 2', address='456 Oak Ave, City', latitude=37.7750, longitude=-122.4180, price_per_kwh=0.28)
-        station3 = Station(user_id=charlie.id, name='Charlie Station', address='789 Pine Rd, City', latitude=37.7760, longitude=-122.4170, price_per_kwh=0.32)
+        station1 = Station(user_id=bob.id, name='Bob Station 1', address='123 Main St, City', latitude=37.7749, longitude=-122.4194, price_per_kwh=0.30, connectors=BITS['j1772'], max_kw=7.2)
+        station2 = Station(user_id=bob.id, name='Bob Station 2', address='456 Oak Ave, City', latitude=37.7750, longitude=-122.4180, price_per_kwh=0.28, connectors=connector_mask('ccs1,chademo'), max_kw=50.0)
+        station3 = Station(user_id=charlie.id, name='Charlie Station', address='789 Pine Rd, City', latitude=37.7760, longitude=-122.4170, price_per_kwh=0.32, connectors=BITS['nacs'], max_kw=250.0)
         db.session.add_all([station1, station2, station3])
         db.session.commit()
 
         print('Sample dev data seeded!')
 
+
+def vehicle_profiles():
+    return [VehicleProfile(make=make, model=model, year_from=year_from, year_to=year_to,
+                           connectors=connector_mask(connectors), max_kw=max_kw)
+            for make, model, year_from, year_to, connectors, max_kw in VEHICLE_PROFILES]
+
+
+# --- Scale data ---
+
+def generate_users(n, rng):
+    ids = np.arange(1, n + 1)
+    created = datetime(2024, 1, 1).strftime('%Y-%m-%d %H:%M:%S.%f')
+    return pd.DataFrame({
+        'id': ids,
+        'email': [f'user{i}@scale.example.com' for i in ids.tolist()],
+        'name': [f'Scale User {i}' for i in ids.tolist()],
+        'created_at': created,
+        'updated_at': created,
+        'is_active': True,
+        'is_verified': rng.random(n) < 0.8,
+    })
+
+
+def generate_stations(n, n_hosts, rng):
+    """Stations clustered around METROS, owned by a long-tailed set of hosts"""
+    sizes = np.array([m[3] for m in METROS], dtype=float)
+    metro = rng.choice(len(METROS), size=n, p=sizes / sizes.sum())
+    centre_lat = np.array([m[1] for m in METROS])[metro]
+    centre_lng = np.array([m[2] for m in METROS])[metro]
+    spread = np.array([m[4] for m in METROS])[metro]
+    lat = centre_lat + rng.normal(0, 1, n) * spread
+    lng = centre_lng + rng.normal(0, 1, n) * spread / np.cos(np.radians(centre_lat))
+
+    rural = rng.random(n) < RURAL_SHARE
+    (lat_lo, lat_hi), (lng_lo, lng_hi) = US_BOUNDS
+    lat[rural] = rng.uniform(lat_lo, lat_hi, rural.sum())
+    lng[rural] = rng.uniform(lng_lo, lng_hi, rural.sum())
+
+    # Power-law host sizes: a few fleet operators own many stations, most hosts one or two
+    host_weights = 1.0 / np.arange(1, n_hosts + 1) ** 0.8
+    hosts = rng.permutation(n_hosts)[rng.choice(n_hosts, size=n, p=host_weights / host_weights.sum())] + 1
+
+    ids = np.arange(1, n + 1)
+    metro_names = np.array([m[0] for m in METROS])[metro]
+    metro_names[rural] = 'Rural'
+    numbers = rng.integers(1, 9999, n).astype(str)
+    streets = STREETS[rng.integers(0, len(STREETS), n)]
+    address = np.char.add(np.char.add(np.char.add(numbers, ' '), np.char.add(streets, ', ')), metro_names)
+    shares = np.array([c[2] for c in CHARGER_TYPES])
+    charger = rng.choice(len(CHARGER_TYPES), size=n, p=shares / shares.sum())
+    return pd.DataFrame({
+        'id': ids,
+        'user_id': hosts,
+        'name': np.char.add('Station ', ids.astype(str)),
+        'address': address,
+        'latitude': lat.round(6),
+        'longitude': lng.round(6),
+        'price_per_kwh': np.clip(rng.lognormal(np.log(0.30), 0.2, n), 0.1, 1.0).round(2),
+        'available': rng.random(n) < 0.9,
+        'connectors': np.array([connector_mask(c[0]) for c in CHARGER_TYPES])[charger],
+        'max_kw': np.array([c[1] for c in CHARGER_TYPES])[charger],
+        'version': ids,
+    })
+
+
+def generate_bookings(n, stations, n_users, rng, days=90, start=datetime(2025, 1, 1)):
+    """One-hour bookings with per-station popularity and a daily demand curve.
+
+    Popularity is lognormal, so most stations see a handful of bookings and
+    a few see many. Slots that collide at one station are dropped, so the
+    result never overlaps and may hold slightly fewer than ``n`` rows.
+    """
+    station_ids = stations['id'].to_numpy()
+    popularity = rng.lognormal(0, 1.0, len(station_ids))
+    station = station_ids[rng.choice(len(station_ids), size=n, p=popularity / popularity.sum())]
+    hour = rng.choice(24, size=n, p=HOURLY_BOOKING_WEIGHTS / HOURLY_BOOKING_WEIGHTS.sum())
+    slot = rng.integers(0, days, n) * 24 + hour
+
+    _, first = np.unique(station.astype(np.int64) * (days * 24) + slot, return_index=True)
+    first.sort()
+    station, slot = station[first], slot[first]
+    start_time = np.datetime64(start, 's') + slot.astype('timedelta64[h]')
+    return pd.DataFrame({
+        'booking_id': np.arange(1, len(first) + 1),
+        'station_id': station,
+        'user_id': rng.integers(1, n_users + 1, len(first)),
+        'start_time': start_time,
+        'end_time': start_time + np.timedelta64(1, 'h'),
+        'status': 'confirmed',
+    })
+
+
+def generate_reviews(bookings, rate, rng):
+    """Reviews for a random ``rate`` share of bookings, skewed towards 4-5 stars"""
+    reviewed = bookings[rng.random(len(bookings)) < rate]
+    n = len(reviewed)
+    return pd.DataFrame({
+        'review_id': np.arange(1, n + 1),
+        'booking_id': reviewed['booking_id'].to_numpy(),
+        'station_id': reviewed['station_id'].to_numpy(),
+        'user_id': reviewed['user_id'].to_numpy(),
+        'rating': rng.choice(np.arange(1, 6), size=n, p=RATING_WEIGHTS),
+        'review': 'Generated review',
+    })
+
+
+def generate_payments(bookings, stations, rng):
+    """One Stripe-style payment per booking, in the shape jobs.payouts expects"""
+    price = stations.set_index('id')['price_per_kwh'].reindex(bookings['station_id']).to_numpy()
+    kwh = np.clip(rng.normal(30, 10, len(bookings)), 5, 80)
+    return pd.DataFrame({
+        'payment_id': np.arange(1, len(bookings) + 1),
+        'booking_id': bookings['booking_id'].to_numpy(),
+        'amount': np.rint(price * kwh * 100).astype(np.int64),
+        'currency': 'usd',
+        'status': np.where(rng.random(len(bookings)) < 0.97, 'paid', 'failed'),
+    })
+
+
+def bulk_insert(conn, table, df, chunk_size=CHUNK_SIZE):
+    """Insert a DataFrame with COPY on PostgreSQL and executemany elsewhere"""
+    columns = list(df.columns)
+    dialect = conn.dialect
+    if dialect.name == 'postgresql':
+        cursor = conn.connection.dbapi_connection.cursor()
+        copy_sql = f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+        for offset in range(0, len(df), chunk_size):
+            buffer = io.StringIO()
+            df.iloc[offset:offset + chunk_size].to_csv(buffer, index=False, header=False)
+            buffer.seek(0)
+            cursor.copy_expert(copy_sql, buffer)
+        conn.exec_driver_sql(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), (SELECT max(id) FROM {table.name}))")
+        return
+
+    if dialect.paramstyle == 'qmark':
+        placeholders = ', '.join('?' for _ in columns)
+    elif dialect.paramstyle in ('format', 'pyformat'):
+        placeholders = ', '.join('%s' for _ in columns)
+    else:
+        for offset in range(0, len(df), chunk_size):
+            conn.execute(table.insert(), df.iloc[offset:offset + chunk_size].to_dict('records'))
+        return
+    sql = f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({placeholders})"
+    for offset in range(0, len(df), chunk_size):
+        chunk = df.iloc[offset:offset + chunk_size]
+        conn.exec_driver_sql(sql, list(zip(*(chunk[c].tolist() for c in columns))))
+
+
+def seed_scale_data(stations=1_000_000, users=100_000, bookings=1_000_000, review_rate=0.2,
+                    hosts=None, days=90, out_dir=None, seed=0, app=None):
+    """Generate and bulk-load a production-sized dataset.
+
+    Users and stations go into the database. Bookings, reviews and payments
+    only exist in memory in the API, so they are written as CSV files to
+    ``out_dir`` when it is given, ready for ``jobs.payouts`` and the benchmarks.
+    """
+    from backend.app import create_app
+    rng = np.random.default_rng(seed)
+    app = app or create_app('development')
+    hosts = min(hosts or max(users // 10, 1), users)
+    timings = {}
+
+    started = time.perf_counter()
+    user_df = generate_users(users, rng)
+    station_df = generate_stations(stations, hosts, rng)
+    timings['generate'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        with db.engine.begin() as conn:
+            bulk_insert(conn, User.__table__, user_df)
+            bulk_insert(conn, Station.__table__, station_df)
+        db.session.add_all(vehicle_profiles())
+        db.session.commit()
+    timings['insert'] = time.perf_counter() - started
+
+    result = {'users': len(user_df), 'stations': len(station_df)}
+    if out_dir:
+        started = time.perf_counter()
+        booking_df = generate_bookings(bookings, station_df, users, rng, days=days)
+        review_df = generate_reviews(booking_df, review_rate, rng)
+        payment_df = generate_payments(booking_df, station_df, rng)
+        os.makedirs(out_dir, exist_ok=True)
+        booking_df.to_csv(os.path.join(out_dir, 'bookings.csv'), index=False)
+        review_df.to_csv(os.path.join(out_dir, 'reviews.csv'), index=False)
+        payment_df.to_csv(os.path.join(out_dir, 'payments.csv'), index=False)
+        station_df[['id', 'user_id']].rename(columns={'id': 'station_id', 'user_id': 'host_id'}).to_csv(
+            os.path.join(out_dir, 'stations.csv'), index=False)
+        timings['bookings'] = time.perf_counter() - started
+        result.update(bookings=len(booking_df), reviews=len(review_df), payments=len(payment_df))
+    result['timings'] = {k: round(v, 2) for k, v in timings.items()}
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Seed the development database')
+    parser.add_argument('--scale', action='store_true', help='Generate production-sized data')
+    parser.add_argument('--stations', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--hosts', type=int, help='Distinct station owners (default: users / 10)')
+    parser.add_argument('--bookings', type=int, default=1_000_000)
+    parser.add_argument('--review-rate', type=float, default=0.2)
+    parser.add_argument('--days', type=int, default=90, help='Booking window in days')
+    parser.add_argument('--out-dir', help='Write bookings/reviews/payments/stations CSVs here')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if not args.scale:
+        seed_dev_data()
+        return
+    result = seed_scale_data(args.stations, args.users, args.bookings, args.review_rate,
+                             hosts=args.hosts, days=args.days, out_dir=args.out_dir, seed=args.seed)
+    timings = result.pop('timings')
+    print('Scale data seeded: ' + ', '.join(f'{v:,} {k}' for k, v in result.items()))
+    print('Timings (s): ' + ', '.join(f'{k}={v}' for k, v in timings.items()))
+
+
 if __name__ == '__main__':
-    seed_dev_data()
+    main()
@@ -0,0 +1,26 @@
+# Gunicorn settings, picked up automatically by `gunicorn wsgi:app` from backend/
+import os
+import shutil
+
+from prometheus_client import multiprocess
+
+# Threaded workers: every open /api/stations/.../stream holds a thread until the
+# client disconnects or SSE_MAX_STREAM_SECONDS passes. A worker therefore serves
+# at most `threads` live viewers, and further requests queue behind them; raise
+# GUNICORN_THREADS to the expected viewers per worker plus headroom for API calls.
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '32'))
+
+
+def on_starting(server):
+    """Start every deploy with an empty Prometheus multiprocess directory"""
+    metrics_dir = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if metrics_dir:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """Drop live gauges of workers that have exited"""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,2 @@
+# evxchange Jobs Module
+# Contains offline batch jobs that run outside the request path
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+
+def write_columnar(df, path):
+    """Write a DataFrame as a compact columnar file.
+
+    ``.parquet`` paths use pandas' parquet writer (requires pyarrow);
+    anything else is written as a compressed NumPy ``.npz`` archive with
+    one array per column.
+    """
+    path = str(path)
+    if path.endswith('.parquet'):
+        df.to_parquet(path, index=False)
+        return path
+    columns = {}
+    for name in df.columns:
+        col = df[name]
+        if isinstance(col.dtype, pd.CategoricalDtype) or col.dtype == object:
+            columns[name] = col.astype(str).to_numpy(dtype='U')
+        else:
+            columns[name] = col.to_numpy()
+    np.savez_compressed(path, **columns)
+    return path if path.endswith('.npz') else f'{path}.npz'
+
+
+def read_columnar(path):
+    """Read a file written by :func:`write_columnar` back into a DataFrame"""
+    path = str(path)
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    with np.load(path, allow_pickle=False) as archive:
+        return pd.DataFrame({name: archive[name] for name in archive.files})
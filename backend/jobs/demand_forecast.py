@@ -0,0 +1,212 @@
+"""Offline occupancy forecasts from booking history.
+
+Trains one model per station (or per cluster of sparse stations) that
+predicts the booked fraction of every hour of the week. The result is
+written as a compact table the API reads with array lookups, so
+``/api/stations/<id>/availability`` and pricing show predicted busy times
+without any inference on the request path.
+
+- Bookings from the last ``--weeks`` are expanded into an hours x stations
+  occupancy matrix (fraction of each UTC hour that was booked).
+- Features are calendar one-hots: hour of day, day of week and
+  hour-of-day on weekends. Recent weeks weigh more (``HALF_LIFE_WEEKS``).
+- Every station in a chunk shares the same feature matrix, so one
+  multi-output ``Ridge`` fit trains all of the chunk's per-station models.
+  Chunks are fitted in a process pool.
+- Stations with fewer than ``--min-bookings`` bookings are grouped by
+  ``KMeans`` over their coordinates (when the stations CSV has them) and
+  share their cluster's model, fitted on the cluster's mean occupancy.
+
+Output (``.npz``): ``station_id`` (sorted), ``row`` (index into
+``occupancy``), ``occupancy`` (rows x 168 uint8 percentages, hour 0 =
+Monday 00:00 UTC) and ``as_of`` (epoch seconds).
+
+Usage (from ``backend/``)::
+
+    python -m jobs.demand_forecast --bookings bookings.csv [--stations stations.csv] \
+        --out forecasts/occupancy.npz [--workers 8]
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+from sklearn.linear_model import Ridge
+
+from services.forecast import HOURS_PER_WEEK, hour_of_week
+
+BOOKING_COLUMNS = ['station_id', 'start_time', 'end_time']
+DEFAULT_WEEKS = 8
+DEFAULT_MIN_BOOKINGS = 20
+DEFAULT_CLUSTERS = 50
+HALF_LIFE_WEEKS = 2.0
+RIDGE_ALPHA = 1.0
+CHUNK_STATIONS = 2000
+
+
+def hourly_occupancy(columns, start, end, n_columns, t0, n_hours, cap=1.0):
+    """Booked fraction of each hour since ``t0``: an (n_hours, n_columns) float32 matrix.
+
+    ``columns`` maps each booking to its matrix column; times are epoch
+    seconds. Cells are capped at ``cap`` (None sums whole clusters).
+    """
+    first = np.floor((start - t0) / 3600).astype(np.int64)
+    last = np.ceil((end - t0) / 3600).astype(np.int64) - 1
+    spans = np.maximum(last - first + 1, 0)
+    booking = np.repeat(np.arange(len(start)), spans)
+    hour = first[booking] + np.arange(spans.sum()) - np.repeat(np.cumsum(spans) - spans, spans)
+    hour_start = t0 + hour * 3600.0
+    overlap = (np.minimum(end[booking], hour_start + 3600) - np.maximum(start[booking], hour_start)) / 3600
+    inside = (hour >= 0) & (hour < n_hours)
+    cells = hour[inside] * n_columns + columns[booking][inside]
+    matrix = np.bincount(cells, weights=overlap[inside], minlength=n_hours * n_columns)
+    if cap is not None:
+        matrix = np.minimum(matrix, cap)
+    return matrix.astype(np.float32).reshape(n_hours, n_columns)
+
+
+def calendar_features(hour_ts):
+    """One-hot hour of day, day of week and weekend hour of day for epoch-second hour starts"""
+    how = hour_of_week(hour_ts)
+    hour, day = how % 24, how // 24
+    weekend = day >= 5
+    features = np.zeros((len(how), 24 + 7 + 24), dtype=np.float32)
+    rows = np.arange(len(how))
+    features[rows, hour] = 1
+    features[rows, 24 + day] = 1
+    features[rows[weekend], 31 + hour[weekend]] = 1
+    return features
+
+
+def week_features():
+    """Features for the 168 hours of a week, Monday 00:00 UTC first"""
+    monday = 4 * 86400  # 1970-01-05 was a Monday
+    return calendar_features(monday + np.arange(HOURS_PER_WEEK) * 3600.0)
+
+
+def fit_week(occupancy, t0, alpha=RIDGE_ALPHA):
+    """Fit one Ridge per column of ``occupancy`` (hours since ``t0``); returns (columns, 168) uint8 percent"""
+    n_hours = occupancy.shape[0]
+    hour_ts = t0 + np.arange(n_hours) * 3600.0
+    age_weeks = (n_hours - 1 - np.arange(n_hours)) / HOURS_PER_WEEK
+    model = Ridge(alpha=alpha).fit(calendar_features(hour_ts), occupancy,
+                                   sample_weight=0.5 ** (age_weeks / HALF_LIFE_WEEKS))
+    predicted = model.predict(week_features()).reshape(HOURS_PER_WEEK, -1)
+    return np.rint(np.clip(predicted, 0, 1) * 100).astype(np.uint8).T
+
+
+def _fit_chunk(task):
+    """Process-pool worker: ``(columns, start, end, n_columns, t0, n_hours)`` -> forecast rows"""
+    columns, start, end, n_columns, t0, n_hours = task
+    return fit_week(hourly_occupancy(columns, start, end, n_columns, t0, n_hours), t0)
+
+
+def _chunks(station_pos, start, end, n_stations, t0, n_hours, size):
+    """Split bookings (sorted by ``station_pos``) into per-chunk worker tasks"""
+    bounds = np.searchsorted(station_pos, np.arange(0, n_stations + size, size))
+    for i, lo in enumerate(range(0, n_stations, size)):
+        a, b = bounds[i], bounds[i + 1]
+        yield (station_pos[a:b] - lo, start[a:b], end[a:b], min(size, n_stations - lo), t0, n_hours)
+
+
+def _epoch_seconds(column):
+    return ((pd.to_datetime(column, utc=True) - pd.Timestamp(0, tz='UTC')) / pd.Timedelta(seconds=1)).to_numpy()
+
+
+def forecast(bookings, stations=None, weeks=DEFAULT_WEEKS, min_bookings=DEFAULT_MIN_BOOKINGS,
+             clusters=DEFAULT_CLUSTERS, workers=None, as_of=None, chunk_size=CHUNK_STATIONS):
+    """Forecast tables from a bookings frame (station_id, start_time, end_time).
+
+    ``stations`` (station_id, optional latitude/longitude) adds stations
+    without history and enables geographic clusters. Returns
+    ``(station_id, row, occupancy, as_of)``.
+    """
+    start, end = _epoch_seconds(bookings['start_time']), _epoch_seconds(bookings['end_time'])
+    as_of = float(as_of if as_of is not None else (end.max() if len(end) else time.time()))
+    as_of -= as_of % 3600
+    n_hours = int(weeks * HOURS_PER_WEEK)
+    t0 = as_of - n_hours * 3600
+    recent = end > t0
+    booking_station = bookings['station_id'].to_numpy(dtype=np.int64)[recent]
+    start, end = start[recent], end[recent]
+
+    ids = np.unique(booking_station)
+    if stations is not None:
+        ids = np.union1d(ids, stations['station_id'].to_numpy(dtype=np.int64))
+    pos = np.searchsorted(ids, booking_station)
+    dense = np.bincount(pos, minlength=len(ids)) >= min_bookings
+
+    # Per-station models for stations with enough history
+    dense_ids = ids[dense]
+    dense_pos = np.cumsum(dense) - 1
+    keep = dense[pos]
+    order = np.argsort(dense_pos[pos[keep]], kind='stable')
+    args = (dense_pos[pos[keep]][order], start[keep][order], end[keep][order], len(dense_ids), t0, n_hours)
+    tasks = list(_chunks(*args, size=chunk_size))
+    if workers == 1 or len(tasks) <= 1:
+        parts = [_fit_chunk(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_fit_chunk, tasks))
+
+    # One shared model per cluster of sparse stations, fitted on the cluster's mean occupancy
+    sparse_ids = ids[~dense]
+    label = np.zeros(len(sparse_ids), dtype=np.int64)
+    if stations is not None and {'latitude', 'longitude'} <= set(stations.columns) and len(sparse_ids) > 1:
+        coords = stations.set_index('station_id').reindex(sparse_ids)[['latitude', 'longitude']]
+        located = coords.notna().all(axis=1).to_numpy()
+        k = min(clusters, int(located.sum()))
+        if k > 1:
+            label[located] = KMeans(n_clusters=k, n_init=1, random_state=0).fit_predict(coords[located].to_numpy())
+    n_clusters = int(label.max()) + 1 if len(label) else 0
+    if n_clusters:
+        sparse_pos = np.searchsorted(sparse_ids, booking_station[~keep])
+        cluster = label[sparse_pos]
+        totals = hourly_occupancy(cluster, start[~keep], end[~keep], n_clusters, t0, n_hours, cap=None)
+        members = np.bincount(label, minlength=n_clusters).astype(np.float32)
+        parts.append(fit_week(totals / members, t0))
+
+    occupancy = np.concatenate(parts) if parts else np.zeros((0, HOURS_PER_WEEK), dtype=np.uint8)
+    row = np.empty(len(ids), dtype=np.int32)
+    row[dense] = np.arange(len(dense_ids))
+    row[~dense] = len(dense_ids) + label
+    return ids, row, occupancy, as_of
+
+
+def write_forecast(path, station_id, row, occupancy, as_of):
+    """Write the table atomically so the API never reads a partial file"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f'{path}.tmp.npz'
+    np.savez_compressed(tmp, station_id=station_id, row=row, occupancy=occupancy, as_of=np.float64(as_of))
+    os.replace(tmp, path)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Train occupancy forecasts from booking history')
+    parser.add_argument('--bookings', required=True, help='CSV of bookings (station_id, start_time, end_time)')
+    parser.add_argument('--stations', help='CSV of stations (station_id[, latitude, longitude])')
+    parser.add_argument('--out', default=os.getenv('DEMAND_FORECAST_PATH', 'forecasts/occupancy.npz'))
+    parser.add_argument('--weeks', type=float, default=DEFAULT_WEEKS, help='Weeks of history to train on')
+    parser.add_argument('--min-bookings', type=int, default=DEFAULT_MIN_BOOKINGS,
+                        help='Stations with fewer bookings share a cluster model')
+    parser.add_argument('--clusters', type=int, default=DEFAULT_CLUSTERS)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+
+    bookings = pd.read_csv(args.bookings, usecols=BOOKING_COLUMNS)
+    stations = pd.read_csv(args.stations) if args.stations else None
+    started = time.perf_counter()
+    station_id, row, occupancy, as_of = forecast(bookings, stations, weeks=args.weeks,
+                                                 min_bookings=args.min_bookings, clusters=args.clusters,
+                                                 workers=args.workers)
+    write_forecast(args.out, station_id, row, occupancy, as_of)
+    print(f'Wrote forecasts for {len(station_id)} stations ({len(occupancy)} models) to {args.out} '
+          f'in {time.perf_counter() - started:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
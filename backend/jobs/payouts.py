@@ -0,0 +1,146 @@
+"""Nightly host earnings and payout reconciliation.
+
+Reconciles completed Stripe payments against bookings, attributes each
+payment to the host that owns the booked station (``Station.user_id``) and
+aggregates gross earnings, platform fees and net payouts per host. All work
+is done with vectorized pandas joins and group-bys so the job scales to
+millions of payments without touching the ORM row by row.
+
+Usage (from ``backend/``)::
+
+    python -m jobs.payouts --payments payments.csv --bookings bookings.csv \
+        --out host_earnings.npz
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from jobs.columnar import write_columnar
+
+DEFAULT_PLATFORM_FEE_RATE = 0.15
+COMPLETED_PAYMENT_STATUSES = ('paid', 'succeeded', 'complete')
+
+PAYMENT_COLUMNS = ['payment_id', 'booking_id', 'amount', 'currency', 'status']
+BOOKING_COLUMNS = ['booking_id', 'station_id']
+STATION_COLUMNS = ['station_id', 'host_id']
+
+
+def _require_columns(df, columns, name):
+    missing = [c for c in columns if c not in df.columns]
+    if missing:
+        raise ValueError(f"{name} is missing columns: {', '.join(missing)}")
+
+
+def completed_payments(payments):
+    """Return unique completed payments with normalized dtypes"""
+    _require_columns(payments, PAYMENT_COLUMNS, 'payments')
+    status = payments['status'].astype(str).str.lower()
+    paid = payments.loc[status.isin(COMPLETED_PAYMENT_STATUSES), PAYMENT_COLUMNS]
+    paid = paid.drop_duplicates('payment_id')
+    return paid.astype({
+        'booking_id': 'int64',
+        'amount': 'int64',
+        'currency': 'category',
+    })
+
+
+def reconcile_payments(payments, bookings, stations, fee_rate=DEFAULT_PLATFORM_FEE_RATE):
+    """Match payments to bookings and hosts.
+
+    Returns ``(ledger, exceptions)``: ``ledger`` has one row per reconciled
+    payment with ``host_id``, ``fee`` and ``net`` columns (all amounts in
+    minor currency units); ``exceptions`` lists payments that could not be
+    attributed to a host, with a ``reason`` column.
+    """
+    _require_columns(bookings, BOOKING_COLUMNS, 'bookings')
+    _require_columns(stations, STATION_COLUMNS, 'stations')
+    paid = completed_payments(payments)
+
+    booking_station = bookings[BOOKING_COLUMNS].drop_duplicates('booking_id')
+    station_host = stations[STATION_COLUMNS].drop_duplicates('station_id')
+
+    merged = paid.merge(booking_station, on='booking_id', how='left')
+    merged = merged.merge(station_host, on='station_id', how='left')
+
+    reason = np.full(len(merged), '', dtype=object)
+    reason[merged['host_id'].isna().to_numpy()] = 'unknown_station'
+    reason[merged['station_id'].isna().to_numpy()] = 'unmatched_booking'
+    duplicate = merged.duplicated('booking_id', keep='first').to_numpy()
+    reason[duplicate & (reason == '')] = 'duplicate_payment'
+
+    ok = reason == ''
+    exceptions = merged.loc[~ok, ['payment_id', 'booking_id', 'amount', 'currency']].copy()
+    exceptions['reason'] = pd.Categorical(reason[~ok])
+
+    ledger = merged.loc[ok].astype({'station_id': 'int64', 'host_id': 'int64'})
+    amount = ledger['amount'].to_numpy()
+    fee = np.rint(amount * fee_rate).astype('int64')
+    ledger = ledger.assign(fee=fee, net=amount - fee)
+    return ledger.reset_index(drop=True), exceptions.reset_index(drop=True)
+
+
+def host_earnings(ledger):
+    """Aggregate a reconciled ledger into per-host, per-currency totals"""
+    grouped = ledger.groupby(['host_id', 'currency'], observed=True, sort=True)
+    summary = grouped.agg(
+        bookings=('booking_id', 'size'),
+        gross=('amount', 'sum'),
+        platform_fee=('fee', 'sum'),
+        net=('net', 'sum'),
+    )
+    return summary.reset_index()
+
+
+def load_stations_from_db(app=None):
+    """Read the station -> host mapping straight from the database"""
+    from backend.app import create_app, db
+    app = app or create_app(os.getenv('FLASK_ENV', 'development'))
+    with app.app_context():
+        return pd.read_sql(
+            'SELECT id AS station_id, user_id AS host_id FROM stations',
+            db.engine,
+        )
+
+
+def run(payments_path, bookings_path, out_path, stations_path=None,
+        fee_rate=DEFAULT_PLATFORM_FEE_RATE, exceptions_path=None):
+    """Run the reconciliation end to end and write columnar outputs"""
+    payments = pd.read_csv(payments_path, usecols=PAYMENT_COLUMNS)
+    bookings = pd.read_csv(bookings_path, usecols=BOOKING_COLUMNS)
+    if stations_path:
+        stations = pd.read_csv(stations_path, usecols=STATION_COLUMNS)
+    else:
+        stations = load_stations_from_db()
+
+    ledger, exceptions = reconcile_payments(payments, bookings, stations, fee_rate)
+    summary = host_earnings(ledger)
+    written = write_columnar(summary, out_path)
+    if exceptions_path:
+        write_columnar(exceptions, exceptions_path)
+    return written, summary, exceptions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Reconcile payments and compute host earnings')
+    parser.add_argument('--payments', required=True, help='CSV export of Stripe payments')
+    parser.add_argument('--bookings', required=True, help='CSV of bookings (booking_id, station_id)')
+    parser.add_argument('--stations', help='CSV of stations (station_id, host_id); defaults to the database')
+    parser.add_argument('--out', required=True, help='Output path (.npz or .parquet)')
+    parser.add_argument('--exceptions', help='Optional output path for unreconciled payments')
+    parser.add_argument('--fee-rate', type=float,
+                        default=float(os.getenv('PLATFORM_FEE_RATE', DEFAULT_PLATFORM_FEE_RATE)))
+    args = parser.parse_args(argv)
+
+    written, summary, exceptions = run(
+        args.payments, args.bookings, args.out,
+        stations_path=args.stations, fee_rate=args.fee_rate,
+        exceptions_path=args.exceptions,
+    )
+    print(f'Wrote earnings for {summary["host_id"].nunique()} hosts to {written} '
+          f'({len(exceptions)} unreconciled payments)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+"""Offline station catalogue snapshot.
+
+Writes every active station (not soft-deleted) to one compact binary file
+that the mobile app can download once instead of issuing thousands of
+viewport queries. ``GET /api/stations/snapshot`` serves the newest file
+with an ETag, so CDNs and clients revalidate it for free.
+
+File layout (little-endian)::
+
+    header   magic b"EVXS", format u16, catalogue version u64, station count u32
+    body     zlib-compressed columns, each ``count`` long unless noted:
+             id deltas u32 (ids sorted ascending; first entry absolute)
+             latitude, longitude i32 (degrees x 1e5, ~1 m)
+             price u16 (thousandths of a currency unit per kWh)
+             rating u8 (mean rating x 20; 0 = no reviews)
+             available bits (numpy.packbits, ceil(count / 8) bytes)
+
+The catalogue version is the highest ``Station.version`` included. A run
+reads the previous snapshot and only queries stations whose version is
+newer, merging them in (tombstones remove stations). If nothing changed,
+no file is written. ``stations.json`` in the output directory names the
+current file, its ETag and its version; the newest ``KEEP_SNAPSHOTS``
+files are kept so in-flight downloads finish.
+
+Usage (from ``backend/``)::
+
+    python -m jobs.station_snapshot --out-dir snapshots [--reviews reviews.csv] [--interval 60]
+"""
+import argparse
+import hashlib
+import json
+import os
+import struct
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from services.snapshot_manifest import MANIFEST, read_manifest
+
+MAGIC = b'EVXS'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHQI')
+KEEP_SNAPSHOTS = 3
+
+COORD_SCALE = 1e5
+PRICE_SCALE = 1000
+RATING_SCALE = 20
+
+
+def quantize(stations):
+    """Stations (id, latitude, longitude, price_per_kwh, available) -> integer snapshot columns"""
+    return pd.DataFrame({
+        'id': stations['id'].to_numpy(dtype='<u4'),
+        'lat': np.rint(stations['latitude'].to_numpy(dtype=float) * COORD_SCALE).astype('<i4'),
+        'lng': np.rint(stations['longitude'].to_numpy(dtype=float) * COORD_SCALE).astype('<i4'),
+        'price': np.clip(np.rint(stations['price_per_kwh'].to_numpy(dtype=float) * PRICE_SCALE),
+                         0, np.iinfo(np.uint16).max).astype('<u2'),
+        'rating': np.zeros(len(stations), dtype='u1'),
+        'available': stations['available'].fillna(True).to_numpy(dtype=bool),
+    })
+
+
+def encode(columns, version):
+    """Serialize quantized columns (sorted by id) into the snapshot format"""
+    ids = columns['id'].to_numpy(dtype='<u4')
+    body = b''.join([
+        np.diff(ids, prepend=np.uint32(0)).astype('<u4').tobytes(),
+        columns['lat'].to_numpy(dtype='<i4').tobytes(),
+        columns['lng'].to_numpy(dtype='<i4').tobytes(),
+        columns['price'].to_numpy(dtype='<u2').tobytes(),
+        columns['rating'].to_numpy(dtype='u1').tobytes(),
+        np.packbits(columns['available'].to_numpy(dtype=bool)).tobytes(),
+    ])
+    return HEADER.pack(MAGIC, FORMAT_VERSION, version, len(ids)) + zlib.compress(body, 9)
+
+
+def decode(data):
+    """Parse a snapshot into ``(version, quantized columns)``"""
+    magic, fmt, version, count = HEADER.unpack_from(data)
+    if magic != MAGIC or fmt != FORMAT_VERSION:
+        raise ValueError('Not a version 1 station snapshot')
+    body = zlib.decompress(data[HEADER.size:])
+    offset = 0
+
+    def take(dtype, n=count):
+        nonlocal offset
+        array = np.frombuffer(body, dtype=dtype, count=n, offset=offset)
+        offset += array.nbytes
+        return array
+
+    ids = np.cumsum(take('<u4'), dtype='<u4')
+    lat, lng, price, rating = take('<i4'), take('<i4'), take('<u2'), take('u1')
+    available = np.unpackbits(take('u1', (count + 7) // 8), count=count).astype(bool)
+    return version, pd.DataFrame({'id': ids, 'lat': lat, 'lng': lng, 'price': price,
+                                  'rating': rating, 'available': available})
+
+
+def read_snapshot(path):
+    """Decode a snapshot file into ``(version, DataFrame)`` with real units"""
+    with open(path, 'rb') as f:
+        version, columns = decode(f.read())
+    return version, pd.DataFrame({
+        'id': columns['id'].astype('int64'),
+        'lat': columns['lat'] / COORD_SCALE,
+        'lng': columns['lng'] / COORD_SCALE,
+        'price_per_kwh': columns['price'] / PRICE_SCALE,
+        'rating': np.where(columns['rating'] > 0, columns['rating'] / RATING_SCALE, np.nan),
+        'available': columns['available'],
+    })
+
+
+def station_ratings(reviews):
+    """Mean rating per station from a reviews frame (station_id, rating), quantized"""
+    means = reviews.groupby('station_id')['rating'].mean()
+    return pd.Series(np.rint(means.to_numpy() * RATING_SCALE).astype('u1'), index=means.index)
+
+
+def merge_changes(previous, changed):
+    """Replace stations in ``previous`` with their ``changed`` rows; deleted rows drop out"""
+    kept = previous[~np.isin(previous['id'].to_numpy(), changed['id'].to_numpy())]
+    live = changed[changed['deleted_at'].isna()]
+    update = quantize(live)
+    # A changed station keeps its previous rating until ratings are recomputed
+    prior = previous.set_index('id')['rating']
+    update['rating'] = prior.reindex(update['id'].to_numpy()).fillna(0).to_numpy(dtype='u1')
+    merged = pd.concat([kept, update], ignore_index=True)
+    return merged.sort_values('id', kind='stable').reset_index(drop=True)
+
+
+def load_changes(bind, since):
+    """Stations with ``version > since``; a full load of live stations when ``since`` is None"""
+    columns = 'id, latitude, longitude, price_per_kwh, available, deleted_at, version'
+    if since is None:
+        return pd.read_sql(f'SELECT {columns} FROM stations WHERE deleted_at IS NULL ORDER BY id', bind)
+    return pd.read_sql(f'SELECT {columns} FROM stations WHERE version > {int(since)} ORDER BY id', bind)
+
+
+def _write_atomic(path, data, mode='wb'):
+    tmp = f'{path}.tmp'
+    with open(tmp, mode) as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def write_snapshot(out_dir, columns, version):
+    """Write the snapshot file and point the manifest at it; returns the manifest"""
+    os.makedirs(out_dir, exist_ok=True)
+    data = encode(columns, version)
+    etag = hashlib.sha256(data).hexdigest()[:16]
+    name = f'stations-v{version}-{etag}.evxs'
+    _write_atomic(os.path.join(out_dir, name), data)
+    manifest = {'version': version, 'file': name, 'etag': etag,
+                'count': len(columns), 'bytes': len(data), 'built_at': int(time.time()),
+                'format': FORMAT_VERSION}
+    _write_atomic(os.path.join(out_dir, MANIFEST), json.dumps(manifest), mode='w')
+    snapshots = sorted((f for f in os.listdir(out_dir) if f.endswith('.evxs')),
+                       key=lambda f: os.path.getmtime(os.path.join(out_dir, f)), reverse=True)
+    for stale in snapshots[KEEP_SNAPSHOTS:]:
+        os.remove(os.path.join(out_dir, stale))
+    return manifest
+
+
+def build(bind, out_dir, reviews=None, full=False):
+    """Build or incrementally refresh the snapshot; returns the manifest, or None if unchanged.
+
+    ``bind`` is an engine or connection to read stations from.
+    """
+    manifest = None if full else read_manifest(out_dir)
+    previous = None
+    if manifest is not None:
+        with open(os.path.join(out_dir, manifest['file']), 'rb') as f:
+            _, previous = decode(f.read())
+
+    changed = load_changes(bind, manifest['version'] if manifest else None)
+    if previous is not None and changed.empty and reviews is None:
+        return None
+    version = int(changed['version'].max()) if changed['version'].notna().any() else 0
+    if manifest is not None:
+        version = max(version, manifest['version'])
+
+    if previous is None:
+        columns = quantize(changed).sort_values('id', kind='stable').reset_index(drop=True)
+    else:
+        columns = merge_changes(previous, changed)
+    if reviews is not None:
+        ratings = station_ratings(reviews)
+        columns['rating'] = ratings.reindex(columns['id'].to_numpy()).fillna(0).to_numpy(dtype='u1')
+    return write_snapshot(out_dir, columns, version)
+
+
+def main(argv=None):
+    from backend.app import create_app, db
+
+    parser = argparse.ArgumentParser(description='Build the offline station snapshot')
+    parser.add_argument('--out-dir', default=os.getenv('STATION_SNAPSHOT_DIR', 'snapshots'))
+    parser.add_argument('--reviews', help='CSV of reviews (station_id, rating) for the rating column')
+    parser.add_argument('--full', action='store_true', help='Rebuild from scratch instead of incrementally')
+    parser.add_argument('--interval', type=float, help='Keep running, refreshing every INTERVAL seconds')
+    args = parser.parse_args(argv)
+
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    reviews = pd.read_csv(args.reviews, usecols=['station_id', 'rating']) if args.reviews else None
+    with app.app_context():
+        while True:
+            manifest = build(db.engine, args.out_dir, reviews=reviews, full=args.full)
+            if manifest:
+                print(f"Wrote {manifest['count']} stations (version {manifest['version']}, "
+                      f"{manifest['bytes']} bytes) to {os.path.join(args.out_dir, manifest['file'])}")
+            if not args.interval:
+                break
+            reviews, args.full = None, False
+            time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,6 @@
 # Contains database models for the application
 
 from .user import User
-from .demo import Car, Station
+from .demo import Car, GeocodeCacheEntry, Station, VehicleProfile
 
-__all__ = ['User', 'Car', 'Station']
+__all__ = ['User', 'Car', 'Station', 'GeocodeCacheEntry', 'VehicleProfile']
@@ -1,3 +1,9 @@
+from datetime import datetime
+from itertools import chain
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
 from backend.app import db
 
 class Car(db.Model):
@@ -21,5 +27,67 @@ class Station(db.Model):
     longitude = db.Column(db.Float, nullable=False)
     price_per_kwh = db.Column(db.Float, nullable=False)
     available = db.Column(db.Boolean, default=True)
+    # Bitmask of services.connectors.CONNECTORS, and the fastest connector's power
+    connectors = db.Column(db.Integer, nullable=False, default=0)
+    max_kw = db.Column(db.Float)
+    # Delta sync: every insert/update takes the next version; deleted_at marks a tombstone
+    version = db.Column(db.Integer, unique=True, index=True)
+    deleted_at = db.Column(db.DateTime)
 
     user = db.relationship('User', backref=db.backref('stations', lazy=True))
+
+    def soft_delete(self):
+        """Keep the row as a tombstone so delta-sync clients see the delete"""
+        self.deleted_at = datetime.utcnow()
+        self.available = False
+
+    @classmethod
+    def changes_since(cls, version, limit=500):
+        """Stations, tombstones included, changed after ``version`` (oldest first)"""
+        return cls.query.filter(cls.version > version).order_by(cls.version).limit(limit).all()
+
+@event.listens_for(Session, 'before_flush')
+def _assign_station_versions(session, flush_context, instances):
+    """Stamp new and modified stations with versions above the current maximum.
+
+    Concurrent writers that pick the same version fail on the unique index
+    rather than silently skipping a change.
+    """
+    changed = [obj for obj in chain(session.new, session.dirty)
+               if isinstance(obj, Station) and (obj in session.new or session.is_modified(obj))]
+    if not changed:
+        return
+    current = session.execute(select(func.max(Station.version))).scalar() or 0
+    for offset, station in enumerate(changed, 1):
+        station.version = current + offset
+
+class GeocodeCacheEntry(db.Model):
+    """Normalized address -> coordinates, shared by all workers (see services/geocoding.py)"""
+    __tablename__ = 'geocode_cache'
+    address_key = db.Column(db.String(255), primary_key=True)
+    # Both NULL when the provider found nothing, so unknown addresses are not re-queried until expiry
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    provider = db.Column(db.String(50), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+class VehicleProfile(db.Model):
+    """Connectors a make/model can charge from (bitmask, see services/connectors.py) and its peak kW"""
+    __tablename__ = 'vehicle_profiles'
+    __table_args__ = (db.Index('ix_vehicle_profiles_make_model', 'make', 'model'),)
+    id = db.Column(db.Integer, primary_key=True)
+    # Lowercase, matched against Car.make/Car.model case-insensitively
+    make = db.Column(db.String(50), nullable=False)
+    model = db.Column(db.String(50), nullable=False)
+    # Model years covered; NULL leaves that end open
+    year_from = db.Column(db.Integer)
+    year_to = db.Column(db.Integer)
+    connectors = db.Column(db.Integer, nullable=False)
+    max_kw = db.Column(db.Float)
+
+    @classmethod
+    def for_car(cls, car):
+        """The narrowest profile covering the car's model year, or None"""
+        profiles = cls.query.filter_by(make=car.make.strip().lower(), model=car.model.strip().lower()).all()
+        matching = [p for p in profiles if (p.year_from or 0) <= car.year <= (p.year_to or 9999)]
+        return min(matching, key=lambda p: (p.year_to or 9999) - (p.year_from or 0), default=None)
@@ -1,20 +1,52 @@
+import hmac
+import math
 import os
 import stripe
-from flask import Blueprint, jsonify, request, g
+from flask import Blueprint, Response, current_app, jsonify, request, g, send_file, stream_with_context
 from flask_login import login_required, current_user
 import logging
+import numpy as np
+from services.payments import StripeService
+from services import station_events
+from services.batch import run_batch, unbatchable
+from services.change_feed import ChangeFeed
+from services.connectors import MAX_KW, connector_fields, connector_mask
+from services.forecast import ForecastCache
+from services.geocoding import GeocodingError
+from services.pricing import PricingEngine, StationArrays
+from services.ranking import StationRanker, vehicle_weights
+from services.snapshot_manifest import read_manifest
+from services.station_import import BOUNDS, StationImporter, import_format, number_field, read_rows
+from services.telemetry import RESOLUTIONS, TelemetryStore, parse_readings, valid_rows
+from backend.app.database import read_replica
+from backend.app.negotiation import api_response
+from models import Car, VehicleProfile
 api_bp = Blueprint('api', __name__)
+stripe_service = StripeService()
+
+@api_bp.record
+def record_api(setup_state):
+    """Create the shared Stripe client, pricing engine, ranker and forecast cache when blueprint is registered"""
+    stripe_service.init_app(setup_state.app)
+    setup_state.app.extensions['pricing'] = PricingEngine.from_config(setup_state.app.config)
+    setup_state.app.extensions['ranking'] = StationRanker.from_config(setup_state.app.config)
+    setup_state.app.extensions['forecast'] = ForecastCache()
+    if setup_state.app.config.get('TELEMETRY_DIR'):
+        global telemetry_store
+        telemetry_store = TelemetryStore(setup_state.app.config['TELEMETRY_DIR'])
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 # --- User Dashboard Endpoint (Mock) ---
 @api_bp.route('/dashboard')
 @login_required
 def user_dashboard():
-    user_id = current_user.id
+    return api_response(build_dashboard(current_user.id, bookings_db, reviews_db), "bookings", "payments", "reviews")
+
+def build_dashboard(user_id, bookings, reviews):
+    """Bookings, payments and reviews for one user"""
     # Mock bookings for this user
     user_bookings = [
-        b for b in bookings_db if b["user_id"] == user_id
+        b for b in bookings if b["user_id"] == user_id
     ]
     # Mock payments for this user (simulate one per booking)
     user_payments = [
@@ -29,17 +61,22 @@ def user_dashboard():
     ]
     # Mock reviews for this user
     user_reviews = [
-        r for r in reviews_db if r["user_id"] == user_id
+        r for r in reviews if r["user_id"] == user_id
     ]
-    return jsonify({
+    return {
         "bookings": user_bookings,
         "payments": user_payments,
         "reviews": user_reviews
-    })
+    }
 
 # In-memory mock for stations (per host)
 stations_db = []
 station_id_counter = [1]
+# Versioned log of station writes for delta sync (GET /api/stations/changes)
+station_feed = ChangeFeed()
+# Host pricing rules: host_id -> {"multiplier", "min_price", "max_price"}
+host_pricing_rules = {}
+pricing_rules_version = [0]
 
 # --- Host Station Management Endpoints ---
 @api_bp.route('/host/stations', methods=['POST'])
@@ -47,27 +84,121 @@ station_id_counter = [1]
 def create_station():
     data = request.get_json() or {}
     required = ["name", "lat", "lng", "address"]
+    try:
+        data.update(connector_fields(data))
+        data.update(_number_fields(data))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if "address" in data and "lat" not in data:
+        error = _geocode_into(data)
+        if error:
+            return error
     if not all(k in data for k in required):
         return jsonify({"error": "Missing station data"}), 400
-    sid = station_id_counter[0]
-    station_id_counter[0] += 1
-    station = {
-        "station_id": sid,
-        "host_id": current_user.id if hasattr(current_user, 'id') else 1,
-        "name": data["name"],
-        "lat": data["lat"],
-        "lng": data["lng"],
-        "address": data["address"]
-    }
-    stations_db.append(station)
-    return jsonify(station), 201
+    host_id = current_user.id if hasattr(current_user, 'id') else 1
+    return jsonify(_insert_stations([data], host_id)[0]), 201
+
+def _number_fields(data):
+    """lat, lng and price_per_kwh present in a station payload, as checked floats; raises ValueError"""
+    if ("lat" in data) != ("lng" in data):
+        raise ValueError("lat and lng must be given together")
+    return {key: number_field(data[key], key, *BOUNDS[key]) for key in BOUNDS if key in data}
+
+def _insert_stations(rows, host_id):
+    """Add validated stations; a batch becomes visible to readers in one step"""
+    created = []
+    for data in rows:
+        sid = station_id_counter[0]
+        station_id_counter[0] += 1
+        station = {
+            "station_id": sid,
+            "host_id": host_id,
+            "name": data["name"],
+            "lat": data["lat"],
+            "lng": data["lng"],
+            "address": data["address"],
+            "available": bool(data.get("available", True))
+        }
+        if "price_per_kwh" in data:
+            station["price_per_kwh"] = float(data["price_per_kwh"])
+        for key in ("connectors", "max_kw"):
+            if key in data:
+                station[key] = data[key]
+        created.append(station)
+    stations_db.extend(created)
+    for station in created:
+        station["version"] = station_feed.record(station["station_id"], station)
+        station_events.publish("station.created", station["station_id"], station["lat"], station["lng"],
+                               station=station)
+    return created
+
+@api_bp.route('/host/stations/import', methods=['POST'])
+@login_required
+def import_stations():
+    """Bulk-create stations from a streamed CSV or NDJSON upload (see services/station_import.py)"""
+    fmt = import_format(request.mimetype, request.args.get("format"))
+    if fmt is None:
+        return jsonify({"error": "Send text/csv or application/x-ndjson (or ?format=csv|ndjson)"}), 415
+    host_id = current_user.id if hasattr(current_user, 'id') else 1
+    config = current_app.config
+    importer = StationImporter(
+        lambda batch: _insert_stations(batch, host_id),
+        existing=[s for s in stations_db if s["host_id"] == host_id],
+        geocoder=current_app.extensions.get("geocoding"),
+        batch_size=config["IMPORT_BATCH_SIZE"], duplicate_meters=config["IMPORT_DUPLICATE_METERS"],
+        max_rows=config["IMPORT_MAX_ROWS"], max_errors=config["IMPORT_MAX_ERRORS"])
+    summary = importer.run(read_rows(request.stream, fmt))
+    logger.info("Imported %d of %d station rows for host %s", summary["created"], summary["rows"], host_id)
+    return jsonify(summary)
+
+def _geocode_into(data):
+    """Fill data["lat"]/["lng"] from data["address"]; returns an error response, or None.
+
+    Without a configured geocoder the data is left alone, so the usual
+    missing-field validation applies.
+    """
+    service = current_app.extensions.get("geocoding")
+    if service is None or not isinstance(data["address"], str):
+        return None
+    try:
+        coords = service.lookup(data["address"])
+    except GeocodingError:
+        logger.exception("Geocoding failed")
+        return jsonify({"error": "Geocoding is temporarily unavailable; send lat and lng"}), 503
+    if coords is None:
+        return jsonify({"error": "Address could not be geocoded"}), 422
+    data["lat"], data["lng"] = coords
+    return None
+
+@api_bp.route('/host/geocode', methods=['POST'])
+@login_required
+def geocode_addresses():
+    """Coordinates for up to GEOCODE_MAX_ADDRESSES addresses: ``{"addresses": ["1 Main St, ...", ...]}``"""
+    service = current_app.extensions.get("geocoding")
+    if service is None:
+        return jsonify({"error": "Geocoding is not configured"}), 404
+    addresses = (request.get_json(silent=True) or {}).get("addresses")
+    if not isinstance(addresses, list) or not addresses or not all(isinstance(a, str) for a in addresses):
+        return jsonify({"error": "addresses must be a non-empty list of strings"}), 400
+    if len(addresses) > current_app.config["GEOCODE_MAX_ADDRESSES"]:
+        return jsonify({"error": f"At most {current_app.config['GEOCODE_MAX_ADDRESSES']} addresses per request"}), 413
+    try:
+        found = service.lookup_many(addresses)
+    except GeocodingError:
+        logger.exception("Geocoding failed")
+        return jsonify({"error": "Geocoding is temporarily unavailable"}), 503
+    results = []
+    for address, coords in zip(addresses, found):
+        lat, lng = coords or (None, None)
+        results.append({"address": address, "lat": lat, "lng": lng})
+    return api_response({"results": results}, "results")
 
 @api_bp.route('/host/stations', methods=['GET'])
 @login_required
 def list_host_stations():
     host_id = current_user.id if hasattr(current_user, 'id') else 1
     host_stations = [s for s in stations_db if s["host_id"] == host_id]
-    return jsonify({"stations": host_stations})
+    return api_response({"stations": host_stations}, "stations")
 
 @api_bp.route('/host/stations/<int:station_id>', methods=['PUT'])
 @login_required
@@ -77,9 +208,23 @@ def update_station(station_id):
     if not station:
         return jsonify({"error": "Station not found"}), 404
     data = request.get_json() or {}
+    try:
+        station_fields = connector_fields(data)
+        station_fields.update(_number_fields(data))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if "address" in data and "lat" not in data:
+        error = _geocode_into(data)
+        if error:
+            return error
+    station.update(station_fields)
     for k in ["name", "lat", "lng", "address"]:
-        if k in data:
+        if k in data and k not in station_fields:
             station[k] = data[k]
+    if "available" in data:
+        station["available"] = bool(data["available"])
+    station["version"] = station_feed.record(station_id, station)
+    station_events.publish("station.updated", station_id, station["lat"], station["lng"], station=station)
     return jsonify(station)
 
 @api_bp.route('/host/stations/<int:station_id>', methods=['DELETE'])
@@ -89,11 +234,134 @@ def delete_station(station_id):
     idx = next((i for i, s in enumerate(stations_db) if s["station_id"] == station_id and s["host_id"] == host_id), None)
     if idx is None:
         return jsonify({"error": "Station not found"}), 404
-    stations_db.pop(idx)
+    station = stations_db.pop(idx)
+    station_feed.record(station_id)
+    station_events.publish("station.deleted", station_id, station["lat"], station["lng"])
     return '', 204
 
+@api_bp.route('/stations/changes')
+@read_replica
+def station_changes():
+    """Stations created, updated or deleted since ?since=<version> (tombstones have "deleted": true).
+
+    Pass the ``epoch`` from the previous response back; when it no longer
+    matches (the log was recreated) the response has ``"reset": true`` and
+    starts from version 0, so the client should drop its cache.
+    """
+    try:
+        since = int(request.args.get("since", 0))
+        limit = min(int(request.args.get("limit", 500)), 5000)
+    except ValueError:
+        return jsonify({"error": "since and limit must be integers"}), 400
+    if since < 0 or limit < 1:
+        return jsonify({"error": "since and limit must be positive"}), 400
+    reset = request.args.get("epoch", station_feed.epoch) != station_feed.epoch
+    if reset:
+        since = 0
+    changes, version, has_more = station_feed.since(since, limit)
+    return api_response({
+        "epoch": station_feed.epoch,
+        "version": version,
+        "reset": reset,
+        "has_more": has_more,
+        "changes": [{"station_id": c["id"], "version": c["version"], "deleted": c["deleted"],
+                     "station": c["item"]} for c in changes],
+    })
+
+# --- Dynamic pricing (see services/pricing.py) ---
+@api_bp.route('/pricing/quote')
+@read_replica
+def pricing_quote():
+    """Effective prices for ?stations=... and/or ?bbox=... at ?at=<ISO time> (default: now)"""
+    try:
+        stations, bbox = _station_filter()
+        at = datetime.fromisoformat(request.args["at"].replace("Z", "+00:00")) if "at" in request.args else datetime.now(timezone.utc)
+    except ValueError:
+        return jsonify({"error": "Invalid stations, bbox or at parameter"}), 400
+    if not stations and bbox is None:
+        return jsonify({"error": "Missing stations or bbox parameter"}), 400
+    if at.tzinfo is None:
+        at = at.replace(tzinfo=timezone.utc)
+    engine = current_app.extensions["pricing"]
+    bucket_start, arrays, prices = _quote(at)
+    mask = arrays.region(stations, bbox)
+    quotes = [
+        {"station_id": sid, "price_per_kwh": price, "base_price": base, "occupancy": round(occ, 3), "time_band_multiplier": band}
+        for sid, price, base, occ, band in zip(arrays.ids[mask].tolist(), prices["price"][mask].tolist(),
+                                               arrays.base[mask].tolist(), prices["occupancy"][mask].tolist(),
+                                               prices["band"][mask].tolist())
+    ]
+    start = datetime.fromtimestamp(bucket_start, timezone.utc)
+    return api_response({
+        "bucket_start": start.isoformat(),
+        "valid_until": datetime.fromtimestamp(bucket_start + engine.bucket_seconds, timezone.utc).isoformat(),
+        "quotes": quotes,
+    }, "quotes")
+
+def _quote(at):
+    """Cached prices and occupancy for every station in the pricing bucket containing ``at``"""
+    forecast_version, forecast = current_app.extensions["forecast"].get(current_app.config["DEMAND_FORECAST_PATH"])
+    # Any station write, new booking, rule change or new forecast moves the key, so cached prices are never stale
+    key = (station_feed.epoch, station_feed.version, len(bookings_db), pricing_rules_version[0], forecast_version)
+    return current_app.extensions["pricing"].quote(key, at.timestamp(), _pricing_inputs,
+                                                   forecast.window_mean if forecast else None)
+
+def _pricing_inputs():
+    default_base = current_app.config["PRICING_DEFAULT_BASE_PRICE"]
+    located = _located_stations()
+    stations = StationArrays(
+        [s["station_id"] for s in located], [s["host_id"] for s in located],
+        [s["lat"] for s in located], [s["lng"] for s in located],
+        [s.get("price_per_kwh", default_base) for s in located])
+    priced = [b for b in bookings_db if isinstance(b["station_id"], int)]
+    bookings = (np.array([b["station_id"] for b in priced], dtype=np.int64),
+                np.array([b["start_time"].timestamp() for b in priced]),
+                np.array([b["end_time"].timestamp() for b in priced]))
+    return stations, bookings, dict(host_pricing_rules)
+
+@api_bp.route('/host/pricing', methods=['GET', 'PUT'])
+@login_required
+def host_pricing():
+    """The current host's pricing rule: multiplier plus optional min_price / max_price"""
+    host_id = current_user.id if hasattr(current_user, 'id') else 1
+    if request.method == 'PUT':
+        data = request.get_json() or {}
+        try:
+            rule = {k: float(data[k]) for k in ("multiplier", "min_price", "max_price") if data.get(k) is not None}
+        except (TypeError, ValueError):
+            return jsonify({"error": "Pricing values must be numbers"}), 400
+        if rule.get("multiplier", 1.0) <= 0 or rule.get("min_price", 0.0) > rule.get("max_price", float("inf")):
+            return jsonify({"error": "Invalid pricing rule"}), 400
+        host_pricing_rules[host_id] = rule
+        pricing_rules_version[0] += 1
+    return jsonify({"host_id": host_id, "rule": host_pricing_rules.get(host_id, {})})
+
+@api_bp.route('/stations/snapshot')
+def station_snapshot():
+    """The offline catalogue built by ``jobs.station_snapshot``, revalidated by ETag"""
+    directory = current_app.config["STATION_SNAPSHOT_DIR"]
+    manifest = read_manifest(directory)
+    if manifest is None:
+        return jsonify({"error": "No station snapshot has been built"}), 404
+    response = send_file(os.path.join(directory, manifest["file"]), mimetype="application/vnd.evx.station-snapshot",
+                         etag=manifest["etag"], conditional=True, max_age=current_app.config["STATION_SNAPSHOT_MAX_AGE"])
+    response.cache_control.public = True
+    response.headers["X-Snapshot-Version"] = str(manifest["version"])
+    return response
+
 from datetime import datetime, timezone
 bookings_db = []  # In-memory mock for bookings
+telemetry_store = TelemetryStore()  # Disk-backed when TELEMETRY_DIR is set (see record_api)
+
+def reset_stores():
+    """Swap in empty in-memory stores (O(1); views look the globals up per call)"""
+    global stations_db, station_id_counter, bookings_db, reviews_db, review_id_counter, station_feed
+    global host_pricing_rules, pricing_rules_version, telemetry_store, reviews_version
+    stations_db, bookings_db, reviews_db = [], [], []
+    telemetry_store = TelemetryStore()
+    station_feed = ChangeFeed()
+    host_pricing_rules, pricing_rules_version = {}, [0]
+    station_id_counter, review_id_counter, reviews_version = [1], [1], [0]
 
 # --- Booking Endpoints ---
 @api_bp.route('/bookings/', methods=['POST'])
@@ -107,10 +375,8 @@ def create_booking():
         end = datetime.fromisoformat(data["end_time"].replace("Z", "+00:00"))
     except Exception:
         return jsonify({"error": "Invalid date format"}), 400
-    # Check for overlap
-    for b in bookings_db:
-        if b["station_id"] == data["station_id"] and not (end <= b["start_time"] or start >= b["end_time"]):
-            return jsonify({"error": "Booking time overlaps with existing booking"}), 409
+    if find_booking_conflict(bookings_db, data["station_id"], start, end):
+        return jsonify({"error": "Booking time overlaps with existing booking"}), 409
     booking_id = len(bookings_db) + 1
     booking = {
         "booking_id": booking_id,
@@ -121,17 +387,20 @@ def create_booking():
         "status": "confirmed"
     }
     bookings_db.append(booking)
+    location = next((s for s in stations_db if s["station_id"] == data["station_id"]), {})
+    station_events.publish("booking.created", data["station_id"], location.get("lat"), location.get("lng"),
+                           start=start.isoformat(), end=end.isoformat())
     return jsonify({"booking_id": booking_id, "status": "confirmed"}), 201
 
-@api_bp.route('/stations/<int:station_id>/availability')
-def station_availability(station_id):
-    date_str = request.args.get("date")
-    if not date_str:
-        return jsonify({"error": "Missing date parameter"}), 400
-    try:
-        date = datetime.fromisoformat(date_str)
-    except Exception:
-        return jsonify({"error": "Invalid date format"}), 400
+def find_booking_conflict(bookings, station_id, start, end):
+    """First booking at the station overlapping [start, end), or None"""
+    for b in bookings:
+        if b["station_id"] == station_id and not (end <= b["start_time"] or start >= b["end_time"]):
+            return b
+    return None
+
+def available_slots(bookings, station_id, date):
+    """Free 1hr slots between 8am and 8pm UTC on the given day"""
     # Mock: 8am-8pm, 1hr slots, remove slots with bookings
     slots = [
         (date.replace(hour=h, minute=0, second=0, microsecond=0, tzinfo=timezone.utc),
@@ -141,13 +410,134 @@ def station_availability(station_id):
     available = []
     for start, end in slots:
         overlap = False
-        for b in bookings_db:
+        for b in bookings:
             if b["station_id"] == station_id and not (end <= b["start_time"] or start >= b["end_time"]):
                 overlap = True
                 break
         if not overlap:
             available.append({"start": start.isoformat(), "end": end.isoformat()})
-    return jsonify({"available_slots": available})
+    return available
+
+@api_bp.route('/stations/<int:station_id>/availability')
+@read_replica
+def station_availability(station_id):
+    date_str = request.args.get("date")
+    if not date_str:
+        return jsonify({"error": "Missing date parameter"}), 400
+    try:
+        date = datetime.fromisoformat(date_str)
+    except Exception:
+        return jsonify({"error": "Invalid date format"}), 400
+    slots = available_slots(bookings_db, station_id, date)
+    # Predicted busy-ness per slot from the offline forecast table (jobs/demand_forecast.py)
+    _, forecast = current_app.extensions["forecast"].get(current_app.config["DEMAND_FORECAST_PATH"])
+    predicted = forecast.at(station_id, [datetime.fromisoformat(s["start"]).timestamp() for s in slots]) if forecast else None
+    if predicted is not None:
+        for slot, occupancy in zip(slots, predicted.tolist()):
+            slot["predicted_occupancy"] = occupancy
+    return jsonify({"available_slots": slots})
+
+# --- Charging-session telemetry (see services/telemetry.py) ---
+@api_bp.route('/telemetry', methods=['POST'])
+def ingest_telemetry():
+    """Batched meter readings from chargers: ``{"readings": [[booking_id, ts, kwh, kw], ...]}``
+
+    ``ts`` is epoch seconds and ``kwh`` the session's cumulative meter reading.
+    Invalid rows are counted and skipped rather than failing the batch.
+    """
+    token = current_app.config["TELEMETRY_INGEST_TOKEN"]
+    if not token or not hmac.compare_digest(request.headers.get("X-Telemetry-Token", "").encode(), token.encode()):
+        return jsonify({"error": "Not found"}), 404
+    data = request.get_json(silent=True) or {}
+    try:
+        booking, ts, kwh, kw = parse_readings(data.get("readings"), current_app.config["TELEMETRY_MAX_BATCH"])
+    except OverflowError as e:
+        return jsonify({"error": str(e)}), 413
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    valid = valid_rows(booking, ts, kwh, kw, len(bookings_db))
+    accepted = int(valid.sum())
+    if accepted:
+        telemetry_store.append(booking[valid], ts[valid], kwh[valid], kw[valid])
+    return jsonify({"accepted": accepted, "rejected": len(valid) - accepted}), 202
+
+@api_bp.route('/bookings/<int:booking_id>/telemetry')
+@login_required
+def booking_telemetry(booking_id):
+    """Downsampled usage for one session: ?resolution=1m (default) or 1h"""
+    resolution = request.args.get("resolution", "1m")
+    if resolution not in RESOLUTIONS:
+        return jsonify({"error": f"resolution must be one of {', '.join(RESOLUTIONS)}"}), 400
+    booking = bookings_db[booking_id - 1] if 1 <= booking_id <= len(bookings_db) else None
+    if booking is None:
+        return jsonify({"error": "Booking not found"}), 404
+    station = next((s for s in stations_db if s["station_id"] == booking["station_id"]), {})
+    if current_user.id not in (booking["user_id"], station.get("host_id")):
+        return jsonify({"error": "Forbidden"}), 403
+    points = [
+        {"start": datetime.fromtimestamp(start, timezone.utc).isoformat(), "readings": count,
+         "energy_kwh": round(energy, 4), "avg_kw": round(avg_kw, 3), "max_kw": round(max_kw, 3)}
+        for start, count, energy, avg_kw, max_kw in telemetry_store.series(booking_id, resolution)
+    ]
+    return api_response({"booking_id": booking_id, "resolution": resolution, "points": points}, "points")
+
+# --- Live availability (server-sent events, see services/station_events.py) ---
+@api_bp.route('/stations/<int:station_id>/availability/stream')
+@unbatchable
+def station_availability_stream(station_id):
+    return _event_stream(stations=[station_id])
+
+@api_bp.route('/stations/stream')
+@unbatchable
+def stations_stream():
+    """Events for ?stations=1,2,3 and/or a map viewport ?bbox=south,west,north,east"""
+    try:
+        stations, bbox = _station_filter()
+    except ValueError:
+        return jsonify({"error": "Invalid stations or bbox parameter"}), 400
+    if not stations and bbox is None:
+        return jsonify({"error": "Missing stations or bbox parameter"}), 400
+    return _event_stream(stations=stations, bbox=bbox)
+
+def _station_filter():
+    """Parse ?stations=1,2,3 and ?bbox=south,west,north,east; raises ValueError"""
+    stations = [int(s) for s in request.args.get("stations", "").split(",") if s]
+    bbox = request.args.get("bbox")
+    if bbox is not None:
+        bbox = tuple(float(v) for v in bbox.split(","))
+        if len(bbox) != 4:
+            raise ValueError("bbox needs south,west,north,east")
+    return stations, bbox
+
+def _event_stream(stations=None, bbox=None):
+    # Subscribe before responding so nothing published meanwhile is missed
+    broker = current_app.extensions["station_events"]
+    subscription = broker.subscribe(stations=stations, bbox=bbox)
+    frames = station_events.stream(broker, subscription, current_app.config["SSE_HEARTBEAT_SECONDS"],
+                                   current_app.config["SSE_MAX_STREAM_SECONDS"], current_app.json.dumps)
+    response = Response(stream_with_context(frames), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    # The generator's own cleanup never runs if it is not iterated (HEAD, client gone before the first frame)
+    response.call_on_close(lambda: broker.unsubscribe(subscription))
+    return response
+
+# --- Batch endpoint (see services/batch.py) ---
+@api_bp.route('/batch', methods=['POST'])
+@unbatchable
+def batch():
+    """Run several GET calls in one round trip.
+
+    Body: ``{"requests": [{"id": "slots", "method": "GET", "path": "/api/stations/1/availability?date=..."}]}``
+    """
+    data = request.get_json(silent=True) or {}
+    subrequests = data.get("requests")
+    if not isinstance(subrequests, list) or not subrequests or not all(isinstance(s, dict) for s in subrequests):
+        return jsonify({"error": "requests must be a non-empty list of objects"}), 400
+    if len(subrequests) > current_app.config["BATCH_MAX_REQUESTS"]:
+        return jsonify({"error": f"At most {current_app.config['BATCH_MAX_REQUESTS']} requests per batch"}), 400
+    responses = run_batch(current_app._get_current_object(), request.environ, subrequests,
+                          current_app.config["BATCH_MAX_WORKERS"])
+    return api_response({"responses": responses})
 
 @api_bp.route('/health')
 def health_check():
@@ -163,6 +553,7 @@ def get_profile():
 
 # --- New endpoint: Nearby Charging Stations ---
 @api_bp.route('/nearby_stations')
+@read_replica
 def nearby_stations():
     """Return a list of nearby charging stations for given lat/lng (mock data)"""
     lat = request.args.get('lat')
@@ -170,10 +561,12 @@ def nearby_stations():
     try:
         if lat is None or lng is None:
             raise ValueError("Missing lat/lng parameters")
-        lat = float(lat)
-        lng = float(lng)
-    except (ValueError, TypeError):
+        lat = number_field(lat, "lat", *BOUNDS["lat"])
+        lng = number_field(lng, "lng", *BOUNDS["lng"])
+    except ValueError:
         return jsonify({"error": "Invalid or missing lat/lng parameters"}), 400
+    if request.args.get("rank") == "best":
+        return _ranked_stations(lat, lng)
 
     # Mock data for demonstration
     stations = [
@@ -192,7 +585,76 @@ def nearby_stations():
             "address": "456 Oak Ave, Cityville"
         }
     ]
-    return jsonify({"stations": stations})
+    return api_response({"stations": stations}, "stations")
+
+def _ranked_stations(lat, lng):
+    """Best stations around lat/lng for the driver: ?radius_km=10&k=10&car_id=<own car>.
+
+    Filters: ``connectors=ccs1,nacs`` (any of), ``compatible=true`` (the
+    car's connector profile) and ``min_kw=50``.
+    """
+    try:
+        radius_km = float(request.args.get("radius_km", current_app.config["RANKING_RADIUS_KM"]))
+        k = int(request.args.get("k", 10))
+        car_id = int(request.args["car_id"]) if "car_id" in request.args else None
+        min_kw = float(request.args.get("min_kw", 0))
+        connectors = connector_mask(request.args["connectors"]) if "connectors" in request.args else 0
+    except ValueError:
+        return jsonify({"error": "Invalid radius_km, k, car_id, min_kw or connectors parameter"}), 400
+    if not 0 < radius_km <= current_app.config["RANKING_MAX_RADIUS_KM"] or not 1 <= k <= current_app.config["RANKING_MAX_K"]:
+        return jsonify({"error": "radius_km or k out of range"}), 400
+    if not 0 <= min_kw <= MAX_KW:
+        return jsonify({"error": f"min_kw must be between 0 and {MAX_KW}"}), 400
+    car = None
+    if current_user.is_authenticated:
+        cars = Car.query.filter_by(user_id=current_user.id)
+        car = cars.filter_by(id=car_id).first() if car_id is not None else cars.order_by(Car.id).first()
+    if car_id is not None and car is None:
+        return jsonify({"error": "Car not found"}), 404
+    if request.args.get("compatible", "").lower() in ("1", "true"):
+        profile = VehicleProfile.for_car(car) if car else None
+        if profile is None:
+            return jsonify({"error": "No connector profile for this car; pass connectors= instead"}), 422
+        connectors = connectors & profile.connectors if connectors else profile.connectors
+        if not connectors:
+            return api_response({"stations": [], "car_id": car.id}, "stations")
+
+    ranker = current_app.extensions["ranking"]
+    catalogue = ranker.catalogue((station_feed.epoch, station_feed.version, reviews_version[0]), _ranking_inputs)
+    # Current effective prices and occupancy come from the (cached) pricing engine
+    _, priced, prices = _quote(datetime.now(timezone.utc))
+    positions, distance, price, scores = ranker.rank(catalogue, lat, lng, radius_km, k,
+                                                     (priced.ids, prices["price"], prices["occupancy"]),
+                                                     vehicle_weights(car, ranker.weights), connectors, min_kw)
+
+    by_id = {s["station_id"]: s for s in stations_db}
+    ranked = []
+    for sid, dist, price, rating, available, station_score in zip(
+            catalogue.ids[positions].tolist(), distance.tolist(), price.tolist(),
+            catalogue.rating[positions].tolist(), catalogue.available[positions].tolist(), scores.tolist()):
+        station = by_id.get(sid)
+        if station is None:  # deleted since the catalogue was built
+            continue
+        ranked.append({"id": sid, "name": station["name"], "lat": station["lat"], "lng": station["lng"],
+                       "address": station["address"], "distance_km": round(dist, 3), "price_per_kwh": price,
+                       "rating": None if rating != rating else round(rating, 2), "available": available,
+                       "connectors": station.get("connectors", []), "max_kw": station.get("max_kw"),
+                       "score": round(station_score, 4)})
+    return api_response({"stations": ranked, "car_id": car.id if car else None}, "stations")
+
+def _located_stations():
+    """Stations with numeric coordinates (ones written before validation may hold anything)"""
+    return [s for s in stations_db
+            if all(isinstance(s[k], (int, float)) and math.isfinite(s[k]) for k in ("lat", "lng"))]
+
+def _ranking_inputs():
+    located = _located_stations()
+    rated = [r for r in reviews_db if isinstance(r.get("rating"), (int, float))]
+    return ([s["station_id"] for s in located], [s["lat"] for s in located], [s["lng"] for s in located],
+            [s.get("available", True) for s in located],
+            ([r["station_id"] for r in rated], [r["rating"] for r in rated]),
+            [connector_mask(s.get("connectors", ())) for s in located],
+            [s.get("max_kw", 0.0) for s in located])
 
 # --- Stripe Payment Endpoints ---
 @api_bp.route('/payments/checkout', methods=['POST'])
@@ -201,24 +663,15 @@ def create_checkout_session():
     required = ["booking_id", "amount", "currency", "success_url", "cancel_url"]
     if not all(k in data for k in required):
         return jsonify({"error": "Missing or invalid data"}), 400
-    # In real use, set your Stripe secret key from env
-    stripe.api_key = os.getenv("STRIPE_SECRET_KEY", "sk_test_dummy")
     try:
-        session = stripe.checkout.Session.create(
-            payment_method_types=["card"],
-            line_items=[{
-                "price_data": {
-                    "currency": data["currency"],
-                    "product_data": {"name": f"Booking {data['booking_id']}"},
-                    "unit_amount": data["amount"]
-                },
-                "quantity": 1
-            }],
-            mode="payment",
-            success_url=data["success_url"],
-            cancel_url=data["cancel_url"]
+        checkout_url = stripe_service.create_checkout_session(
+            data["booking_id"],
+            data["amount"],
+            data["currency"],
+            data["success_url"],
+            data["cancel_url"]
         )
-        return jsonify({"checkout_url": session.url})
+        return jsonify({"checkout_url": checkout_url})
     except Exception as e:
         logger.exception("Error creating Stripe checkout session.")
         return jsonify({"error": "Failed to create checkout session."}), 400
@@ -244,6 +697,7 @@ def stripe_webhook():
 # --- Ratings and Reviews (In-memory mock) ---
 reviews_db = []
 review_id_counter = [1]
+reviews_version = [0]  # Bumped on every review write; keys the ranking catalogue
 
 @api_bp.route('/bookings/<int:booking_id>/review', methods=['POST'])
 @login_required
@@ -266,12 +720,16 @@ def add_review(booking_id):
         "review": data["review"]
     }
     reviews_db.append(review)
+    reviews_version[0] += 1
     return jsonify(review), 201
 
 @api_bp.route('/stations/<int:station_id>/reviews', methods=['GET'])
+@read_replica
 def get_reviews_for_station(station_id):
-    station_reviews = [r for r in reviews_db if r["station_id"] == station_id]
-    return jsonify({"reviews": station_reviews})
+    return api_response({"reviews": reviews_for_station(reviews_db, station_id)}, "reviews")
+
+def reviews_for_station(reviews, station_id):
+    return [r for r in reviews if r["station_id"] == station_id]
 
 @api_bp.route('/reviews/<int:review_id>', methods=['PUT'])
 @login_required
@@ -284,6 +742,7 @@ def update_review(review_id):
         review["rating"] = data["rating"]
     if "review" in data:
         review["review"] = data["review"]
+    reviews_version[0] += 1
     return jsonify(review)
 
 @api_bp.route('/reviews/<int:review_id>', methods=['DELETE'])
@@ -293,9 +752,11 @@ def delete_review(review_id):
     if idx is None:
         return jsonify({"error": "Review not found"}), 404
     reviews_db.pop(idx)
+    reviews_version[0] += 1
     return '', 204
 
 @api_bp.route('/reviews/<int:review_id>', methods=['GET'])
+@read_replica
 def get_review(review_id):
     review = next((r for r in reviews_db if r["review_id"] == review_id), None)
     if not review:
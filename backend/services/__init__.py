@@ -2,5 +2,7 @@
 # Contains business logic and external service integrations
 
 from .oauth import OAuthService, GoogleOAuthProvider, FacebookOAuthProvider, LinkedInOAuthProvider
+from .payments import StripeService, CheckoutSessionCache, checkout_idempotency_key
 
-__all__ = ['OAuthService', 'GoogleOAuthProvider', 'FacebookOAuthProvider', 'LinkedInOAuthProvider']
+__all__ = ['OAuthService', 'GoogleOAuthProvider', 'FacebookOAuthProvider', 'LinkedInOAuthProvider',
+           'StripeService', 'CheckoutSessionCache', 'checkout_idempotency_key']
@@ -0,0 +1,94 @@
+"""Dispatch several read-only API calls from one ``POST /api/batch`` request.
+
+Each sub-request is matched against the URL map and its view function is
+called directly inside a request context built from the outer request's
+environ, with the same cookies, headers and already-loaded user. It does
+not go through a WSGI round trip, session save, or the per-request hooks:
+the outer batch request is what gets measured and logged. Sub-requests are
+independent GETs, so they run concurrently on a small thread pool
+(``BATCH_MAX_WORKERS``).
+
+Views that cannot be batched (streams, the batch endpoint itself) are
+marked with :func:`unbatchable`.
+"""
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from flask import g
+from flask_login import current_user
+from werkzeug.exceptions import HTTPException
+
+logger = logging.getLogger(__name__)
+
+_executors = {}
+
+
+def unbatchable(view):
+    """Mark a view as not callable through ``/api/batch``"""
+    view.batchable = False
+    return view
+
+
+def _executor(max_workers):
+    if max_workers not in _executors:
+        _executors[max_workers] = ThreadPoolExecutor(max_workers, thread_name_prefix='evx-batch')
+    return _executors[max_workers]
+
+
+def _error(status, message):
+    return {'status': status, 'body': {'error': message}}
+
+
+def _sub_environ(environ, path, query):
+    environ = dict(environ)
+    environ.pop('werkzeug.request', None)
+    # Sub-responses are embedded in the batch body, which is encoded as a whole
+    environ.update({'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query,
+                    'CONTENT_LENGTH': '0', 'wsgi.input': io.BytesIO(), 'HTTP_ACCEPT': 'application/json'})
+    environ.pop('CONTENT_TYPE', None)
+    return environ
+
+
+def dispatch(app, environ, user, sub):
+    """Run one sub-request ``{"method": "GET", "path": "/api/..."}``; returns status and body"""
+    method = str(sub.get('method', 'GET')).upper()
+    if method != 'GET':
+        return _error(405, 'Only GET requests can be batched')
+    target = urlsplit(str(sub.get('path', '')))
+    adapter = app.url_map.bind('localhost')
+    try:
+        endpoint, view_args = adapter.match(target.path, method)
+    except HTTPException as exc:
+        return _error(exc.code, exc.description)
+    view = app.view_functions[endpoint]
+    if not getattr(view, 'batchable', True):
+        return _error(400, f'{target.path} cannot be batched')
+
+    with app.request_context(_sub_environ(environ, target.path, target.query)):
+        # Reuse the user loaded by the outer request (Flask-Login caches it on g)
+        g._login_user = user
+        try:
+            response = app.make_response(view(**view_args))
+        except HTTPException as exc:
+            response = exc.get_response()
+        except Exception:
+            logger.exception('Batched request to %s failed', target.path)
+            return _error(500, 'Internal server error')
+        body = response.get_json(silent=True) if response.is_json else response.get_data(as_text=True)
+        return {'status': response.status_code, 'body': body}
+
+
+def run_batch(app, environ, subrequests, max_workers):
+    """Dispatch ``subrequests`` concurrently; results keep the request order and ids"""
+    user = current_user._get_current_object()
+
+    def run(sub):
+        result = dispatch(app, environ, user, sub)
+        result['id'] = sub.get('id')
+        return result
+
+    if max_workers <= 1 or len(subrequests) == 1:
+        return [run(sub) for sub in subrequests]
+    return list(_executor(max_workers).map(run, subrequests))
@@ -0,0 +1,63 @@
+"""EV connector types as bits, for compatibility filtering.
+
+A station stores the connectors it offers as one small integer (bit ``i``
+set = ``CONNECTORS[i]``). A vehicle profile (``models.VehicleProfile``)
+stores the connectors a car can charge from the same way. "Compatible with
+my car" is then ``station & car != 0`` and "at least 50 kW" a comparison,
+so ranking filters its candidate arrays with two vectorized expressions
+instead of joining rows.
+
+Bits are part of the stored format: new connectors are only ever appended.
+"""
+import re
+
+CONNECTORS = ('j1772', 'type2', 'ccs1', 'ccs2', 'chademo', 'nacs', 'gbt')
+BITS = {name: 1 << i for i, name in enumerate(CONNECTORS)}
+MAX_KW = 1000
+ALIASES = {'type1': 'j1772', 'mennekes': 'type2', 'ccs': 'ccs1', 'tesla': 'nacs', 'j3400': 'nacs', 'gb/t': 'gbt'}
+
+
+def connector_mask(value):
+    """Bitmask from connector names, as a list or a ``,``/``;``-separated string; raises ValueError"""
+    if isinstance(value, str):
+        names = re.split(r'[,;|]', value)
+    elif isinstance(value, (list, tuple)) and all(isinstance(name, str) for name in value):
+        names = value
+    else:
+        raise ValueError('connectors must be a list of connector names')
+    mask = 0
+    for name in names:
+        name = name.strip().lower()
+        if not name:
+            continue
+        name = ALIASES.get(name, name)
+        if name not in BITS:
+            raise ValueError(f"Unknown connector '{name}' (expected one of {', '.join(CONNECTORS)})")
+        mask |= BITS[name]
+    return mask
+
+
+def connector_names(mask):
+    """Connector names for a bitmask, in ``CONNECTORS`` order"""
+    return [name for name in CONNECTORS if mask & BITS[name]]
+
+
+def connector_fields(data):
+    """Validated ``connectors`` (names) and ``max_kw`` (None if blank) present in a station payload.
+
+    Raises ValueError.
+    """
+    fields = {}
+    if 'connectors' in data:
+        fields['connectors'] = connector_names(connector_mask(data['connectors'] or ''))
+    if 'max_kw' in data:
+        max_kw = data['max_kw']
+        if max_kw is not None and max_kw != '':
+            try:
+                max_kw = float(max_kw)
+            except (TypeError, ValueError):
+                raise ValueError('max_kw must be a number')
+            if not 0 < max_kw <= MAX_KW:
+                raise ValueError(f'max_kw must be between 0 and {MAX_KW}')
+        fields['max_kw'] = max_kw if max_kw != '' else None
+    return fields
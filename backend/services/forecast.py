@@ -0,0 +1,80 @@
+"""Read side of the occupancy forecasts written by ``jobs/demand_forecast.py``.
+
+The table holds, per station, the predicted booked percentage of each hour
+of the week. Requests only index into it; the file is re-read when its
+modification time changes, so a fresh nightly run is picked up without a
+restart.
+"""
+import os
+import threading
+
+import numpy as np
+
+HOURS_PER_WEEK = 168
+
+
+def hour_of_week(ts):
+    """Hour of the week (0 = Monday 00:00 UTC) for epoch seconds"""
+    # 1970-01-01 was a Thursday, 72 hours into its week
+    return ((np.floor(np.asarray(ts, dtype=float) / 3600).astype(np.int64) + 72) % HOURS_PER_WEEK)
+
+
+class ForecastTable:
+    """Station -> predicted occupancy per hour of the week"""
+
+    __slots__ = ('station_id', 'row', 'occupancy', 'as_of')
+
+    def __init__(self, station_id, row, occupancy, as_of):
+        self.station_id = station_id
+        self.row = row
+        self.occupancy = occupancy
+        self.as_of = float(as_of)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as archive:
+            return cls(archive['station_id'], archive['row'], archive['occupancy'], archive['as_of'])
+
+    def rows(self, station_ids):
+        """Table row per station, -1 for stations without a forecast"""
+        station_ids = np.asarray(station_ids, dtype=np.int64)
+        if len(self.station_id) == 0:
+            return np.full(len(station_ids), -1)
+        pos = np.minimum(np.searchsorted(self.station_id, station_ids), len(self.station_id) - 1)
+        return np.where(self.station_id[pos] == station_ids, self.row[pos], -1)
+
+    def at(self, station_id, ts):
+        """Predicted occupancy (0-1) of one station at each epoch-second time, or None if unknown"""
+        row = int(self.rows([station_id])[0])
+        if row < 0:
+            return None
+        return self.occupancy[row, hour_of_week(ts)] / 100.0
+
+    def window_mean(self, station_ids, start, end):
+        """Mean predicted occupancy over ``[start, end)`` per station (0 without a forecast)"""
+        rows = self.rows(station_ids)
+        hours = hour_of_week(np.arange(start - start % 3600, end, 3600))
+        mean = self.occupancy[:, hours].mean(axis=1) / 100.0 if len(self.occupancy) else np.zeros(0)
+        return np.where(rows >= 0, mean[np.maximum(rows, 0)] if len(mean) else 0.0, 0.0)
+
+
+class ForecastCache:
+    """The newest table at a path, reloaded when the file changes"""
+
+    def __init__(self):
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        """The table at ``path`` as ``(version, table)``, or ``(None, None)`` if there is none"""
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except (OSError, TypeError):
+            return None, None
+        with self._lock:
+            cached = self._loaded.get(path)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, ForecastTable.load(path))
+            with self._lock:
+                self._loaded[path] = cached
+        return cached
@@ -0,0 +1,257 @@
+"""Address geocoding with a two-tier cache.
+
+Hosts may create stations with just an ``address``. Lookups go through:
+
+1. an in-process LRU (``GEOCODE_CACHE_SIZE`` entries, ``GEOCODE_CACHE_TTL``
+   seconds),
+2. the ``geocode_cache`` table (shared by every worker and restart),
+3. the configured backend, which is only asked for the misses of a whole
+   batch at once.
+
+Keys are normalized addresses (case, whitespace, punctuation and common
+street suffixes), so "12 Main Street" and "12 main st." share an entry.
+"Not found" answers are cached too, so a bad row in an import is not
+retried on every upload.
+
+``GEOCODER`` selects the backend as ``module:Class``. Without it, Google's
+Geocoding API is used if ``GOOGLE_MAPS_API_KEY`` is set; otherwise geocoding
+is off and stations need explicit coordinates. ``LocalGeocoder`` is a
+deterministic stand-in for development and tests.
+"""
+import hashlib
+import importlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import requests
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from services.metrics import GEOCODE_LOOKUPS, outbound_call
+
+SUFFIXES = {
+    'street': 'st', 'avenue': 'ave', 'road': 'rd', 'boulevard': 'blvd', 'drive': 'dr', 'lane': 'ln',
+    'court': 'ct', 'place': 'pl', 'highway': 'hwy', 'parkway': 'pkwy', 'suite': 'ste',
+    'north': 'n', 'south': 's', 'east': 'e', 'west': 'w',
+}
+QUERY_CHUNK = 500
+
+
+class GeocodingError(Exception):
+    """The backend failed (as opposed to finding nothing); results are not cached"""
+
+
+def normalize_address(address):
+    """Cache key for an address: casefolded, unpunctuated, suffixes abbreviated"""
+    words = re.sub(r'[^\w\s]', ' ', address.casefold()).split()
+    return ' '.join(SUFFIXES.get(word, word) for word in words)[:255]
+
+
+class LocalGeocoder:
+    """Deterministic stand-in: ``known`` addresses, else a stable point derived from the address.
+
+    ``calls`` counts backend round trips so tests can assert on caching.
+    """
+
+    name = 'local'
+
+    def __init__(self, known=None, bounds=((25.0, 49.0), (-124.0, -67.0))):
+        self.known = {normalize_address(a): coords for a, coords in (known or {}).items()}
+        self.bounds = bounds
+        self.calls = 0
+
+    @classmethod
+    def from_config(cls, config):
+        return cls()
+
+    def geocode(self, keys):
+        self.calls += 1
+        return [self.known.get(key) or self._point(key) for key in keys]
+
+    def _point(self, key):
+        if not key:
+            return None
+        digest = hashlib.sha256(key.encode()).digest()
+        (lat_lo, lat_hi), (lng_lo, lng_hi) = self.bounds
+        fraction = lambda chunk: int.from_bytes(chunk, 'big') / 2 ** 32
+        return (round(lat_lo + (lat_hi - lat_lo) * fraction(digest[:4]), 6),
+                round(lng_lo + (lng_hi - lng_lo) * fraction(digest[4:8]), 6))
+
+
+class GoogleGeocoder:
+    """Google Geocoding API; it has no batch call, so a batch runs ``workers`` requests at a time"""
+
+    name = 'google'
+    URL = 'https://maps.googleapis.com/maps/api/geocode/json'
+
+    def __init__(self, api_key, timeout=5, workers=4):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.workers = workers
+        self.session = requests.Session()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config['GOOGLE_MAPS_API_KEY'], timeout=config.get('GEOCODE_TIMEOUT', 5))
+
+    def geocode(self, keys):
+        if len(keys) <= 1:
+            return [self._geocode_one(key) for key in keys]
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(keys))) as pool:
+            return list(pool.map(self._geocode_one, keys))
+
+    @outbound_call('google', 'geocode')
+    def _geocode_one(self, key):
+        try:
+            response = self.session.get(self.URL, params={'address': key, 'key': self.api_key}, timeout=self.timeout)
+            response.raise_for_status()
+            data = response.json()
+        except (requests.RequestException, ValueError) as e:
+            raise GeocodingError(str(e))
+        if data.get('status') == 'ZERO_RESULTS':
+            return None
+        if data.get('status') != 'OK':
+            raise GeocodingError(data.get('error_message') or data.get('status', 'unknown error'))
+        location = data['results'][0]['geometry']['location']
+        return location['lat'], location['lng']
+
+
+def load_backend(config):
+    """Instantiate ``GEOCODER`` (``module:Class``), Google with an API key, or None"""
+    path = config.get('GEOCODER')
+    if not path:
+        return GoogleGeocoder.from_config(config) if config.get('GOOGLE_MAPS_API_KEY') else None
+    module, _, name = path.partition(':')
+    return getattr(importlib.import_module(module), name).from_config(config)
+
+
+class GeocodingService:
+    """Cached, batched lookups in front of a backend"""
+
+    def __init__(self, backend, cache_size=10000, ttl=30 * 86400, batch_size=100):
+        self.backend = backend
+        self.cache_size = cache_size
+        self.ttl = ttl
+        self.batch_size = batch_size
+        self._memory = OrderedDict()  # key -> (coords, expires_at epoch seconds)
+        self._lock = threading.Lock()
+
+    def lookup(self, address):
+        """``(lat, lng)`` for one address, or None if it could not be found"""
+        return self.lookup_many([address])[0]
+
+    def lookup_many(self, addresses):
+        """Coordinates (or None) for each address, in order; at most one backend call per batch"""
+        keys = [normalize_address(a) for a in addresses]
+        found = self._from_memory(set(keys))
+        missing = [k for k in dict.fromkeys(keys) if k not in found]
+        if missing:
+            found.update(self._from_database(missing))
+            missing = [k for k in missing if k not in found]
+        if missing:
+            found.update(self._from_backend(missing))
+        return [found.get(k) for k in keys]
+
+    def _from_memory(self, keys):
+        now = time.time()
+        hits = {}
+        with self._lock:
+            for key in keys:
+                entry = self._memory.get(key)
+                if entry is not None and entry[1] > now:
+                    self._memory.move_to_end(key)
+                    hits[key] = entry[0]
+        GEOCODE_LOOKUPS.labels('memory').inc(len(hits))
+        return hits
+
+    def _remember(self, results, expires_at):
+        with self._lock:
+            for key, coords in results.items():
+                self._memory[key] = (coords, expires_at)
+                self._memory.move_to_end(key)
+            while len(self._memory) > self.cache_size:
+                self._memory.popitem(last=False)
+
+    def _from_database(self, keys):
+        from models import GeocodeCacheEntry
+
+        now = datetime.utcnow()
+        hits, expires = {}, {}
+        for i in range(0, len(keys), QUERY_CHUNK):
+            rows = GeocodeCacheEntry.query.filter(
+                GeocodeCacheEntry.address_key.in_(keys[i:i + QUERY_CHUNK]),
+                GeocodeCacheEntry.expires_at > now).all()
+            for row in rows:
+                hits[row.address_key] = None if row.latitude is None else (row.latitude, row.longitude)
+                expires[row.address_key] = row.expires_at
+        for key, coords in hits.items():
+            # Promoted entries keep the expiry the database gave them
+            self._remember({key: coords}, time.time() + (expires[key] - now).total_seconds())
+        GEOCODE_LOOKUPS.labels('database').inc(len(hits))
+        return hits
+
+    def _from_backend(self, keys):
+        from backend.app import db
+        from backend.app.database import separate_transaction
+
+        results = {}
+        for i in range(0, len(keys), self.batch_size):
+            batch = keys[i:i + self.batch_size]
+            results.update(zip(batch, self.backend.geocode(batch)))
+        GEOCODE_LOOKUPS.labels('backend').inc(len(results))
+
+        expires_at = datetime.utcnow() + timedelta(seconds=self.ttl)
+        rows = [{'address_key': key, 'latitude': coords[0] if coords else None,
+                 'longitude': coords[1] if coords else None, 'provider': self.backend.name, 'expires_at': expires_at}
+                for key, coords in results.items()]
+        # Its own transaction: the caller's session is neither committed nor needed to keep the entries
+        with separate_transaction(db.engine) as connection:
+            for i in range(0, len(rows), QUERY_CHUNK):
+                upsert(connection, rows[i:i + QUERY_CHUNK])
+        self._remember(results, time.time() + self.ttl)
+        return results
+
+
+def upsert(connection, rows):
+    """Insert cache rows, overwriting existing keys; safe when another worker writes the same key"""
+    from models import GeocodeCacheEntry
+
+    table = GeocodeCacheEntry.__table__
+    dialect = connection.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        statement = insert(table).values(rows)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.address_key],
+            set_={name: statement.excluded[name] for name in ('latitude', 'longitude', 'provider', 'expires_at')}))
+        return
+    for row in rows:
+        try:
+            with connection.begin_nested():
+                connection.execute(table.insert().values(row))
+        except IntegrityError:
+            connection.execute(table.update().where(table.c.address_key == row['address_key']).values(row))
+
+
+class Geocoding:
+    """Flask extension: ``app.extensions['geocoding']`` is a GeocodingService, or None when off"""
+
+    def __init__(self, app=None):
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('GEOCODER', None)
+        app.config.setdefault('GOOGLE_MAPS_API_KEY', None)
+        app.config.setdefault('GEOCODE_CACHE_SIZE', 10000)
+        app.config.setdefault('GEOCODE_CACHE_TTL', 30 * 86400)
+        app.config.setdefault('GEOCODE_BATCH_SIZE', 100)
+        backend = load_backend(app.config)
+        service = None
+        if backend is not None:
+            service = GeocodingService(backend, cache_size=app.config['GEOCODE_CACHE_SIZE'],
+                                       ttl=app.config['GEOCODE_CACHE_TTL'], batch_size=app.config['GEOCODE_BATCH_SIZE'])
+        app.extensions['geocoding'] = service
@@ -0,0 +1,154 @@
+"""Prometheus instrumentation for the Flask app.
+
+Records per-route latency, in-flight requests, response sizes, status
+codes, database queries per request and the latency of outbound calls to
+Stripe and the OAuth providers. Metrics are exposed at ``/metrics``.
+
+Under gunicorn with several workers, set ``PROMETHEUS_MULTIPROC_DIR`` to an
+empty, writable directory (``gunicorn.conf.py`` prepares it) so every
+worker writes its samples there and ``/metrics`` aggregates all of them.
+"""
+import functools
+import os
+import time
+from contextlib import contextmanager
+
+from flask import Response, g, request
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge,
+                               Histogram, generate_latest, multiprocess)
+
+from services import query_counter
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+REQUEST_LATENCY = Histogram(
+    'evx_http_request_duration_seconds', 'HTTP request latency',
+    ['blueprint', 'endpoint', 'method'], buckets=LATENCY_BUCKETS)
+REQUEST_COUNT = Counter(
+    'evx_http_requests_total', 'HTTP requests by status code',
+    ['blueprint', 'endpoint', 'method', 'status'])
+REQUESTS_IN_PROGRESS = Gauge(
+    'evx_http_requests_in_progress', 'HTTP requests currently being served',
+    ['blueprint', 'endpoint'], multiprocess_mode='livesum')
+RESPONSE_SIZE = Histogram(
+    'evx_http_response_size_bytes', 'HTTP response body size',
+    ['blueprint', 'endpoint'], buckets=SIZE_BUCKETS)
+REQUEST_DB_QUERIES = Histogram(
+    'evx_http_request_db_queries', 'Database queries issued per request',
+    ['blueprint', 'endpoint'], buckets=QUERY_BUCKETS)
+REQUEST_DB_TIME = Histogram(
+    'evx_http_request_db_seconds', 'Database time spent per request',
+    ['blueprint', 'endpoint'], buckets=LATENCY_BUCKETS)
+LOG_RECORDS_DROPPED = Counter(
+    'evx_log_records_dropped_total', 'Log records dropped because the logging queue was full')
+SSE_SUBSCRIBERS = Gauge(
+    'evx_sse_subscribers', 'Open server-sent event streams', multiprocess_mode='livesum')
+SSE_SUBSCRIBERS_DROPPED = Counter(
+    'evx_sse_subscribers_dropped_total', 'Event streams closed because the client fell behind')
+GEOCODE_LOOKUPS = Counter(
+    'evx_geocode_lookups_total', 'Geocoded addresses by where the answer came from', ['source'])
+OUTBOUND_LATENCY = Histogram(
+    'evx_outbound_request_duration_seconds', 'Latency of calls to external services',
+    ['service', 'operation', 'outcome'], buckets=LATENCY_BUCKETS)
+
+#: Callables ``(service, operation, start, duration, outcome)`` notified of
+#: every outbound call, e.g. the request profiler's timeline.
+OUTBOUND_LISTENERS = []
+
+
+@contextmanager
+def track_outbound(service, operation):
+    """Time a call to an external service (Stripe, OAuth providers, ...)"""
+    start = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'success'
+    finally:
+        duration = time.perf_counter() - start
+        OUTBOUND_LATENCY.labels(service, operation, outcome).observe(duration)
+        for listener in OUTBOUND_LISTENERS:
+            listener(service, operation, start, duration, outcome)
+
+
+def outbound_call(service, operation):
+    """Decorator form of :func:`track_outbound`"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with track_outbound(service, operation):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _route_labels():
+    if request.url_rule is None:
+        return '', 'unmatched'
+    return request.blueprint or '', request.endpoint or 'unmatched'
+
+
+class PrometheusMetrics:
+    """Flask extension wiring request hooks and the ``/metrics`` endpoint"""
+
+    def __init__(self, app=None):
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('METRICS_ENABLED', True)
+        app.config.setdefault('METRICS_PATH', '/metrics')
+        if not app.config['METRICS_ENABLED']:
+            return
+
+        query_counter.install_listeners()
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.add_url_rule(app.config['METRICS_PATH'], 'metrics', self.metrics_view)
+
+    @staticmethod
+    def _before_request():
+        blueprint, endpoint = _route_labels()
+        g._metrics_start = time.perf_counter()
+        REQUESTS_IN_PROGRESS.labels(blueprint, endpoint).inc()
+
+    @staticmethod
+    def _record(status, size=None):
+        blueprint, endpoint = _route_labels()
+        REQUEST_LATENCY.labels(blueprint, endpoint, request.method).observe(
+            time.perf_counter() - g._metrics_start)
+        REQUEST_COUNT.labels(blueprint, endpoint, request.method, str(status)).inc()
+        db_stats = query_counter.current_stats()
+        REQUEST_DB_QUERIES.labels(blueprint, endpoint).observe(db_stats.count)
+        REQUEST_DB_TIME.labels(blueprint, endpoint).observe(db_stats.total_time)
+        if size is not None:
+            RESPONSE_SIZE.labels(blueprint, endpoint).observe(size)
+        g._metrics_recorded = True
+
+    def _after_request(self, response):
+        if '_metrics_start' in g and request.endpoint != 'metrics':
+            size = None if response.is_streamed else response.calculate_content_length()
+            self._record(response.status_code, size)
+        return response
+
+    def _teardown_request(self, exc):
+        if '_metrics_start' not in g:
+            return
+        if not g.get('_metrics_recorded') and request.endpoint != 'metrics':
+            # after_request hooks are skipped for unhandled exceptions
+            self._record(500)
+        blueprint, endpoint = _route_labels()
+        REQUESTS_IN_PROGRESS.labels(blueprint, endpoint).dec()
+
+    @staticmethod
+    def metrics_view():
+        if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
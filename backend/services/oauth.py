@@ -5,6 +5,8 @@ from urllib.parse import urlencode
 from authlib.integrations.flask_client import OAuth
 from flask import current_app, url_for
 
+from services.metrics import outbound_call
+
 class OAuthProvider(ABC):
     """Abstract base class for OAuth providers"""
     
@@ -53,6 +55,7 @@ class GoogleOAuthProvider(OAuthProvider):
         
         return f"{self.AUTHORIZATION_URL}?{urlencode(params)}"
     
+    @outbound_call('google', 'access_token')
     def get_access_token(self, code, redirect_uri):
         """Exchange authorization code for access token"""
         data = {
@@ -67,6 +70,7 @@ class GoogleOAuthProvider(OAuthProvider):
         response.raise_for_status()
         return response.json()
     
+    @outbound_call('google', 'user_info')
     def get_user_info(self, access_token):
         """Get user information from Google"""
         headers = {'Authorization': f'Bearer {access_token}'}
@@ -106,6 +110,7 @@ class FacebookOAuthProvider(OAuthProvider):
         
         return f"{self.AUTHORIZATION_URL}?{urlencode(params)}"
     
+    @outbound_call('facebook', 'access_token')
     def get_access_token(self, code, redirect_uri):
         """Exchange authorization code for access token"""
         params = {
@@ -119,6 +124,7 @@ class FacebookOAuthProvider(OAuthProvider):
         response.raise_for_status()
         return response.json()
     
+    @outbound_call('facebook', 'user_info')
     def get_user_info(self, access_token):
         """Get user information from Facebook"""
         params = {
@@ -163,6 +169,7 @@ class LinkedInOAuthProvider(OAuthProvider):
         
         return f"{self.AUTHORIZATION_URL}?{urlencode(params)}"
     
+    @outbound_call('linkedin', 'access_token')
     def get_access_token(self, code, redirect_uri):
         """Exchange authorization code for access token"""
         data = {
@@ -178,6 +185,7 @@ class LinkedInOAuthProvider(OAuthProvider):
         response.raise_for_status()
         return response.json()
     
+    @outbound_call('linkedin', 'user_info')
     def get_user_info(self, access_token):
         """Get user information from LinkedIn"""
         headers = {'Authorization': f'Bearer {access_token}'}
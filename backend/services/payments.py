@@ -0,0 +1,115 @@
+import hashlib
+import json
+import threading
+import time
+
+import requests
+import stripe
+
+from services.metrics import track_outbound
+
+
+def checkout_idempotency_key(booking_id, amount, currency, success_url, cancel_url):
+    """Derive a stable Stripe idempotency key for a booking checkout.
+
+    Every parameter sent to Stripe is part of the key: Stripe rejects a
+    reused key whose request differs, and the cached session would redirect
+    to the old URLs.
+    """
+    raw = json.dumps([booking_id, amount, str(currency).lower(), success_url, cancel_url])
+    return "checkout-" + hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]
+
+
+class CheckoutSessionCache:
+    """Short-lived, thread-safe cache of checkout URLs keyed by idempotency key"""
+
+    def __init__(self, ttl=300, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached checkout URL for key, or None if missing/expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            url, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            return url
+
+    def set(self, key, url):
+        """Cache a checkout URL for the configured TTL"""
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._evict_expired()
+                if len(self._entries) >= self.max_entries:
+                    # Drop the oldest insertion to stay bounded
+                    self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = (url, time.monotonic() + self.ttl)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        for key in [k for k, (_, exp) in self._entries.items() if exp <= now]:
+            del self._entries[key]
+
+
+class StripeService:
+    """Service owning a single, connection-reusing Stripe client per app"""
+
+    def __init__(self, app=None):
+        self.client = None
+        self.cache = CheckoutSessionCache()
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Build the Stripe client once from app configuration"""
+        api_key = app.config.get('STRIPE_SECRET_KEY') or 'sk_test_dummy'
+        api_base = app.config.get('STRIPE_API_BASE')
+        http_client = stripe.RequestsClient(
+            timeout=app.config.get('STRIPE_TIMEOUT', 10),
+            session=requests.Session()
+        )
+        self.client = stripe.StripeClient(
+            api_key,
+            base_addresses={'api': api_base} if api_base else {},
+            max_network_retries=app.config.get('STRIPE_MAX_NETWORK_RETRIES', 2),
+            http_client=http_client
+        )
+        self.cache = CheckoutSessionCache(ttl=app.config.get('STRIPE_CHECKOUT_CACHE_TTL', 300))
+
+    def create_checkout_session(self, booking_id, amount, currency, success_url, cancel_url):
+        """Create (or reuse) a checkout session for a booking and return its URL"""
+        key = checkout_idempotency_key(booking_id, amount, currency, success_url, cancel_url)
+        cached_url = self.cache.get(key)
+        if cached_url:
+            return cached_url
+
+        with track_outbound('stripe', 'checkout_session_create'):
+            session = self.client.checkout.sessions.create(
+                params={
+                    "payment_method_types": ["card"],
+                    "line_items": [{
+                        "price_data": {
+                            "currency": currency,
+                            "product_data": {"name": f"Booking {booking_id}"},
+                            "unit_amount": amount
+                        },
+                        "quantity": 1
+                    }],
+                    "mode": "payment",
+                    "success_url": success_url,
+                    "cancel_url": cancel_url
+                },
+                options={"idempotency_key": key}
+            )
+        self.cache.set(key, session.url)
+        return session.url
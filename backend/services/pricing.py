@@ -0,0 +1,162 @@
+"""Vectorized dynamic pricing.
+
+Effective price per kWh for every station is computed in one NumPy pass::
+
+    price = clip(base * time_of_use[local_hour] * (1 + occupancy_weight * occupancy)
+                 * host_multiplier, host_min, host_max)
+
+- ``time_of_use`` is a 24-entry table built from ``(start_hour, end_hour,
+  multiplier)`` bands, indexed by each station's approximate local hour
+  (UTC offset = longitude / 15).
+- ``occupancy`` is the booked fraction of the next ``window_hours`` at each
+  station. It comes from one ``np.bincount`` over booking/window overlaps.
+- Host rules (multiplier, floor, ceiling) are set per host.
+- With a demand forecast (``jobs/demand_forecast.py``), occupancy is the
+  larger of the booked fraction and the predicted one, so stations that are
+  usually busy are priced up before they fill.
+
+Prices for the whole catalogue are cached per time bucket
+(``bucket_minutes``) and per version of the inputs, so map views only
+filter arrays that were already computed.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_TOU_BANDS = ((0, 6, 0.8), (6, 16, 1.0), (16, 21, 1.3), (21, 24, 1.0))
+
+
+def time_of_use_table(bands):
+    """24 hourly multipliers from ``(start_hour, end_hour, multiplier)`` bands (default 1.0)"""
+    table = np.ones(24)
+    for start, end, multiplier in bands:
+        table[int(start):int(end)] = multiplier
+    return table
+
+
+def local_hours(utc_hour, lng):
+    """Approximate local hour from longitude (15 degrees per hour)"""
+    return (utc_hour + np.rint(np.asarray(lng, dtype=float) / 15.0).astype(int)) % 24
+
+
+def occupancy(station_ids, booking_station, booking_start, booking_end, window_start, window_end):
+    """Booked fraction of ``[window_start, window_end)`` per station (times in epoch seconds).
+
+    ``station_ids`` must be sorted; bookings at unknown stations are ignored.
+    """
+    n = len(station_ids)
+    if n == 0 or len(booking_station) == 0:
+        return np.zeros(n)
+    # Only bookings overlapping the window need a station lookup
+    overlap = np.minimum(booking_end, window_end) - np.maximum(booking_start, window_start)
+    active = overlap > 0
+    station, overlap = booking_station[active], overlap[active]
+    pos = np.searchsorted(station_ids, station)
+    known = pos < n
+    known[known] = station_ids[pos[known]] == station[known]
+    booked = np.bincount(pos[known], weights=overlap[known], minlength=n)
+    return np.minimum(booked / float(window_end - window_start), 1.0)
+
+
+class StationArrays:
+    """Columnar view of the station catalogue, sorted by id"""
+
+    __slots__ = ('ids', 'host_ids', 'lat', 'lng', 'base')
+
+    def __init__(self, ids, host_ids, lat, lng, base):
+        order = np.argsort(ids, kind='stable')
+        self.ids = np.asarray(ids, dtype=np.int64)[order]
+        self.host_ids = np.asarray(host_ids, dtype=np.int64)[order]
+        self.lat = np.asarray(lat, dtype=float)[order]
+        self.lng = np.asarray(lng, dtype=float)[order]
+        self.base = np.asarray(base, dtype=float)[order]
+
+    def region(self, stations=None, bbox=None):
+        """Boolean mask of stations in ``stations`` and/or inside ``(south, west, north, east)``"""
+        mask = np.zeros(len(self.ids), dtype=bool)
+        if stations:
+            mask |= np.isin(self.ids, np.fromiter(stations, dtype=np.int64))
+        if bbox is not None:
+            south, west, north, east = bbox
+            mask |= (self.lat >= south) & (self.lat <= north) & (self.lng >= west) & (self.lng <= east)
+        return mask
+
+
+def host_rule_arrays(host_ids, rules):
+    """Per-station multiplier, floor and ceiling from ``{host_id: rule}``"""
+    multiplier = np.ones(len(host_ids))
+    floor = np.zeros(len(host_ids))
+    ceiling = np.full(len(host_ids), np.inf)
+    if rules:
+        hosts = np.array(sorted(rules), dtype=np.int64)
+        table = [rules[h] for h in hosts.tolist()]
+        pos = np.minimum(np.searchsorted(hosts, host_ids), len(hosts) - 1)
+        matched = hosts[pos] == host_ids
+        pos = pos[matched]
+        multiplier[matched] = np.array([r.get('multiplier', 1.0) for r in table])[pos]
+        floor[matched] = np.array([r.get('min_price') or 0.0 for r in table])[pos]
+        ceiling[matched] = np.array([r.get('max_price') or np.inf for r in table])[pos]
+    return multiplier, floor, ceiling
+
+
+class PricingEngine:
+    """Prices the whole catalogue per time bucket and caches the result"""
+
+    def __init__(self, bands=DEFAULT_TOU_BANDS, occupancy_weight=0.5, window_hours=4,
+                 bucket_minutes=15, cache_size=8):
+        self.time_of_use = time_of_use_table(bands)
+        self.occupancy_weight = occupancy_weight
+        self.window_seconds = int(window_hours * 3600)
+        self.bucket_seconds = int(bucket_minutes * 60)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(bands=config.get('PRICING_TOU_BANDS', DEFAULT_TOU_BANDS),
+                   occupancy_weight=config.get('PRICING_OCCUPANCY_WEIGHT', 0.5),
+                   window_hours=config.get('PRICING_WINDOW_HOURS', 4),
+                   bucket_minutes=config.get('PRICING_BUCKET_MINUTES', 15))
+
+    def bucket(self, at):
+        """Start of the pricing bucket containing ``at`` (epoch seconds)"""
+        return int(at) - int(at) % self.bucket_seconds
+
+    def price(self, stations, bookings, rules, bucket_start, forecast=None):
+        """Effective prices for every station; ``bookings`` is ``(station, start, end)`` arrays.
+
+        ``forecast(ids, start, end)`` optionally returns predicted occupancy per station.
+        """
+        window_end = bucket_start + self.window_seconds
+        occupied = occupancy(stations.ids, *bookings, bucket_start, window_end)
+        if forecast is not None:
+            occupied = np.maximum(occupied, forecast(stations.ids, bucket_start, window_end))
+        utc_hour = (bucket_start // 3600) % 24
+        band = self.time_of_use[local_hours(utc_hour, stations.lng)]
+        multiplier, floor, ceiling = host_rule_arrays(stations.host_ids, rules)
+        price = stations.base * band * (1.0 + self.occupancy_weight * occupied) * multiplier
+        return {'price': np.round(np.clip(price, floor, ceiling), 3), 'occupancy': occupied, 'band': band}
+
+    def quote(self, key, at, load, forecast=None):
+        """Cached prices for the bucket containing ``at``.
+
+        ``key`` identifies the inputs (catalogue, bookings, rules and
+        forecast versions). ``load()`` returns ``(stations, bookings, rules)``
+        and is only called on a cache miss. Returns ``(bucket_start, stations, prices)``.
+        """
+        bucket_start = self.bucket(at)
+        cache_key = (key, bucket_start)
+        with self._lock:
+            hit = self._cache.get(cache_key)
+            if hit is not None:
+                self._cache.move_to_end(cache_key)
+                return hit
+        stations, bookings, rules = load()
+        result = (bucket_start, stations, self.price(stations, bookings, rules, bucket_start, forecast))
+        with self._lock:
+            self._cache[cache_key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
@@ -0,0 +1,310 @@
+"""Opt-in sampling profiler and slow-request capture.
+
+When ``PROFILER_ENABLED`` is set, a background thread samples the Python
+stacks of threads that are serving requests every ``PROFILER_INTERVAL_MS``.
+Requests slower than ``PROFILER_SLOW_MS`` -- or requests to a route armed
+through ``POST /api/admin/profiler`` -- are written to ``PROFILER_DIR`` as:
+
+- ``<name>.folded``: collapsed stacks, open in https://www.speedscope.app
+  or feed to ``flamegraph.pl`` for a flame graph;
+- ``<name>.json``: request metadata and the SQL/outbound-call timeline.
+
+Only the newest ``PROFILER_MAX_FILES`` captures are kept.
+"""
+import fcntl
+import hmac
+import json
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from flask import abort, current_app, g, has_request_context, jsonify, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from services import metrics
+
+MAX_STACK_DEPTH = 128
+MAX_STATEMENT_LENGTH = 500
+
+
+class RequestProfile:
+    """Samples and timeline collected for one in-flight request"""
+
+    __slots__ = ('method', 'path', 'endpoint', 'started_at', 'start', 'samples',
+                 'timeline', 'targeted')
+
+    def __init__(self, method, path, endpoint, targeted=False):
+        self.method = method
+        self.path = path
+        self.endpoint = endpoint
+        self.started_at = datetime.now(timezone.utc)
+        self.start = time.perf_counter()
+        self.samples = Counter()
+        self.timeline = []
+        self.targeted = targeted
+
+    def add_span(self, kind, name, start, duration, **extra):
+        span = {'type': kind, 'name': name,
+                'start_ms': round((start - self.start) * 1000, 3),
+                'duration_ms': round(duration * 1000, 3)}
+        span.update(extra)
+        self.timeline.append(span)
+
+
+def collapse_stack(frame):
+    """Render a frame chain in collapsed ("folded") flame graph notation"""
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        name = getattr(code, 'co_qualname', code.co_name)
+        names.append(f"{name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler(threading.Thread):
+    """Daemon thread sampling the stacks of registered request threads"""
+
+    def __init__(self, interval):
+        super().__init__(name='evx-stack-sampler', daemon=True)
+        self.interval = interval
+        self.active = {}
+
+    def run(self):
+        own_id = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            if not self.active:
+                continue
+            frames = sys._current_frames()
+            for thread_id, profile in list(self.active.items()):
+                frame = frames.get(thread_id)
+                if frame is not None and thread_id != own_id:
+                    profile.samples[collapse_stack(frame)] += 1
+
+
+class ProfileTriggers:
+    """Route -> remaining-capture counts, shared by all workers via a locked file"""
+
+    def __init__(self, path, refresh_interval=1.0):
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self._armed = {}
+        self._checked_at = 0.0
+        self._mtime = None
+
+    def _locked(self, fn):
+        with open(self.path, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                raw = f.read()
+                triggers = json.loads(raw) if raw else {}
+                result, changed = fn(triggers)
+                if changed:
+                    f.seek(0)
+                    f.truncate()
+                    json.dump(triggers, f)
+                return result, triggers
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def arm(self, route, count):
+        def update(triggers):
+            if count > 0:
+                triggers[route] = count
+            else:
+                triggers.pop(route, None)
+            return None, True
+        _, triggers = self._locked(update)
+        self._armed = triggers
+        return triggers
+
+    def snapshot(self):
+        _, triggers = self._locked(lambda t: (None, False))
+        return triggers
+
+    def is_armed(self, route):
+        """Cheap check, re-reading the trigger file at most once per interval"""
+        now = time.monotonic()
+        if now - self._checked_at >= self.refresh_interval:
+            self._checked_at = now
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except FileNotFoundError:
+                mtime = None
+                self._armed = {}
+            if mtime is not None and mtime != self._mtime:
+                self._mtime = mtime
+                self._armed = self.snapshot()
+        return route in self._armed
+
+    def claim(self, route):
+        """Atomically consume one capture for route; True if one was left"""
+        def update(triggers):
+            remaining = triggers.get(route, 0)
+            if remaining <= 0:
+                return False, False
+            if remaining == 1:
+                del triggers[route]
+            else:
+                triggers[route] = remaining - 1
+            return True, True
+        claimed, triggers = self._locked(update)
+        self._armed = triggers
+        return claimed
+
+
+class ProfileWriter(threading.Thread):
+    """Writes captures off the request path and keeps the directory bounded"""
+
+    def __init__(self, directory, max_files):
+        super().__init__(name='evx-profile-writer', daemon=True)
+        self.directory = directory
+        self.max_files = max_files
+        self.queue = queue.SimpleQueue()
+
+    def run(self):
+        while True:
+            profile, duration = self.queue.get()
+            try:
+                self.write(profile, duration)
+            except OSError:
+                pass
+
+    def write(self, profile, duration):
+        stamp = profile.started_at.strftime('%Y%m%dT%H%M%S%f')
+        endpoint = (profile.endpoint or 'unmatched').replace('/', '_')
+        base = os.path.join(self.directory, f"{stamp}-{endpoint}-{int(duration * 1000)}ms")
+        with open(base + '.folded', 'w') as f:
+            for stack, count in profile.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        with open(base + '.json', 'w') as f:
+            json.dump({
+                'method': profile.method,
+                'path': profile.path,
+                'endpoint': profile.endpoint,
+                'started_at': profile.started_at.isoformat(),
+                'duration_ms': round(duration * 1000, 3),
+                'targeted': profile.targeted,
+                'samples': sum(profile.samples.values()),
+                'timeline': profile.timeline,
+            }, f, indent=2)
+        self.prune()
+
+    def prune(self):
+        captures = sorted(name[:-5] for name in os.listdir(self.directory) if name.endswith('.json'))
+        for base in captures[:max(0, len(captures) - self.max_files)]:
+            for suffix in ('.json', '.folded'):
+                try:
+                    os.remove(os.path.join(self.directory, base + suffix))
+                except FileNotFoundError:
+                    pass
+
+
+def _current_profile():
+    if has_request_context():
+        return g.get('_profile')
+    return None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_profile() is not None:
+        conn.info.setdefault('_evx_profile_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile()
+    starts = conn.info.get('_evx_profile_start')
+    if profile is not None and starts:
+        start = starts.pop()
+        profile.add_span('sql', statement[:MAX_STATEMENT_LENGTH], start,
+                         time.perf_counter() - start, executemany=executemany)
+
+
+def _record_outbound(service, operation, start, duration, outcome):
+    profile = _current_profile()
+    if profile is not None:
+        profile.add_span('outbound', f"{service}.{operation}", start, duration, outcome=outcome)
+
+
+class RequestProfiler:
+    """Flask extension for slow-request capture and on-demand route profiling"""
+
+    def __init__(self, app=None):
+        self.sampler = None
+        self.writer = None
+        self.triggers = None
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PROFILER_ENABLED', False)
+        app.config.setdefault('PROFILER_SLOW_MS', 1000)
+        app.config.setdefault('PROFILER_INTERVAL_MS', 10)
+        app.config.setdefault('PROFILER_DIR', os.path.join(tempfile.gettempdir(), 'evx-profiles'))
+        app.config.setdefault('PROFILER_MAX_FILES', 200)
+        app.config.setdefault('PROFILER_ADMIN_TOKEN', None)
+        if not app.config['PROFILER_ENABLED']:
+            return
+
+        directory = app.config['PROFILER_DIR']
+        os.makedirs(directory, exist_ok=True)
+        self.triggers = ProfileTriggers(os.path.join(directory, 'profiler-triggers'))
+        if self.sampler is None:
+            self.sampler = StackSampler(app.config['PROFILER_INTERVAL_MS'] / 1000)
+            self.sampler.start()
+        if self.writer is None or self.writer.directory != directory:
+            self.writer = ProfileWriter(directory, app.config['PROFILER_MAX_FILES'])
+            self.writer.start()
+
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        if _record_outbound not in metrics.OUTBOUND_LISTENERS:
+            metrics.OUTBOUND_LISTENERS.append(_record_outbound)
+
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+        app.add_url_rule('/api/admin/profiler', 'profiler_admin', self.admin_view,
+                         methods=['GET', 'POST'])
+
+    def _before_request(self):
+        if request.endpoint == 'profiler_admin':
+            return
+        targeted = self.triggers.is_armed(request.path) and self.triggers.claim(request.path)
+        profile = RequestProfile(request.method, request.path, request.endpoint, targeted)
+        g._profile = profile
+        self.sampler.active[threading.get_ident()] = profile
+
+    def _teardown_request(self, exc):
+        profile = g.pop('_profile', None)
+        if profile is None:
+            return
+        self.sampler.active.pop(threading.get_ident(), None)
+        duration = time.perf_counter() - profile.start
+        if profile.targeted or duration * 1000 >= current_app.config['PROFILER_SLOW_MS']:
+            self.writer.queue.put((profile, duration))
+
+    def admin_view(self):
+        """GET: armed routes and recent captures. POST: profile the next N requests to a route"""
+        token = current_app.config['PROFILER_ADMIN_TOKEN']
+        if not token or not hmac.compare_digest(request.headers.get('X-Admin-Token', '').encode(), token.encode()):
+            abort(404)
+        if request.method == 'POST':
+            data = request.get_json() or {}
+            route = data.get('route')
+            count = data.get('count', 10)
+            if not isinstance(route, str) or not route.startswith('/') or not isinstance(count, int):
+                return jsonify({"error": "Expected a route path and an integer count"}), 400
+            return jsonify({"armed": self.triggers.arm(route, count)})
+        captures = sorted((name[:-5] for name in os.listdir(self.writer.directory)
+                           if name.endswith('.json')), reverse=True)
+        return jsonify({"armed": self.triggers.snapshot(), "captures": captures[:50],
+                        "directory": self.writer.directory})
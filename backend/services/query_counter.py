@@ -0,0 +1,147 @@
+"""SQL query counting and N+1 detection.
+
+Every statement executed through SQLAlchemy is counted, timed and grouped by
+its SQL text. Because SQLAlchemy binds parameters, the per-row lazy loads of
+an N+1 pattern (``car.user`` for each car in a list) all share one statement
+text, so a statement repeated ``QUERY_REPEAT_THRESHOLD`` times within one
+request is reported as a likely N+1.
+
+Stats are collected per request (``current_stats()``) and inside
+``count_queries()`` blocks, which tests use to enforce query budgets.
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+# Transaction control is bookkeeping, not a query (tests wrap each one in SAVEPOINTs)
+_TRANSACTION_CONTROL = ('BEGIN', 'SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+
+class QueryStats:
+    """Query count, database time and per-statement repeats"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.statements = Counter()
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.total_time += duration
+        self.statements[statement] += 1
+
+    def repeated(self, threshold):
+        """Statements executed at least ``threshold`` times, most frequent first"""
+        return [(stmt, n) for stmt, n in self.statements.most_common() if n >= threshold]
+
+    def report(self):
+        lines = [f"{self.count} queries in {self.total_time * 1000:.1f}ms"]
+        for stmt, n in self.statements.most_common():
+            lines.append(f"  {n}x {' '.join(stmt.split())[:200]}")
+        return '\n'.join(lines)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised by :func:`count_queries` when a block exceeds its budget"""
+
+
+def current_stats():
+    """Stats for the current request, created on first use"""
+    stats = g.get('_query_stats')
+    if stats is None:
+        stats = g._query_stats = QueryStats()
+    return stats
+
+
+def _captures():
+    if not hasattr(_local, 'captures'):
+        _local.captures = []
+    return _local.captures
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_query_counter_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('_query_counter_start')
+    if not starts:
+        return
+    duration = time.perf_counter() - starts.pop()
+    if statement.startswith(_TRANSACTION_CONTROL):
+        return
+    if has_request_context():
+        current_stats().record(statement, duration)
+    for stats in _captures():
+        stats.record(statement, duration)
+
+
+def install_listeners():
+    """Attach the counting listeners to every SQLAlchemy engine (idempotent)"""
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+@contextmanager
+def count_queries(max_queries=None, max_repeats=None):
+    """Collect query stats for a block, optionally enforcing a budget.
+
+    ``max_queries`` bounds the total number of statements; ``max_repeats``
+    bounds how often any single statement may run (1 forbids N+1 loads).
+    """
+    install_listeners()
+    stats = QueryStats()
+    captures = _captures()
+    captures.append(stats)
+    try:
+        yield stats
+    finally:
+        captures.remove(stats)
+    if max_queries is not None and stats.count > max_queries:
+        raise QueryBudgetExceeded(f"Expected at most {max_queries} queries, got {stats.report()}")
+    if max_repeats is not None:
+        repeated = stats.repeated(max_repeats + 1)
+        if repeated:
+            raise QueryBudgetExceeded(
+                f"Statement repeated {repeated[0][1]}x (limit {max_repeats}), likely N+1:\n"
+                f"{stats.report()}")
+
+
+class QueryCounter:
+    """Flask extension logging per-request query counts and N+1 patterns"""
+
+    def __init__(self, app=None):
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('QUERY_REPEAT_THRESHOLD', 5)
+        app.config.setdefault('QUERY_COUNTER_HEADERS', False)
+        install_listeners()
+        app.after_request(self._after_request)
+
+    @staticmethod
+    def _after_request(response):
+        stats = g.get('_query_stats')
+        if stats is None:
+            return response
+        threshold = current_app.config['QUERY_REPEAT_THRESHOLD']
+        for statement, n in stats.repeated(threshold):
+            logger.warning("Possible N+1 on %s %s: statement ran %dx: %s",
+                           request.method, request.endpoint, n, ' '.join(statement.split())[:200])
+        if current_app.config['QUERY_COUNTER_HEADERS']:
+            response.headers['X-Query-Count'] = str(stats.count)
+            response.headers['Server-Timing'] = (
+                f'db;dur={stats.total_time * 1000:.2f};desc="{stats.count} queries"')
+        return response
@@ -0,0 +1,189 @@
+"""Multi-criteria ranking for ``/api/nearby_stations?rank=best``.
+
+Each candidate gets one score in ``[0, 1]``::
+
+    score = w_distance * (1 - distance / radius)
+          + w_price * (cheapest-to-dearest among candidates, 1 = cheapest)
+          + w_rating * (mean rating - 1) / 4        (0.5 without reviews)
+          + w_availability * available * (1 - occupancy)
+
+Candidates come from a uniform lat/lng grid index, so a query only touches
+the cells around the search circle instead of the whole catalogue. All
+candidates are scored in one vectorized pass, and only the top ``k`` are
+sorted (``np.argpartition``), not all of them.
+
+Weights are shifted per vehicle (``vehicle_weights``): older, range-limited
+cars weight distance more. Connector compatibility and minimum power are
+bitwise and scalar filters on the grid candidates (``services/connectors.py``),
+applied before any distance is computed.
+"""
+import math
+import threading
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+DEFAULT_WEIGHTS = {'distance': 0.4, 'price': 0.25, 'rating': 0.2, 'availability': 0.15}
+# Model years before this mostly had < 150 km of range
+SHORT_RANGE_BEFORE = 2018
+
+
+def haversine_km(lat, lng, lats, lngs):
+    """Great-circle distance from one point to arrays of points"""
+    lat1, lng1 = math.radians(lat), math.radians(lng)
+    lat2, lng2 = np.radians(lats), np.radians(lngs)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GridIndex:
+    """Points bucketed into ``cell_deg`` cells, sorted by cell key (row-major)"""
+
+    def __init__(self, lat, lng, cell_deg=0.05):
+        self.cell_deg = cell_deg
+        self.n_cols = int(math.ceil(360 / cell_deg)) + 1
+        keys = self._keys(np.floor(np.asarray(lat, dtype=float) / cell_deg),
+                          np.floor(np.asarray(lng, dtype=float) / cell_deg))
+        self.order = np.argsort(keys, kind='stable')
+        self.keys = keys[self.order]
+
+    def _keys(self, rows, cols):
+        return rows.astype(np.int64) * self.n_cols + (cols.astype(np.int64) + self.n_cols // 2)
+
+    def within(self, lat, lng, radius_km):
+        """Positions of points in the cells overlapping the circle's bounding box"""
+        dlat = radius_km / KM_PER_DEGREE
+        dlng = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+        rows = np.arange(math.floor((lat - dlat) / self.cell_deg), math.floor((lat + dlat) / self.cell_deg) + 1)
+        col_lo = math.floor((lng - dlng) / self.cell_deg)
+        col_hi = math.floor((lng + dlng) / self.cell_deg)
+        # Cells of one grid row are contiguous in key order: one slice per row
+        lo = np.searchsorted(self.keys, self._keys(rows, np.full(len(rows), col_lo)), 'left')
+        hi = np.searchsorted(self.keys, self._keys(rows, np.full(len(rows), col_hi)), 'right')
+        lengths = hi - lo
+        total = int(lengths.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.int64)
+        starts = np.repeat(lo - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+        return self.order[starts + np.arange(total)]
+
+
+def mean_ratings(station_ids, review_station, review_rating):
+    """Mean rating per station in sorted ``station_ids`` (NaN without reviews)"""
+    n = len(station_ids)
+    if n == 0 or len(review_station) == 0:
+        return np.full(n, np.nan)
+    pos = np.minimum(np.searchsorted(station_ids, review_station), n - 1)
+    known = station_ids[pos] == review_station
+    count = np.bincount(pos[known], minlength=n)
+    total = np.bincount(pos[known], weights=review_rating[known], minlength=n)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(count > 0, total / count, np.nan)
+
+
+class StationCatalogue:
+    """Columnar stations for ranking, sorted by id, with mean ratings and a grid index"""
+
+    __slots__ = ('ids', 'lat', 'lng', 'available', 'rating', 'connectors', 'max_kw', 'index')
+
+    def __init__(self, ids, lat, lng, available, reviews=((), ()), connectors=None, max_kw=None, cell_deg=0.05):
+        order = np.argsort(ids, kind='stable')
+        self.ids = np.asarray(ids, dtype=np.int64)[order]
+        self.lat = np.asarray(lat, dtype=float)[order]
+        self.lng = np.asarray(lng, dtype=float)[order]
+        self.available = np.asarray(available, dtype=bool)[order]
+        # Unknown connectors (0) and power (0 kW) never pass a filter
+        n = len(self.ids)
+        self.connectors = np.asarray(connectors if connectors is not None else np.zeros(n), dtype=np.uint16)[order]
+        max_kw = np.asarray(max_kw if max_kw is not None else np.zeros(n), dtype=float)
+        self.max_kw = np.nan_to_num(max_kw, nan=0.0).astype(np.float32)[order]
+        review_station, review_rating = reviews
+        self.rating = mean_ratings(self.ids, np.asarray(review_station, dtype=np.int64),
+                                   np.asarray(review_rating, dtype=float))
+        self.index = GridIndex(self.lat, self.lng, cell_deg)
+
+
+def vehicle_weights(car, weights=DEFAULT_WEIGHTS):
+    """Weights adjusted for the driver's car (``None`` keeps the defaults)"""
+    weights = dict(weights)
+    if car is not None and car.year < SHORT_RANGE_BEFORE:
+        weights['distance'] *= 2
+    return weights
+
+
+def score(distance_km, radius_km, price, rating, available, occupancy, weights):
+    """Vectorized score per candidate, with the weights normalized to sum to 1"""
+    spread = price.max() - price.min() if len(price) else 0.0
+    terms = {
+        'distance': 1.0 - distance_km / radius_km,
+        'price': (price.max() - price) / spread if spread > 0 else np.ones(len(price)),
+        'rating': np.where(np.isnan(rating), 0.5, (rating - 1.0) / 4.0),
+        'availability': available * (1.0 - occupancy),
+    }
+    total_weight = sum(weights.values())
+    return sum(weights[name] * terms[name] for name in terms) / total_weight
+
+
+def top_k(scores, k, tiebreak):
+    """Indices of the ``k`` best scores, best first (ties go to the smaller ``tiebreak``)"""
+    if k < len(scores):
+        best = np.argpartition(-scores, k - 1)[:k]
+    else:
+        best = np.arange(len(scores))
+    return best[np.lexsort((tiebreak[best], -scores[best]))]
+
+
+class StationRanker:
+    """Caches the catalogue and its index; ranks candidates around a point"""
+
+    def __init__(self, weights=DEFAULT_WEIGHTS, cell_deg=0.05):
+        self.weights = dict(weights)
+        self.cell_deg = cell_deg
+        self._cached = (None, None)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(weights=config.get('RANKING_WEIGHTS', DEFAULT_WEIGHTS),
+                   cell_deg=config.get('RANKING_CELL_DEGREES', 0.05))
+
+    def catalogue(self, key, load):
+        """Catalogue for ``key``; on a miss ``load()`` returns ``StationCatalogue`` arguments"""
+        with self._lock:
+            cached_key, catalogue = self._cached
+        if cached_key == key:
+            return catalogue
+        catalogue = StationCatalogue(*load(), cell_deg=self.cell_deg)
+        with self._lock:
+            self._cached = (key, catalogue)
+        return catalogue
+
+    def rank(self, catalogue, lat, lng, radius_km, k, quotes, weights=None, connectors=0, min_kw=0.0):
+        """Top ``k`` stations within ``radius_km``, best first.
+
+        ``quotes`` is ``(ids, price, occupancy)`` sorted by id, as priced by
+        ``PricingEngine``; only the candidates are looked up in it. A nonzero
+        ``connectors`` mask keeps stations sharing a connector with it;
+        ``min_kw`` keeps stations at least that fast. Returns
+        ``(positions, distance_km, price, scores)``.
+        """
+        candidates = catalogue.index.within(lat, lng, radius_km)
+        if connectors:
+            candidates = candidates[(catalogue.connectors[candidates] & connectors) != 0]
+        if min_kw:
+            candidates = candidates[catalogue.max_kw[candidates] >= min_kw]
+        distance = haversine_km(lat, lng, catalogue.lat[candidates], catalogue.lng[candidates])
+        inside = distance <= radius_km
+        candidates, distance = candidates[inside], distance[inside]
+        quote_ids, price, occupancy = quotes
+        # A station added between pricing and ranking has no quote yet; it is left out until the next refresh
+        ids = catalogue.ids[candidates]
+        quoted = np.minimum(np.searchsorted(quote_ids, ids), max(len(quote_ids) - 1, 0))
+        priced = np.asarray(quote_ids)[quoted] == ids if len(quote_ids) else np.zeros(len(ids), dtype=bool)
+        candidates, distance, quoted = candidates[priced], distance[priced], quoted[priced]
+        price, occupancy = np.asarray(price)[quoted], np.asarray(occupancy)[quoted]
+        scores = score(distance, radius_km, price, catalogue.rating[candidates],
+                       catalogue.available[candidates], occupancy, weights or self.weights)
+        best = top_k(scores, k, distance)
+        return candidates[best], distance[best], price[best], scores[best]
@@ -0,0 +1,18 @@
+"""The manifest naming the current offline station snapshot.
+
+``jobs.station_snapshot`` writes it; ``GET /api/stations/snapshot`` reads it.
+Kept apart from the job so web workers do not import pandas to serve it.
+"""
+import json
+import os
+
+MANIFEST = 'stations.json'
+
+
+def read_manifest(out_dir):
+    """``{"file", "etag", "version"}`` of the current snapshot, or None if none was built"""
+    try:
+        with open(os.path.join(out_dir, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
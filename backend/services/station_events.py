@@ -0,0 +1,156 @@
+"""Live station updates over server-sent events.
+
+Booking and station views publish events (``booking.created``,
+``station.created``, ``station.updated``, ``station.deleted``) to a broker
+that fans them out to subscribers. A subscriber follows a set of station
+ids, a map viewport (``south,west,north,east``), or both. Clients keep one
+``EventSource`` open instead of polling ``/availability``.
+
+- Every subscriber owns a bounded queue, and ``publish`` only does
+  ``put_nowait``, so a slow client never blocks the request that published.
+  A subscriber whose queue overflows is closed; its ``EventSource``
+  reconnects and should refetch availability once.
+- Streams send a comment every ``SSE_HEARTBEAT_SECONDS`` to keep proxies
+  from closing them. They end after ``SSE_MAX_STREAM_SECONDS`` so worker
+  threads are recycled; the browser reconnects on its own.
+- The broker is pluggable. ``EVENT_BROKER`` names a ``module:Class`` with
+  ``subscribe``/``unsubscribe``/``publish``, e.g. one backed by Redis pub/sub
+  or Postgres ``LISTEN/NOTIFY`` to span workers. The default
+  :class:`InProcessBroker` reaches only the streams open on the same worker.
+"""
+import importlib
+import itertools
+import queue
+import threading
+import time
+
+from flask import current_app
+
+from services import metrics
+
+
+class Subscription:
+    """One open stream: its filter and its bounded event queue"""
+
+    def __init__(self, stations=None, bbox=None, maxsize=100):
+        self.stations = frozenset(stations) if stations else None
+        self.bbox = bbox
+        self.events = queue.Queue(maxsize=maxsize)
+        self.closed = False
+
+    def matches(self, event):
+        if self.stations is not None and event['station_id'] in self.stations:
+            return True
+        if self.bbox is not None and event.get('lat') is not None and event.get('lng') is not None:
+            south, west, north, east = self.bbox
+            return south <= event['lat'] <= north and west <= event['lng'] <= east
+        return False
+
+    def offer(self, event):
+        """Queue ``event`` without blocking; False if the subscriber is too far behind"""
+        try:
+            self.events.put_nowait(event)
+            return True
+        except queue.Full:
+            self.closed = True
+            return False
+
+    def get(self, timeout):
+        """Next event, or None after ``timeout`` seconds"""
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class InProcessBroker:
+    """Fan-out to the subscribers connected to this worker process"""
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def subscribe(self, stations=None, bbox=None):
+        subscription = Subscription(stations, bbox, self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscription)
+        metrics.SSE_SUBSCRIBERS.inc()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            if subscription not in self._subscribers:
+                return
+            self._subscribers.discard(subscription)
+        metrics.SSE_SUBSCRIBERS.dec()
+
+    def publish(self, event):
+        """Deliver ``event`` to every matching subscriber; returns how many got it"""
+        event = dict(event, id=next(self._ids))
+        with self._lock:
+            subscribers = list(self._subscribers)
+        delivered = 0
+        for subscription in subscribers:
+            if not subscription.matches(event):
+                continue
+            if subscription.offer(event):
+                delivered += 1
+            else:
+                metrics.SSE_SUBSCRIBERS_DROPPED.inc()
+                self.unsubscribe(subscription)
+        return delivered
+
+
+def load_broker(path, queue_size):
+    """Instantiate ``module:Class`` from ``EVENT_BROKER`` (default: in-process)"""
+    if not path:
+        return InProcessBroker(queue_size)
+    module, _, name = path.partition(':')
+    return getattr(importlib.import_module(module), name)(queue_size=queue_size)
+
+
+def format_sse(event, dumps):
+    """Encode one event in ``text/event-stream`` framing"""
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {dumps(event)}\n\n"
+
+
+class StationEvents:
+    """Flask extension owning the broker for station update streams"""
+
+    def __init__(self, app=None):
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('EVENT_BROKER', None)
+        app.config.setdefault('SSE_QUEUE_SIZE', 100)
+        app.config.setdefault('SSE_HEARTBEAT_SECONDS', 15)
+        app.config.setdefault('SSE_MAX_STREAM_SECONDS', 300)
+        app.extensions['station_events'] = load_broker(app.config['EVENT_BROKER'],
+                                                       app.config['SSE_QUEUE_SIZE'])
+
+
+def publish(event_type, station_id, lat=None, lng=None, **data):
+    """Publish a station event from a view (no-op if the extension is not set up)"""
+    broker = current_app.extensions.get('station_events')
+    if broker is None:
+        return 0
+    return broker.publish({'type': event_type, 'station_id': station_id,
+                           'lat': lat, 'lng': lng, 'data': data})
+
+
+def stream(broker, subscription, heartbeat, max_seconds, dumps):
+    """Yield SSE frames for ``subscription`` until the client goes away or time runs out"""
+    deadline = time.monotonic() + max_seconds
+    try:
+        yield 'retry: 3000\n\n'
+        while not subscription.closed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            event = subscription.get(timeout=min(heartbeat, remaining))
+            yield ': keep-alive\n\n' if event is None else format_sse(event, dumps)
+    finally:
+        broker.unsubscribe(subscription)
@@ -0,0 +1,237 @@
+"""Streaming bulk station import for hosts.
+
+``POST /api/host/stations/import`` takes CSV (``text/csv``, header
+``name,address,lat,lng,price_per_kwh,available,connectors,max_kw``) or NDJSON
+(``application/x-ndjson``, one object per line). The rows are read one at a
+time from the request stream, so the upload itself is never held in memory.
+
+- Each row is validated like ``create_station``: name and address are
+  required, their lengths are capped by the ``Station`` model, and
+  coordinates must be in range.
+- Rows without ``lat``/``lng`` are geocoded, one ``lookup_many`` per batch.
+- A row is a duplicate when one of the host's stations, existing or earlier
+  in the file, has the same normalized address within
+  ``IMPORT_DUPLICATE_METERS``. Duplicates are skipped and reported.
+- Accepted rows are inserted ``IMPORT_BATCH_SIZE`` at a time through the
+  ``insert`` callback, so an aborted upload leaves only whole batches.
+
+Only the duplicate index (normalized address -> coordinates) grows with the
+file. At most ``IMPORT_MAX_ERRORS`` per-row errors are listed; the counts
+cover every row.
+"""
+import csv
+import io
+import json
+import math
+
+from models import Station
+from services.connectors import connector_fields
+from services.geocoding import GeocodingError, normalize_address
+from services.ranking import haversine_km
+
+FORMATS = {'text/csv': 'csv', 'application/csv': 'csv',
+           'application/x-ndjson': 'ndjson', 'application/ndjson': 'ndjson', 'application/jsonl': 'ndjson'}
+NAME_LENGTH = Station.__table__.c.name.type.length
+ADDRESS_LENGTH = Station.__table__.c.address.type.length
+# Accepted ranges for numeric station fields, shared with create/update_station
+BOUNDS = {'lat': (-90, 90), 'lng': (-180, 180), 'price_per_kwh': (0, 100)}
+TRUE, FALSE = {'1', 'true', 'yes', 'y', 't'}, {'0', 'false', 'no', 'n', 'f'}
+
+
+class RowError(ValueError):
+    """A row that cannot be imported; the message is shown to the host"""
+
+
+def import_format(mimetype, override=None):
+    """``'csv'``, ``'ndjson'`` or None from ``?format=`` or the request's content type"""
+    if override:
+        return override if override in ('csv', 'ndjson') else None
+    return FORMATS.get(mimetype)
+
+
+def read_rows(stream, fmt):
+    """Yield ``(line, row)`` from a binary stream; ``row`` is a dict or a RowError"""
+    if isinstance(stream, io.RawIOBase):
+        stream = io.BufferedReader(stream)
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        yield from _csv_rows(text) if fmt == 'csv' else _ndjson_rows(text)
+    finally:
+        text.detach()  # the caller owns the stream
+
+
+def _csv_rows(text):
+    reader = csv.DictReader(text)
+    for row in reader:
+        yield reader.line_num, RowError('Too many columns') if None in row else row
+
+
+def _ndjson_rows(text):
+    for line, raw in enumerate(text, 1):
+        if not raw.strip():
+            continue
+        try:
+            row = json.loads(raw)
+        except ValueError:
+            yield line, RowError('Invalid JSON')
+            continue
+        yield line, row if isinstance(row, dict) else RowError('Expected a JSON object')
+
+
+def _blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _text(row, key, length):
+    value = row.get(key)
+    if _blank(value) or not isinstance(value, str):
+        raise RowError(f'Missing {key}')
+    value = value.strip()
+    if len(value) > length:
+        raise RowError(f'{key} is longer than {length} characters')
+    return value
+
+
+def number_field(value, key, low, high):
+    """``value`` as a finite float in ``[low, high]``; raises RowError"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise RowError(f'{key} must be a number')
+    if not math.isfinite(number) or not low <= number <= high:
+        raise RowError(f'{key} must be between {low} and {high}')
+    return number
+
+
+def clean_row(row):
+    """Station fields from one uploaded row; raises RowError"""
+    station = {'name': _text(row, 'name', NAME_LENGTH), 'address': _text(row, 'address', ADDRESS_LENGTH)}
+    lat, lng = row.get('lat'), row.get('lng')
+    if _blank(lat) != _blank(lng):
+        raise RowError('lat and lng must be given together')
+    if not _blank(lat):
+        station['lat'] = number_field(lat, 'lat', *BOUNDS['lat'])
+        station['lng'] = number_field(lng, 'lng', *BOUNDS['lng'])
+    if not _blank(row.get('price_per_kwh')):
+        station['price_per_kwh'] = number_field(row['price_per_kwh'], 'price_per_kwh', *BOUNDS['price_per_kwh'])
+    available = row.get('available')
+    if isinstance(available, str) and not _blank(available):
+        if available.strip().lower() not in TRUE | FALSE:
+            raise RowError('available must be true or false')
+        station['available'] = available.strip().lower() in TRUE
+    elif isinstance(available, bool):
+        station['available'] = available
+    try:
+        station.update(connector_fields(row))
+    except ValueError as e:
+        raise RowError(str(e))
+    return station
+
+
+class DuplicateIndex:
+    """Normalized address -> coordinates of a host's stations"""
+
+    def __init__(self, stations=(), meters=25):
+        self.km = meters / 1000.0
+        self._seen = {}
+        for station in stations:
+            self.add(station['address'], station['lat'], station['lng'])
+
+    def add(self, address, lat, lng):
+        self._seen.setdefault(normalize_address(address), []).append((lat, lng))
+
+    def contains(self, address, lat, lng):
+        points = self._seen.get(normalize_address(address))
+        if not points:
+            return False
+        lats, lngs = zip(*points)
+        return bool((haversine_km(lat, lng, lats, lngs) <= self.km).any())
+
+
+class StationImporter:
+    """Validate, geocode, deduplicate and insert rows in batches"""
+
+    def __init__(self, insert, existing=(), geocoder=None, batch_size=500, duplicate_meters=25,
+                 max_rows=100000, max_errors=100):
+        self.insert = insert
+        self.index = DuplicateIndex(existing, duplicate_meters)
+        self.geocoder = geocoder
+        self.batch_size = batch_size
+        self.max_rows = max_rows
+        self.max_errors = max_errors
+        self.rows = self.created = self.duplicates = self.failed = 0
+        self.errors = []
+        self.aborted = False
+
+    def run(self, rows):
+        """Import ``(line, row)`` pairs; returns the summary"""
+        pending, abort = [], None
+        try:
+            for line, row in rows:
+                if self.rows >= self.max_rows:
+                    abort = {'line': line, 'error': f'Stopped after {self.max_rows} rows'}
+                    break
+                self.rows += 1
+                if not isinstance(row, RowError):
+                    try:
+                        row = clean_row(row)
+                    except RowError as e:
+                        row = e
+                pending.append((line, row))
+                if len(pending) >= self.batch_size:
+                    self._flush(pending)
+                    pending = []
+        except (UnicodeDecodeError, csv.Error) as e:
+            abort = {'line': None, 'error': f'Unreadable upload: {e}'}
+        self._flush(pending)
+        if abort:
+            # Batches already inserted are kept
+            self.aborted = True
+            self.errors.append(abort)
+        return self.summary()
+
+    def summary(self):
+        return {'rows': self.rows, 'created': self.created, 'duplicates': self.duplicates, 'failed': self.failed,
+                'errors': self.errors, 'errors_truncated': self.failed + self.duplicates > len(self.errors),
+                'aborted': self.aborted}
+
+    def _error(self, line, message):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': line, 'error': message})
+
+    def _flush(self, pending):
+        if not pending:
+            return
+        unplaced = self._geocode([s for _, s in pending if not isinstance(s, RowError) and 'lat' not in s])
+        batch = []
+        for line, station in pending:
+            if isinstance(station, RowError):
+                self._error(line, str(station))
+            elif 'lat' not in station:
+                self._error(line, unplaced)
+            elif self.index.contains(station['address'], station['lat'], station['lng']):
+                self.duplicates += 1
+                if len(self.errors) < self.max_errors:
+                    self.errors.append({'line': line, 'error': 'Duplicate of an existing station'})
+            else:
+                self.index.add(station['address'], station['lat'], station['lng'])
+                batch.append(station)
+        if batch:
+            self.insert(batch)
+            self.created += len(batch)
+
+    def _geocode(self, stations):
+        """Fill in coordinates where possible; returns the error for stations left without them"""
+        if self.geocoder is None:
+            return 'lat and lng are required'
+        if not stations:
+            return None
+        try:
+            found = self.geocoder.lookup_many([station['address'] for station in stations])
+        except GeocodingError:
+            return 'Geocoding is temporarily unavailable; send lat and lng'
+        for station, coords in zip(stations, found):
+            if coords is not None:
+                station['lat'], station['lng'] = coords
+        return 'Address could not be geocoded'
@@ -0,0 +1,151 @@
+"""Non-blocking structured logging.
+
+Request threads only hand log records to a bounded in-memory queue; a
+``QueueListener`` thread formats them as JSON (``python-json-logger``) and
+writes them to stdout. Formatting -- including tracebacks from
+``logger.exception`` -- and I/O therefore never run on the request path.
+
+- Records below WARNING are sampled at ``LOG_SAMPLE_RATE`` (per logger
+  overrides in ``LOG_SAMPLE_RATES``); warnings, errors and records with
+  exception info are always kept.
+- When the queue is full, records are dropped rather than blocking the
+  request and counted in ``evx_log_records_dropped_total``.
+- Each record carries the request method, path and ``X-Request-ID``.
+"""
+import atexit
+import logging
+import os
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+from flask import has_request_context, request
+from flask.logging import default_handler
+
+try:
+    from pythonjsonlogger.json import JsonFormatter
+except ImportError:  # python-json-logger < 3
+    from pythonjsonlogger.jsonlogger import JsonFormatter
+
+from services import metrics
+
+JSON_FORMAT = '%(asctime)s %(levelname)s %(name)s %(message)s'
+TEXT_FORMAT = '%(asctime)s %(levelname)s [%(name)s] %(message)s'
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of records below WARNING; always keep the rest"""
+
+    def __init__(self, rate=1.0, rates=None):
+        super().__init__()
+        self.rate = rate
+        self.rates = rates or {}
+
+    def _rate_for(self, name):
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition('.')[0]
+        return self.rate
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or record.exc_info:
+            return True
+        rate = self._rate_for(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class RequestQueueHandler(QueueHandler):
+    """Enqueue records without formatting them and without ever blocking.
+
+    Request context is captured here because the listener thread has none;
+    message arguments are merged so later mutation cannot change the record.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        if has_request_context():
+            record.method = request.method
+            record.path = request.path
+            record.request_id = request.headers.get('X-Request-ID')
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            metrics.LOG_RECORDS_DROPPED.inc()
+
+
+def json_formatter():
+    return JsonFormatter(JSON_FORMAT, rename_fields={'levelname': 'level', 'name': 'logger'},
+                         json_ensure_ascii=False)
+
+
+class StructuredLogging:
+    """Flask extension installing the queue-based logging pipeline (once per process)"""
+
+    def __init__(self, app=None):
+        self.handler = None
+        self.listener = None
+        self._hooks_registered = False
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('STRUCTURED_LOGGING', True)
+        app.config.setdefault('LOG_LEVEL', 'INFO')
+        app.config.setdefault('LOG_FORMAT', 'json')
+        app.config.setdefault('LOG_SAMPLE_RATE', 1.0)
+        app.config.setdefault('LOG_SAMPLE_RATES', {})
+        app.config.setdefault('LOG_QUEUE_SIZE', 10000)
+        if not app.config['STRUCTURED_LOGGING']:
+            return
+        app.logger.removeHandler(default_handler)
+        if self.handler is None:
+            self.install(app.config)
+
+    def install(self, config, stream=None):
+        """Route the root logger through the queue; returns the output handler"""
+        self.stop()
+        output = logging.StreamHandler(stream or sys.stdout)
+        output.setFormatter(json_formatter() if config['LOG_FORMAT'] == 'json'
+                            else logging.Formatter(TEXT_FORMAT))
+
+        self.handler = RequestQueueHandler(queue.Queue(maxsize=config['LOG_QUEUE_SIZE']))
+        self.handler.addFilter(SamplingFilter(config['LOG_SAMPLE_RATE'], config['LOG_SAMPLE_RATES']))
+        self.listener = QueueListener(self.handler.queue, output, respect_handler_level=True)
+
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            if isinstance(existing, RequestQueueHandler):
+                root.removeHandler(existing)
+        root.addHandler(self.handler)
+        root.setLevel(config['LOG_LEVEL'])
+
+        self.listener.start()
+        if not self._hooks_registered:
+            atexit.register(self.stop)
+            # gunicorn --preload forks after create_app; the listener thread does not survive it
+            os.register_at_fork(after_in_child=self._restart_listener)
+            self._hooks_registered = True
+        return output
+
+    def _restart_listener(self):
+        if self.listener is not None:
+            # A fresh queue: the parent's lock may have been held at fork time
+            self.handler.queue = self.listener.queue = queue.Queue(maxsize=self.handler.queue.maxsize)
+            self.listener._thread = None
+            self.listener.start()
+
+    def stop(self):
+        """Flush queued records and stop the listener thread"""
+        if self.listener is not None and self.listener._thread is not None:
+            self.listener.stop()
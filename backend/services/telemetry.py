@@ -0,0 +1,151 @@
+"""Charging-session telemetry: append-only columnar storage and rollups.
+
+Chargers post meter readings ``(booking_id, ts, kwh, kw)`` in batches. Each
+batch is validated as NumPy arrays. With ``TELEMETRY_DIR`` set, it is
+appended to one raw file per column (``booking_id.i8``, ``ts.f8``,
+``kwh.f8``, ``kw.f4``) in a per-process directory: one ``write`` per column
+per batch, no ORM rows. The 1-minute and 1-hour rollups are updated from
+the same arrays with one ``np.unique``/``bincount`` pass per resolution.
+
+On startup the raw files of every process are replayed into the rollups.
+A torn tail from a crash is dropped by truncating to the shortest column.
+Without ``TELEMETRY_DIR``, only the rollups are kept (in memory).
+
+Rollups group on ``booking_id << 32 | bucket``, so ``ts`` must be epoch
+seconds below ``MAX_TS``; millisecond timestamps would overflow the bucket
+into the booking bits and are rejected by ``valid_rows`` (and skipped on replay).
+
+``kwh`` is the meter's cumulative reading, so a bucket's energy is its
+``max(kwh)`` minus the previous bucket's (its own ``min(kwh)`` for the first).
+"""
+import glob
+import os
+import threading
+
+import numpy as np
+
+COLUMNS = (('booking_id', '<i8'), ('ts', '<f8'), ('kwh', '<f8'), ('kw', '<f4'))
+RESOLUTIONS = {'1m': 60, '1h': 3600}
+MAX_TS = 2 ** 32  # epoch seconds (year 2106); keeps every bucket index within 32 bits
+
+
+class RollupTable:
+    """Per-booking buckets of ``[readings, kw_sum, kw_max, kwh_min, kwh_max]``"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.bookings = {}
+
+    def add(self, booking, ts, kwh, kw):
+        bucket = (ts // self.seconds).astype(np.int64)
+        keys, inverse = np.unique(booking << 32 | bucket, return_inverse=True)
+        n = len(keys)
+        count = np.bincount(inverse, minlength=n)
+        kw_sum = np.bincount(inverse, weights=kw, minlength=n)
+        kw_max = np.full(n, -np.inf)
+        np.maximum.at(kw_max, inverse, kw)
+        kwh_min = np.full(n, np.inf)
+        np.minimum.at(kwh_min, inverse, kwh)
+        kwh_max = np.full(n, -np.inf)
+        np.maximum.at(kwh_max, inverse, kwh)
+        # One Python step per (booking, bucket) group, not per reading
+        groups = zip((keys >> 32).tolist(), (keys & 0xFFFFFFFF).tolist(), count.tolist(), kw_sum.tolist(),
+                     kw_max.tolist(), kwh_min.tolist(), kwh_max.tolist())
+        for booking_id, b, c, s, mx, lo, hi in groups:
+            buckets = self.bookings.setdefault(booking_id, {})
+            row = buckets.get(b)
+            if row is None:
+                buckets[b] = [c, s, mx, lo, hi]
+            else:
+                row[0] += c
+                row[1] += s
+                row[2] = max(row[2], mx)
+                row[3] = min(row[3], lo)
+                row[4] = max(row[4], hi)
+
+    def series(self, booking_id):
+        """``[(bucket_start, readings, energy_kwh, avg_kw, max_kw)]`` in time order.
+
+        A bucket's energy runs from the previous bucket's last reading, so the
+        increments between buckets are counted and every resolution sums to
+        the same total. Only the first bucket starts from its own first reading.
+        """
+        points, prev_hi = [], None
+        for b, (c, s, mx, lo, hi) in sorted(self.bookings.get(booking_id, {}).items()):
+            points.append((b * self.seconds, c, hi - (lo if prev_hi is None else prev_hi), s / c, mx))
+            prev_hi = hi
+        return points
+
+
+class TelemetryStore:
+    """Append-only column files plus in-memory rollups"""
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self.rollups = {name: RollupTable(seconds) for name, seconds in RESOLUTIONS.items()}
+        self.readings = 0
+        self._lock = threading.Lock()
+        if directory:
+            self.load()
+
+    def _process_dir(self):
+        # Resolved per append so gunicorn workers forked after startup write their own files
+        path = os.path.join(self.directory, f'worker-{os.getpid()}')
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def append(self, booking, ts, kwh, kw):
+        """Store one validated batch of readings (equal-length arrays)"""
+        columns = {'booking_id': booking.astype('<i8'), 'ts': ts.astype('<f8'),
+                   'kwh': kwh.astype('<f8'), 'kw': kw.astype('<f4')}
+        with self._lock:
+            if self.directory:
+                path = self._process_dir()
+                for name, dtype in COLUMNS:
+                    with open(os.path.join(path, f'{name}.{dtype[1:]}'), 'ab') as f:
+                        f.write(columns[name].tobytes())
+            self._roll_up(columns)
+
+    def _roll_up(self, columns):
+        for table in self.rollups.values():
+            table.add(columns['booking_id'], columns['ts'], columns['kwh'], columns['kw'].astype(float))
+        self.readings += len(columns['ts'])
+
+    def load(self):
+        """Replay every process's column files into the rollups"""
+        for path in sorted(glob.glob(os.path.join(self.directory, 'worker-*'))):
+            files = {name: os.path.join(path, f'{name}.{dtype[1:]}') for name, dtype in COLUMNS}
+            if not all(os.path.exists(f) for f in files.values()):
+                continue
+            columns = {name: np.fromfile(files[name], dtype=dtype) for name, dtype in COLUMNS}
+            rows = min(len(c) for c in columns.values())
+            columns = {name: c[:rows] for name, c in columns.items()}
+            keep = (columns['ts'] > 0) & (columns['ts'] < MAX_TS)
+            if keep.any():
+                self._roll_up({name: c[keep] for name, c in columns.items()})
+
+    def series(self, booking_id, resolution):
+        return self.rollups[resolution].series(booking_id)
+
+
+def parse_readings(rows, max_rows):
+    """``[[booking_id, ts, kwh, kw], ...]`` -> column arrays; raises ValueError on bad shape"""
+    if not isinstance(rows, list) or not rows:
+        raise ValueError('readings must be a non-empty list of [booking_id, ts, kwh, kw]')
+    if len(rows) > max_rows:
+        raise OverflowError(f'At most {max_rows} readings per request')
+    try:
+        data = np.asarray(rows, dtype=float)
+    except (TypeError, ValueError):
+        raise ValueError('readings must be numeric [booking_id, ts, kwh, kw] rows')
+    if data.ndim != 2 or data.shape[1] != 4:
+        raise ValueError('readings must be numeric [booking_id, ts, kwh, kw] rows')
+    return data[:, 0], data[:, 1], data[:, 2], data[:, 3]
+
+
+def valid_rows(booking, ts, kwh, kw, known_bookings):
+    """Mask of finite, non-negative readings for bookings in ``1..known_bookings``, ``ts`` in epoch seconds"""
+    valid = np.isfinite(booking) & np.isfinite(ts) & np.isfinite(kwh) & np.isfinite(kw)
+    valid &= (booking == np.floor(booking)) & (booking >= 1) & (booking <= known_bookings)
+    valid &= (ts > 0) & (ts < MAX_TS) & (kwh >= 0) & (kw >= 0)
+    return valid
@@ -1,37 +1,137 @@
 import os
-import tempfile
 import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
 from backend.app import create_app, db
+from backend.app.database import BOUND_CONNECTION_EXTENSION
 from models.user import User
+from routes.api import reset_stores
+from services.query_counter import count_queries
 
-@pytest.fixture
-def app():
-    """Create and configure a new app instance for each test."""
-    # Create a temporary file to isolate the database for each test
-    db_fd, db_path = tempfile.mkstemp()
-    
-    app = create_app('testing')
-    app.config.update({
-        "TESTING": True,
-        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{db_path}",
-        "WTF_CSRF_ENABLED": False,
-        "SECRET_KEY": "test-secret-key",
-        "GOOGLE_CLIENT_ID": "test-google-client-id",
-        "GOOGLE_CLIENT_SECRET": "test-google-client-secret",
-        "FACEBOOK_APP_ID": "test-facebook-app-id",
-        "FACEBOOK_APP_SECRET": "test-facebook-app-secret",
-        "LINKEDIN_CLIENT_ID": "test-linkedin-client-id",
-        "LINKEDIN_CLIENT_SECRET": "test-linkedin-client-secret",
-    })
-    
+TEST_CONFIG = {
+    "TESTING": True,
+    "WTF_CSRF_ENABLED": False,
+    "SECRET_KEY": "test-secret-key",
+    "GOOGLE_CLIENT_ID": "test-google-client-id",
+    "GOOGLE_CLIENT_SECRET": "test-google-client-secret",
+    "FACEBOOK_APP_ID": "test-facebook-app-id",
+    "FACEBOOK_APP_SECRET": "test-facebook-app-secret",
+    "LINKEDIN_CLIENT_ID": "test-linkedin-client-id",
+    "LINKEDIN_CLIENT_SECRET": "test-linkedin-client-secret",
+}
+
+def worker_database_url(base=None, worker=None):
+    """Give each pytest-xdist worker its own database.
+
+    In-memory SQLite is already private to the worker process; SQLite files
+    and Postgres databases get the worker id (``gw0``...) as a suffix.
+    """
+    base = base or os.getenv("TEST_DATABASE_URL", "sqlite:///:memory:")
+    worker = worker or os.getenv("PYTEST_XDIST_WORKER")
+    url = make_url(base)
+    if not worker or url.database in (None, "", ":memory:"):
+        return base
+    if url.get_backend_name() == "sqlite":
+        root, ext = os.path.splitext(url.database)
+        url = url.set(database=f"{root}_{worker}{ext}")
+    else:
+        url = url.set(database=f"{url.database}_{worker}")
+    return url.render_as_string(hide_password=False)
+
+def _ensure_database(url):
+    url = make_url(url)
+    if url.get_backend_name() != "postgresql":
+        return
+    engine = create_engine(url.set(database="postgres"), isolation_level="AUTOCOMMIT")
+    with engine.connect() as conn:
+        if not conn.execute(text("SELECT 1 FROM pg_database WHERE datname = :name"), {"name": url.database}).scalar():
+            conn.exec_driver_sql(f'CREATE DATABASE "{url.database}"')
+    engine.dispose()
+
+def _enable_sqlite_savepoints(engine):
+    """Let pysqlite run SAVEPOINTs inside an outer transaction (SQLAlchemy recipe)"""
+    @event.listens_for(engine, "connect")
+    def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _emit_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+def _build_app(database_url):
+    previous = os.environ.get("TEST_DATABASE_URL")
+    os.environ["TEST_DATABASE_URL"] = database_url
+    try:
+        app = create_app('testing')
+    finally:
+        if previous is None:
+            del os.environ["TEST_DATABASE_URL"]
+        else:
+            os.environ["TEST_DATABASE_URL"] = previous
+    app.config.update(TEST_CONFIG)
+    return app
+
+@pytest.fixture(scope="session")
+def _session_app():
+    """One app and schema per test session (and per xdist worker)"""
+    # Tests that call create_app('testing') themselves keep a private in-memory database
+    base = os.environ.pop("TEST_DATABASE_URL", None)
+    url = worker_database_url(base)
+    _ensure_database(url)
+    app = _build_app(url)
     with app.app_context():
+        if db.engine.dialect.name == "sqlite":
+            _enable_sqlite_savepoints(db.engine)
+        db.drop_all()
         db.create_all()
-        yield app
-        db.session.remove()
+    yield app
+    with app.app_context():
         db.drop_all()
-    
-    os.close(db_fd)
-    os.unlink(db_path)
+        db.engine.dispose()
+    if base is not None:
+        os.environ["TEST_DATABASE_URL"] = base
+
+@pytest.fixture
+def app(request):
+    """The app for one test, with all database writes rolled back afterwards.
+
+    By default the session-wide app is reused: each test runs inside an outer
+    transaction that the session joins with SAVEPOINTs, so ``commit()`` works
+    and everything is rolled back on teardown. Config and extensions are
+    restored and the in-memory API stores are reset.
+
+    Tests marked ``fresh_app`` (or every test with ``TEST_DB_MODE=fresh``) get
+    a newly built app and schema instead -- needed to register routes or run DDL.
+    """
+    reset_stores()
+    if request.node.get_closest_marker("fresh_app") or os.getenv("TEST_DB_MODE") == "fresh":
+        app = _build_app("sqlite:///:memory:")
+        with app.app_context():
+            db.create_all()
+            yield app
+            db.session.remove()
+            db.drop_all()
+        return
+
+    app = request.getfixturevalue("_session_app")
+    config, extensions = dict(app.config), dict(app.extensions)
+    with app.app_context():
+        connection = db.engine.connect()
+        transaction = connection.begin()
+        app.extensions[BOUND_CONNECTION_EXTENSION] = connection
+        db.session.remove()
+        db.session.configure(join_transaction_mode="create_savepoint")
+        try:
+            yield app
+        finally:
+            db.session.remove()
+            db.session.configure(join_transaction_mode="conditional_savepoint")
+            transaction.rollback()
+            connection.close()
+            app.config.clear()
+            app.config.update(config)
+            app.extensions.clear()
+            app.extensions.update(extensions)
 
 @pytest.fixture
 def client(app):
@@ -57,3 +157,25 @@ def sample_user(app):
         db.session.commit()
         db.session.refresh(user)  # Ensure user is attached to session
         return user
+
+@pytest.fixture
+def query_budget():
+    """Assert a block stays within a SQL query budget.
+
+    Usage: ``with query_budget(max_queries=2, max_repeats=1): client.get(...)``
+    """
+    return count_queries
+
+def pytest_configure(config):
+    # pytest.ini's [tool:pytest] section is not read by pytest, so its markers list does not register these
+    config.addinivalue_line("markers", "benchmark: scaling microbenchmarks (run with -m benchmark)")
+    config.addinivalue_line("markers", "fresh_app: build a new app and schema instead of a rolled-back transaction")
+
+def pytest_collection_modifyitems(config, items):
+    """Benchmarks only run when selected with ``-m benchmark``"""
+    if "benchmark" in (config.getoption("markexpr") or ""):
+        return
+    skip = pytest.mark.skip(reason="benchmark: run with -m benchmark")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
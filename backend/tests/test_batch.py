@@ -0,0 +1,60 @@
+import time
+
+import pytest
+
+def login(client, user):
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user.id)
+        sess['_fresh'] = True
+
+def batch(client, *subrequests):
+    response = client.post('/api/batch', json={"requests": list(subrequests)})
+    assert response.status_code == 200
+    return {r["id"]: r for r in response.get_json()["responses"]}
+
+def test_station_detail_in_one_request(client, sample_user):
+    """Availability, reviews and profile come back together, keyed by id"""
+    login(client, sample_user)
+    client.post('/api/bookings/', json={"station_id": 3, "user_id": sample_user.id,
+                                        "start_time": "2025-07-08T10:00:00Z", "end_time": "2025-07-08T11:00:00Z"})
+    results = batch(client,
+                    {"id": "slots", "method": "GET", "path": "/api/stations/3/availability?date=2025-07-08"},
+                    {"id": "reviews", "path": "/api/stations/3/reviews"},
+                    {"id": "profile", "path": "/api/profile"})
+    assert results["slots"]["status"] == 200
+    assert len(results["slots"]["body"]["available_slots"]) == 11
+    assert results["reviews"]["body"] == {"reviews": []}
+    assert results["profile"]["body"]["email"] == sample_user.email
+
+def test_sub_requests_fail_independently(client):
+    """Each sub-request gets its own status; auth is enforced per sub-request"""
+    results = batch(client,
+                    {"id": "missing", "path": "/api/nope"},
+                    {"id": "bad", "path": "/api/stations/3/availability"},
+                    {"id": "anon", "path": "/api/profile"},
+                    {"id": "write", "method": "POST", "path": "/api/bookings/"},
+                    {"id": "stream", "path": "/api/stations/3/availability/stream"},
+                    {"id": "ok", "path": "/api/health"})
+    assert {k: r["status"] for k, r in results.items()} == {
+        "missing": 404, "bad": 400, "anon": 401, "write": 405, "stream": 400, "ok": 200}
+
+def test_batch_validation(client, app):
+    """The body must be a bounded, non-empty list"""
+    assert client.post('/api/batch', json={}).status_code == 400
+    assert client.post('/api/batch', json={"requests": ["/api/health"]}).status_code == 400
+    app.config["BATCH_MAX_REQUESTS"] = 2
+    too_many = [{"path": "/api/health"}] * 3
+    assert client.post('/api/batch', json={"requests": too_many}).status_code == 400
+
+@pytest.mark.fresh_app
+def test_sub_requests_run_concurrently(app):
+    """Independent sub-requests overlap instead of running back to back"""
+    def slow():
+        time.sleep(0.2)
+        return {"ok": True}
+    app.add_url_rule('/api/test-slow', 'test_slow', slow)
+    app.config["BATCH_MAX_WORKERS"] = 4
+    start = time.perf_counter()
+    results = batch(app.test_client(), *[{"id": i, "path": "/api/test-slow"} for i in range(4)])
+    assert time.perf_counter() - start < 0.6
+    assert [results[i]["body"] for i in range(4)] == [{"ok": True}] * 4
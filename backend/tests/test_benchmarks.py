@@ -0,0 +1,33 @@
+import os
+
+import pytest
+
+from benchmarks.bench_hotpaths import SIZES, run
+
+pytestmark = pytest.mark.benchmark
+
+# Upper bound on the log-log scaling exponent of each hot path: 1.0 is a
+# linear scan of the store, 0.0 an indexed lookup. Tighten when a path is indexed.
+MAX_EXPONENTS = {
+    "booking_overlap": 1.25,
+    "availability_slots": 1.25,
+    "station_reviews": 1.25,
+    "dashboard": 1.25,
+    "pricing": 1.25,
+    "ranking": 0.5,
+    "ranking_filtered": 0.5,
+}
+
+@pytest.fixture(scope="module")
+def curves():
+    max_records = int(os.getenv("BENCH_MAX_RECORDS", 10 ** 5))
+    curves = run([n for n in SIZES if n <= max_records])
+    for name, curve in curves.items():
+        timings = ", ".join(f"{n:,}: {s * 1e3:.3f}ms" for n, s in zip(curve["sizes"], curve["seconds"]))
+        print(f"\n{name}: exponent {curve['exponent']:.2f} ({timings})")
+    return curves
+
+@pytest.mark.parametrize("path,max_exponent", MAX_EXPONENTS.items())
+def test_hot_path_scaling(curves, path, max_exponent):
+    """Each hot path scales no worse than its expected complexity class"""
+    assert curves[path]["exponent"] <= max_exponent, curves[path]
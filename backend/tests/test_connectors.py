@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from backend.app import db
+from models import Car, VehicleProfile
+from services.connectors import BITS, connector_mask, connector_names
+from services.ranking import StationCatalogue, StationRanker
+
+def login(client, user):
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user.id)
+        sess['_fresh'] = True
+
+@pytest.fixture
+def host(client, sample_user):
+    login(client, sample_user)
+    return client
+
+def add_station(client, name, lat, connectors, max_kw):
+    response = client.post('/api/host/stations', json={"name": name, "lat": lat, "lng": -122.42, "address": name,
+                                                       "connectors": connectors, "max_kw": max_kw})
+    assert response.status_code == 201
+    return response.get_json()
+
+def test_connector_mask_round_trip():
+    """Names, aliases and separators map to bits and back in a fixed order"""
+    mask = connector_mask("NACS; ccs")
+    assert mask == BITS["nacs"] | BITS["ccs1"]
+    assert connector_names(mask) == ["ccs1", "nacs"]
+    assert connector_mask(["j1772", "Tesla"]) == BITS["j1772"] | BITS["nacs"]
+    with pytest.raises(ValueError):
+        connector_mask("ccs3")
+
+def test_ranker_filters_candidates_bitwise():
+    """Only stations sharing a connector and fast enough are ranked"""
+    catalogue = StationCatalogue([1, 2, 3, 4], [37.77] * 4, [-122.42, -122.421, -122.422, -122.423], [True] * 4,
+                                 connectors=[BITS["j1772"], BITS["ccs1"] | BITS["chademo"], BITS["nacs"], 0],
+                                 max_kw=[7.2, 50.0, 250.0, None])
+    quotes = (np.array([1, 2, 3, 4]), np.full(4, 0.3), np.zeros(4))
+    ranker = StationRanker()
+    rank = lambda **filters: sorted(catalogue.ids[ranker.rank(catalogue, 37.77, -122.42, 5.0, 10, quotes,
+                                                              **filters)[0]].tolist())
+    assert rank() == [1, 2, 3, 4]
+    assert rank(connectors=BITS["ccs1"] | BITS["nacs"]) == [2, 3]
+    assert rank(min_kw=50.0) == [2, 3]
+    assert rank(connectors=BITS["j1772"], min_kw=50.0) == []
+
+def test_compatible_search_uses_the_car_profile(host, sample_user):
+    """compatible=true keeps stations the driver's car can plug into"""
+    add_station(host, "L2", 37.770, ["j1772"], 7.2)
+    add_station(host, "Fast CCS", 37.771, "ccs1,chademo", 150)
+    add_station(host, "Supercharger", 37.772, ["nacs"], 250)
+    car = Car(user_id=sample_user.id, make="Nissan", model="Leaf", year=2021, license_plate="EV1")
+    db.session.add_all([car, VehicleProfile(make="nissan", model="leaf", connectors=connector_mask("j1772,chademo"),
+                                            max_kw=50.0)])
+    db.session.commit()
+
+    base = '/api/nearby_stations?lat=37.77&lng=-122.42&rank=best'
+    stations = host.get(base + '&compatible=true').get_json()["stations"]
+    assert sorted(s["name"] for s in stations) == ["Fast CCS", "L2"]
+    assert {s["name"]: s["connectors"] for s in stations}["Fast CCS"] == ["ccs1", "chademo"]
+    fast = host.get(base + '&compatible=true&min_kw=50').get_json()["stations"]
+    assert [(s["name"], s["max_kw"]) for s in fast] == [("Fast CCS", 150.0)]
+    assert [s["name"] for s in host.get(base + '&connectors=nacs').get_json()["stations"]] == ["Supercharger"]
+
+def test_filter_validation(host, sample_user):
+    """Unknown connectors and cars without a profile are client errors"""
+    base = '/api/nearby_stations?lat=37.77&lng=-122.42&rank=best'
+    assert host.get(base + '&connectors=plug').status_code == 400
+    assert host.get(base + '&min_kw=-1').status_code == 400
+    assert host.get(base + '&compatible=true').status_code == 422
+    db.session.add(Car(user_id=sample_user.id, make="Acme", model="Roadster", year=2020, license_plate="X"))
+    db.session.commit()
+    assert host.get(base + '&compatible=true').status_code == 422
+
+    assert host.post('/api/host/stations', json={"name": "A", "lat": 1, "lng": 1, "address": "a",
+                                                 "connectors": ["plug"]}).status_code == 400
+    station = add_station(host, "B", 37.77, "ccs1", 50)
+    assert host.put(f'/api/host/stations/{station["station_id"]}', json={"max_kw": "fast"}).status_code == 400
+    updated = host.put(f'/api/host/stations/{station["station_id"]}', json={"connectors": ["nacs"]}).get_json()
+    assert (updated["connectors"], updated["max_kw"]) == (["nacs"], 50.0)
+
+def test_vehicle_profile_prefers_narrowest_year_range(app):
+    """Model-year specific profiles win over open-ended ones"""
+    db.session.add_all([
+        VehicleProfile(make="hyundai", model="ioniq 5", connectors=BITS["ccs1"], max_kw=235.0),
+        VehicleProfile(make="hyundai", model="ioniq 5", year_from=2025, connectors=BITS["nacs"], max_kw=235.0),
+    ])
+    db.session.commit()
+    old = Car(user_id=1, make="Hyundai", model="IONIQ 5", year=2023, license_plate="A")
+    new = Car(user_id=1, make="Hyundai", model="Ioniq 5", year=2025, license_plate="B")
+    assert VehicleProfile.for_car(old).connectors == BITS["ccs1"]
+    assert VehicleProfile.for_car(new).connectors == BITS["nacs"]
+
+def test_bulk_import_reads_connectors(host):
+    """CSV imports carry connectors and power; bad values are per-line errors"""
+    body = ("name,address,lat,lng,connectors,max_kw\n"
+            "Hub,1 Hub St,37.77,-122.42,\"ccs1,chademo\",50\n"
+            "Bad,2 Hub St,37.78,-122.42,plug,\n")
+    summary = host.post('/api/host/stations/import', data=body, content_type='text/csv').get_json()
+    assert summary["created"] == 1
+    assert summary["errors"][0]["line"] == 3 and "plug" in summary["errors"][0]["error"]
+    station = host.get('/api/host/stations').get_json()["stations"][0]
+    assert (station["connectors"], station["max_kw"]) == (["ccs1", "chademo"], 50.0)
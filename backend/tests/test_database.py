@@ -0,0 +1,108 @@
+import importlib
+import sys
+
+import pytest
+from flask import jsonify
+from sqlalchemy import text
+from backend.app import create_app, db
+from backend.app.database import engine_options, read_replica
+from models.user import User
+from routes import api
+from tests.conftest import worker_database_url
+
+@pytest.fixture
+def replica_app(tmp_path, monkeypatch):
+    """App backed by two SQLite files standing in for primary and replica"""
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'primary.db'}")
+    monkeypatch.setenv("DATABASE_REPLICA_URL", f"sqlite:///{tmp_path / 'replica.db'}")
+    app = create_app("development")
+    app.config["TESTING"] = True
+
+    @app.route("/_test/users/replica")
+    @read_replica
+    def count_users_replica():
+        return jsonify(count=User.query.count())
+
+    @app.route("/_test/users/primary")
+    def count_users_primary():
+        return jsonify(count=User.query.count())
+
+    @app.route("/_test/users/write", methods=["POST"])
+    @read_replica
+    def write_then_read():
+        db.session.add(User(email="new@example.com", name="New"))
+        db.session.commit()
+        return jsonify(count=User.query.count())
+
+    with app.app_context():
+        db.create_all()
+        replica = app.extensions["db_replica"]
+        db.metadata.create_all(replica)
+        with replica.begin() as conn:
+            conn.execute(User.__table__.insert(), [
+                {"email": f"replica{i}@example.com", "name": "Replica"} for i in range(3)
+            ])
+        yield app
+        db.session.remove()
+    replica.dispose()
+
+def test_postgres_production_pool_settings(monkeypatch):
+    """Postgres engines get pool sizing, pre-ping and a statement timeout"""
+    monkeypatch.delenv("DB_POOL_SIZE", raising=False)
+    options = engine_options("postgresql://u:p@localhost/evx", "production")
+    assert options["pool_pre_ping"] is True
+    assert options["pool_size"] == 10
+    assert options["pool_recycle"] == 1800
+    assert "statement_timeout=5000" in options["connect_args"]["options"]
+
+def test_wsgi_app_uses_the_production_pool(monkeypatch):
+    """gunicorn's wsgi:app is built with the production profile unless FLASK_ENV is set"""
+    for name in ("FLASK_ENV", "DB_POOL_SIZE", "DB_POOL_RECYCLE"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("DATABASE_URL", "postgres://u:p@localhost/evx")
+    monkeypatch.delitem(sys.modules, "backend.wsgi", raising=False)
+    options = importlib.import_module("backend.wsgi").app.config["SQLALCHEMY_ENGINE_OPTIONS"]
+    assert (options["pool_size"], options["pool_recycle"]) == (10, 1800)
+
+def test_pool_settings_overridable_from_env(monkeypatch):
+    """DB_POOL_SIZE overrides the environment profile"""
+    monkeypatch.setenv("DB_POOL_SIZE", "42")
+    assert engine_options("postgresql://u:p@localhost/evx", "development")["pool_size"] == 42
+
+def test_sqlite_has_no_pool_sizing():
+    """Pool sizing is not applied to SQLite engines"""
+    assert engine_options("sqlite:///evx.db") == {"pool_pre_ping": False}
+
+def test_sqlite_performance_pragmas(replica_app):
+    """File-backed SQLite connections use WAL and relaxed fsync"""
+    with replica_app.app_context():
+        with db.engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+
+def test_read_only_views_use_replica(replica_app):
+    """@read_replica views read from the replica; others from the primary"""
+    client = replica_app.test_client()
+    assert client.get("/_test/users/replica").get_json()["count"] == 3
+    assert client.get("/_test/users/primary").get_json()["count"] == 0
+
+def test_reads_after_writes_stay_on_primary(replica_app):
+    """A view that writes reads its own writes from the primary"""
+    client = replica_app.test_client()
+    assert client.post("/_test/users/write").get_json()["count"] == 1
+
+def test_worker_database_urls():
+    """xdist workers get their own SQLite file or Postgres database"""
+    assert worker_database_url("sqlite:///:memory:", "gw1") == "sqlite:///:memory:"
+    assert worker_database_url("sqlite:////tmp/evx.db", "gw1") == "sqlite:////tmp/evx_gw1.db"
+    assert worker_database_url("postgresql://u:p@db/evx_test", "gw2") == "postgresql://u:p@db/evx_test_gw2"
+    assert worker_database_url("sqlite:////tmp/evx.db", None) == "sqlite:////tmp/evx.db"
+
+@pytest.mark.parametrize("attempt", [1, 2])
+def test_committed_rows_are_rolled_back(app, attempt):
+    """Each test's commits are rolled back, so a unique row can be committed again"""
+    assert User.query.filter_by(email="rollback@example.com").count() == 0
+    assert api.bookings_db == []
+    db.session.add(User(email="rollback@example.com", name="Rollback"))
+    db.session.commit()
+    api.bookings_db.append({"booking_id": attempt})
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from jobs.demand_forecast import forecast, hourly_occupancy, write_forecast
+from services.forecast import ForecastTable, hour_of_week
+
+MONDAY = pd.Timestamp("2025-06-02", tz="UTC")
+
+def login(client, user):
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user.id)
+        sess['_fresh'] = True
+
+def evening_bookings(station_id, weeks=8, hours=(18, 19)):
+    """One booking per day covering ``hours`` (UTC) for ``weeks`` weeks"""
+    days = pd.date_range(MONDAY, periods=7 * weeks, freq="D")
+    return pd.DataFrame({"station_id": station_id,
+                         "start_time": days + pd.Timedelta(hours=hours[0]),
+                         "end_time": days + pd.Timedelta(hours=hours[-1] + 1)})
+
+def test_hourly_occupancy_splits_partial_hours():
+    """A 90-minute booking fills one hour and half of the next"""
+    t0 = MONDAY.timestamp()
+    matrix = hourly_occupancy(np.array([1]), np.array([t0 + 3600.0]), np.array([t0 + 3600 * 2.5]), 2, t0, 4)
+    assert matrix[:, 1].tolist() == [0, 1, 0.5, 0]
+    assert not matrix[:, 0].any()
+
+def test_forecast_learns_busy_hours_per_station_and_cluster():
+    """Dense stations get their own model; sparse ones share their cluster's"""
+    bookings = pd.concat([evening_bookings(1), evening_bookings(2, hours=(8,)),
+                          evening_bookings(3, weeks=1), evening_bookings(4, weeks=1)])
+    stations = pd.DataFrame({"station_id": [1, 2, 3, 4, 5], "latitude": [37.7, 37.7, 37.7, 37.8, 40.7],
+                             "longitude": [-122.4, -122.4, -122.4, -122.4, -74.0]})
+    ids, row, occupancy, _ = forecast(bookings, stations, min_bookings=20, clusters=2, workers=1)
+    table = ForecastTable(ids, row, occupancy, 0)
+    tuesday = (MONDAY + pd.Timedelta(days=1)).timestamp()
+    at = tuesday + np.array([8, 12, 18]) * 3600.0
+    assert table.at(1, at).tolist() == pytest.approx([0.0, 0.0, 1.0], abs=0.1)
+    assert table.at(2, at).tolist() == pytest.approx([1.0, 0.0, 0.0], abs=0.1)
+    assert len(occupancy) == 2 + 2
+    assert row[2] == row[3] != row[4]  # nearby sparse stations share a cluster model
+    assert table.at(99, at) is None
+
+def test_process_pool_matches_inline_fit():
+    """Chunks fitted in worker processes give the same tables"""
+    bookings = pd.concat([evening_bookings(i, hours=(i % 24,)) for i in range(1, 7)])
+    inline = forecast(bookings, min_bookings=5, workers=1, chunk_size=2)
+    pooled = forecast(bookings, min_bookings=5, workers=2, chunk_size=2)
+    for a, b in zip(inline, pooled):
+        np.testing.assert_array_equal(a, b)
+
+def test_availability_and_pricing_read_the_table(app, client, sample_user, tmp_path):
+    """Availability slots carry predicted occupancy and pricing treats it as demand"""
+    login(client, sample_user)
+    station = client.post('/api/host/stations', json={"name": "A", "lat": 37.77, "lng": -122.42, "address": "a",
+                                                      "price_per_kwh": 0.40}).get_json()
+    url = '/api/pricing/quote?stations=%d&at=2025-07-08T18:00:00Z' % station["station_id"]
+    assert client.get(url).get_json()["quotes"][0]["occupancy"] == 0.0
+    slots = client.get(f'/api/stations/{station["station_id"]}/availability?date=2025-07-08').get_json()
+    assert "predicted_occupancy" not in slots["available_slots"][0]
+
+    ids, row, occupancy, as_of = forecast(evening_bookings(station["station_id"]), workers=1, min_bookings=1)
+    app.config["DEMAND_FORECAST_PATH"] = write_forecast(str(tmp_path / "occupancy.npz"), ids, row, occupancy, as_of)
+    slots = client.get(f'/api/stations/{station["station_id"]}/availability?date=2025-07-08').get_json()
+    predicted = {s["start"][11:16]: s["predicted_occupancy"] for s in slots["available_slots"]}
+    assert predicted["18:00"] == pytest.approx(1.0, abs=0.1) and predicted["12:00"] == pytest.approx(0.0, abs=0.1)
+    # 18:00-22:00 window: two of four hours predicted busy
+    assert client.get(url).get_json()["quotes"][0]["occupancy"] == pytest.approx(0.5, abs=0.05)
+
+def test_hour_of_week_starts_monday_utc():
+    """Hour 0 is Monday 00:00 UTC and the week wraps after 167"""
+    assert hour_of_week(MONDAY.timestamp()) == 0
+    assert hour_of_week((MONDAY + pd.Timedelta(days=6, hours=23)).timestamp()) == 167
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.app import db
+from dev_seed import METROS, generate_bookings, generate_stations, seed_scale_data
+from jobs.payouts import reconcile_payments
+from models import Station, User
+
+@pytest.mark.fresh_app
+def test_scale_seed_bulk_loads_database(app, tmp_path):
+    """Users and stations are bulk-inserted and readable through the ORM"""
+    result = seed_scale_data(stations=5000, users=500, bookings=2000, out_dir=tmp_path, app=app)
+    assert result["stations"] == Station.query.count() == 5000
+    assert result["users"] == User.query.count() == 500
+    station = db.session.get(Station, 1)
+    assert station.user.email.endswith("@scale.example.com")
+    assert {p.name for p in tmp_path.iterdir()} == {"bookings.csv", "reviews.csv", "payments.csv", "stations.csv"}
+
+def test_stations_cluster_around_metros():
+    """Most stations lie within a degree of a metro centre"""
+    stations = generate_stations(20000, 100, np.random.default_rng(1))
+    centres = np.array([(m[1], m[2]) for m in METROS])
+    coords = stations[["latitude", "longitude"]].to_numpy()
+    nearest = np.abs(coords[:, None, :] - centres[None, :, :]).max(axis=2).min(axis=1)
+    assert (nearest < 1.0).mean() > 0.9
+    assert stations["user_id"].between(1, 100).all()
+
+def test_generated_bookings_never_overlap():
+    """Colliding slots at one station are dropped"""
+    rng = np.random.default_rng(2)
+    stations = generate_stations(50, 5, rng)
+    bookings = generate_bookings(5000, stations, 100, rng, days=7)
+    assert not bookings.duplicated(["station_id", "start_time"]).any()
+    assert len(bookings) < 5000  # 50 stations x 168 slots forces collisions
+
+@pytest.mark.fresh_app
+def test_generated_files_reconcile(app, tmp_path):
+    """Generated payments reconcile cleanly in the payouts job"""
+    seed_scale_data(stations=200, users=50, bookings=1000, out_dir=tmp_path, app=app)
+    read = lambda name: pd.read_csv(tmp_path / name)
+    ledger, exceptions = reconcile_payments(read("payments.csv"), read("bookings.csv"), read("stations.csv"))
+    assert len(exceptions) == 0
+    assert len(ledger) > 0
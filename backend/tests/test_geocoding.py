@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.app import db
+from models import GeocodeCacheEntry, User
+from services.geocoding import GeocodingError, GeocodingService, LocalGeocoder, normalize_address
+
+def login(client, user):
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user.id)
+        sess['_fresh'] = True
+
+@pytest.fixture
+def geocoder(app):
+    """A local stand-in backend behind a fresh cache, installed for this test only"""
+    backend = LocalGeocoder(known={"1 Market Street, San Francisco": (37.7946, -122.3950)})
+    app.extensions["geocoding"] = GeocodingService(backend, cache_size=2, ttl=3600)
+    return backend
+
+class FailingGeocoder:
+    name = "failing"
+
+    def geocode(self, keys):
+        raise GeocodingError("quota exceeded")
+
+def test_normalize_address():
+    """Case, punctuation and street suffixes do not split cache entries"""
+    assert normalize_address("1 Market Street, San Francisco") == normalize_address("1 market st.  san francisco")
+    assert normalize_address("5 North Oak Avenue") == "5 n oak ave"
+
+def test_batch_lookup_makes_one_backend_call(app, geocoder):
+    """Duplicates are folded and every miss goes to the backend in one call"""
+    service = app.extensions["geocoding"]
+    results = service.lookup_many(["1 Market Street, San Francisco", "2 Elm Rd", "1 market st san francisco"])
+    assert results[0] == results[2] == (37.7946, -122.3950)
+    assert results[1] is not None
+    assert geocoder.calls == 1
+    assert GeocodeCacheEntry.query.count() == 2
+
+def test_database_tier_survives_memory_eviction_and_expires(app, geocoder):
+    """Evicted entries come back from the table; expired rows are refreshed from the backend"""
+    service = app.extensions["geocoding"]
+    service.lookup_many(["a st", "b st", "c st"])  # memory holds 2, the table all 3
+    assert service.lookup("a st") is not None
+    assert geocoder.calls == 1
+
+    GeocodeCacheEntry.query.filter_by(address_key="a st").update(
+        {"expires_at": datetime.utcnow() - timedelta(seconds=1)})
+    db.session.commit()
+    fresh = GeocodingService(geocoder)
+    fresh.lookup("a st")
+    assert geocoder.calls == 2
+    db.session.expire_all()
+    assert db.session.get(GeocodeCacheEntry, "a st").expires_at > datetime.utcnow()
+
+class RacingGeocoder(LocalGeocoder):
+    """Another worker caches the same address while this one is waiting on the backend"""
+
+    def geocode(self, keys):
+        db.session.add(GeocodeCacheEntry(address_key=keys[0], latitude=1.0, longitude=2.0, provider="other",
+                                         expires_at=datetime.utcnow() + timedelta(hours=1)))
+        db.session.commit()
+        return super().geocode(keys)
+
+def test_concurrent_cache_writes_upsert(app):
+    """A row written by another worker in the meantime is overwritten, not a unique-key error"""
+    service = GeocodingService(RacingGeocoder())
+    coords = service.lookup("7 Race St")
+    db.session.expire_all()
+    row = db.session.get(GeocodeCacheEntry, "7 race st")
+    assert (row.latitude, row.longitude, row.provider) == (coords[0], coords[1], "local")
+
+def test_cache_writes_do_not_commit_the_callers_session(app, geocoder):
+    """Pending work of the caller is still rolled back after a lookup wrote the cache"""
+    db.session.add(User(email="pending@example.com", name="Pending"))
+    app.extensions["geocoding"].lookup("8 Quiet St")
+    db.session.rollback()
+    assert User.query.filter_by(email="pending@example.com").first() is None
+
+def test_create_station_from_address(client, sample_user, geocoder):
+    """Stations can be created with just an address; updates re-geocode a new address"""
+    login(client, sample_user)
+    response = client.post('/api/host/stations', json={"name": "HQ", "address": "1 Market St., San Francisco"})
+    assert response.status_code == 201
+    station = response.get_json()
+    assert (station["lat"], station["lng"]) == (37.7946, -122.3950)
+
+    moved = client.put(f'/api/host/stations/{station["station_id"]}', json={"address": "9 Pine St"}).get_json()
+    assert (moved["lat"], moved["lng"]) != (37.7946, -122.3950)
+    assert geocoder.calls == 2
+
+def test_lone_coordinate_is_rejected(client, sample_user, geocoder):
+    """A lat without lng (or the reverse) is a 400, never filled in or overwritten by geocoding"""
+    login(client, sample_user)
+    address = "1 Market St., San Francisco"
+    assert client.post('/api/host/stations', json={"name": "HQ", "address": address, "lat": 1}).status_code == 400
+    station = client.post('/api/host/stations', json={"name": "HQ", "address": address}).get_json()
+    url = f'/api/host/stations/{station["station_id"]}'
+    assert client.put(url, json={"address": "9 Pine St", "lng": 2}).status_code == 400
+    assert client.put(url, json={"lat": 3}).status_code == 400
+    assert geocoder.calls == 1
+
+def test_geocoding_errors_and_batch_endpoint(app, client, sample_user, geocoder):
+    """Empty addresses are 422, backend failures 503; the batch endpoint is bounded"""
+    login(client, sample_user)
+    assert client.post('/api/host/stations', json={"name": "X", "address": "!!"}).status_code == 422
+    data = client.post('/api/host/geocode', json={"addresses": ["1 Market Street, San Francisco", ""]}).get_json()
+    assert data["results"] == [{"address": "1 Market Street, San Francisco", "lat": 37.7946, "lng": -122.395},
+                               {"address": "", "lat": None, "lng": None}]
+    app.config["GEOCODE_MAX_ADDRESSES"] = 1
+    assert client.post('/api/host/geocode', json={"addresses": ["a", "b"]}).status_code == 413
+    assert client.post('/api/host/geocode', json={"addresses": "a"}).status_code == 400
+
+    app.extensions["geocoding"] = GeocodingService(FailingGeocoder())
+    assert client.post('/api/host/stations', json={"name": "X", "address": "3 Oak St"}).status_code == 503
+    assert GeocodeCacheEntry.query.filter_by(address_key="3 oak st").first() is None
+
+def test_without_geocoder_coordinates_are_required(app, client, sample_user):
+    """With no backend configured, the old validation applies"""
+    app.extensions["geocoding"] = None
+    login(client, sample_user)
+    assert client.post('/api/host/stations', json={"name": "X", "address": "3 Oak St"}).status_code == 400
+    assert client.post('/api/host/geocode', json={"addresses": ["3 Oak St"]}).status_code == 404
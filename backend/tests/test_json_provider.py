@@ -0,0 +1,74 @@
+import dataclasses
+import json
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+from flask.json.provider import DefaultJSONProvider
+
+import backend.app.json_provider as json_provider
+from backend.app.json_provider import FastJSONProvider
+from benchmarks.bench_json import availability_payload, dashboard_payload
+
+@dataclasses.dataclass
+class Slot:
+    start: datetime
+    price: float
+
+@pytest.fixture
+def providers(app):
+    return DefaultJSONProvider(app), FastJSONProvider(app)
+
+def test_app_uses_fast_provider(app):
+    """create_app installs the fast JSON provider"""
+    assert isinstance(app.json, FastJSONProvider)
+
+@pytest.mark.parametrize("payload", [dashboard_payload(20), availability_payload()])
+def test_matches_default_provider(app, providers, payload):
+    """The fast path produces the same JSON document as Flask's default"""
+    default, fast = providers
+    with app.app_context():
+        assert json.loads(fast.response(payload).data) == json.loads(default.response(payload).data)
+
+def test_fallback_is_byte_identical(app, providers, monkeypatch):
+    """Without orjson the provider emits exactly Flask's default bytes"""
+    monkeypatch.setattr(json_provider, "orjson", None)
+    default, fast = providers
+    payload = dashboard_payload(20)
+    with app.app_context():
+        assert fast.response(payload).data == default.response(payload).data
+    assert fast.loads('{"a": 1}') == {"a": 1}
+
+def test_datetimes_use_http_date(providers):
+    """Datetimes keep Flask's HTTP-date wire format"""
+    _, fast = providers
+    value = datetime(2025, 8, 10, 10, 0, tzinfo=timezone.utc)
+    assert json.loads(fast.dumps({"t": value})) == {"t": "Sun, 10 Aug 2025 10:00:00 GMT"}
+
+def test_numpy_and_dataclasses(providers):
+    """NumPy scalars/arrays and dataclasses serialize to plain JSON"""
+    _, fast = providers
+    payload = {
+        "count": np.int64(3),
+        "price": np.float32(0.5),
+        "ids": np.arange(3),
+        "slot": Slot(datetime(2025, 8, 10, 8), 0.3),
+    }
+    assert json.loads(fast.dumps(payload)) == {
+        "count": 3,
+        "price": 0.5,
+        "ids": [0, 1, 2],
+        "slot": {"start": "Sun, 10 Aug 2025 08:00:00 GMT", "price": 0.3},
+    }
+
+def test_unserializable_raises(providers):
+    """Unknown types still raise TypeError"""
+    _, fast = providers
+    with pytest.raises(TypeError):
+        fast.dumps({"x": object()})
+
+def test_request_bodies_are_parsed(client):
+    """Request JSON goes through the provider's loads"""
+    response = client.post("/api/bookings/", json={})
+    assert response.status_code == 400
+    assert "error" in response.get_json()
@@ -0,0 +1,93 @@
+import random
+
+import pytest
+
+from benchmarks import load_test
+
+class _Response:
+    def __init__(self, response):
+        self.status_code = response.status_code
+        self._json = response.get_json(silent=True)
+
+    def json(self):
+        return self._json
+
+class FlaskClientContext:
+    """Drop-in for load_test.Client that replays scenarios on the Flask test client"""
+
+    def __init__(self, app, client):
+        self.client = client
+        self.urls = app.url_map.bind('localhost')
+        self.conflict_rate = 0.5
+        self.booked = []
+        self.include_payments = False
+        self.rules = set()
+
+    def _open(self, method, path, params=None, **kwargs):
+        rule, _ = self.urls.match(path, method, return_rule=True)
+        self.rules.add(rule.rule)
+        return _Response(self.client.open(path, method=method, query_string=params, **kwargs))
+
+    def get(self, path, **kwargs):
+        return self._open('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self._open('POST', path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self._open('PUT', path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self._open('DELETE', path, **kwargs)
+
+    def record(self, route, response):
+        pass
+
+@pytest.fixture
+def ctx(app, client, sample_user):
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(sample_user.id)
+        sess['_fresh'] = True
+    return FlaskClientContext(app, client)
+
+def test_traffic_mix_succeeds(ctx):
+    """Every scenario returns its expected status family against the app"""
+    rng = random.Random(1)
+    for _ in range(300):
+        scenario = rng.choices(load_test.SCENARIOS, [s.weight for s in load_test.SCENARIOS])[0]
+        route, response = scenario.fn(ctx, rng)
+        assert response.status_code < 500, route
+
+def test_traffic_mix_covers_api_routes(app, ctx):
+    """The load mix exercises every /api route (checkout only runs against a Stripe stub)"""
+    rng = random.Random(2)
+    for _ in range(50):
+        for scenario in load_test.SCENARIOS:
+            scenario.fn(ctx, rng)
+    # Event streams stay open for minutes; their cost is threads held, not latency
+    excluded = {'/api/payments/checkout', '/metrics', '/api/admin/profiler',
+                '/api/stations/stream', '/api/stations/<int:station_id>/availability/stream'}
+    api_rules = {
+        r.rule for r in app.url_map.iter_rules()
+        if r.rule.startswith('/api/') and r.rule not in excluded
+    }
+    assert api_rules - ctx.rules == set()
+
+def test_summarize_percentiles():
+    """Summaries report per-route throughput and latency percentiles in ms"""
+    results = {'health': {'latencies': [i / 1000 for i in range(1, 101)], 'statuses': {'200': 100}}}
+    summary = load_test.summarize(results, elapsed=10.0)['health']
+    assert summary['requests'] == 100
+    assert summary['throughput_rps'] == 10.0
+    assert summary['p50_ms'] == pytest.approx(50.5)
+    assert summary['p99_ms'] == pytest.approx(99.01)
+
+def test_compare_flags_regressions():
+    """p95 growth or throughput loss beyond the threshold is flagged"""
+    old = {'routes': {'a': {'p95_ms': 10.0, 'throughput_rps': 100.0},
+                      'b': {'p95_ms': 10.0, 'throughput_rps': 100.0}}}
+    new = {'routes': {'a': {'p95_ms': 10.5, 'throughput_rps': 98.0},
+                      'b': {'p95_ms': 15.0, 'throughput_rps': 100.0},
+                      'c': {'p95_ms': 1.0, 'throughput_rps': 1.0}}}
+    rows = {row['route']: row['status'] for row in load_test.compare(old, new)}
+    assert rows == {'a': 'ok', 'b': 'REGRESSION', 'c': 'added'}
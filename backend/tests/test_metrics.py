@@ -0,0 +1,55 @@
+import pytest
+from prometheus_client import REGISTRY
+from services.metrics import track_outbound
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+def test_metrics_endpoint_exposes_prometheus_text(client):
+    """The /metrics endpoint serves the Prometheus exposition format"""
+    client.get('/api/health')
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain')
+    assert b'evx_http_request_duration_seconds' in response.data
+
+def test_requests_are_counted_per_route(client):
+    """Latency, status and size are recorded with blueprint/endpoint labels"""
+    labels = dict(blueprint='api', endpoint='api.nearby_stations', method='GET')
+    before = sample('evx_http_request_duration_seconds_count', **labels)
+    bad_before = sample('evx_http_requests_total', status='400', **labels)
+    client.get('/api/nearby_stations?lat=37.7&lng=-122.4')
+    client.get('/api/nearby_stations')
+    assert sample('evx_http_request_duration_seconds_count', **labels) == before + 2
+    assert sample('evx_http_requests_total', status='400', **labels) == bad_before + 1
+    assert sample('evx_http_response_size_bytes_count', blueprint='api', endpoint='api.nearby_stations') > 0
+    assert sample('evx_http_requests_in_progress', blueprint='api', endpoint='api.nearby_stations') == 0
+
+def test_unmatched_routes_share_one_label(client):
+    """404s for arbitrary paths do not create new label values"""
+    before = sample('evx_http_requests_total', blueprint='', endpoint='unmatched', method='POST', status='405')
+    client.post('/api/health')
+    client.post('/api/health')
+    after = sample('evx_http_requests_total', blueprint='', endpoint='unmatched', method='POST', status='405')
+    assert after == before + 2
+
+def test_db_queries_are_counted(client, sample_user):
+    """Queries issued while handling a request are observed per endpoint"""
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(sample_user.id)
+        sess['_fresh'] = True
+    labels = dict(blueprint='api', endpoint='api.get_profile')
+    before = sample('evx_http_request_db_queries_sum', **labels)
+    client.get('/api/profile')
+    assert sample('evx_http_request_db_queries_sum', **labels) >= before + 1
+
+def test_outbound_calls_are_timed():
+    """Outbound calls record latency with their outcome"""
+    labels = dict(service='stripe', operation='test_op')
+    with track_outbound('stripe', 'test_op'):
+        pass
+    with pytest.raises(RuntimeError):
+        with track_outbound('stripe', 'test_op'):
+            raise RuntimeError('boom')
+    assert sample('evx_outbound_request_duration_seconds_count', outcome='success', **labels) == 1
+    assert sample('evx_outbound_request_duration_seconds_count', outcome='error', **labels) == 1
@@ -0,0 +1,49 @@
+import msgpack
+import pytest
+
+def login(client, user):
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user.id)
+        sess['_fresh'] = True
+
+@pytest.fixture
+def host(client, sample_user):
+    login(client, sample_user)
+    client.post('/api/host/stations', json={"name": "A", "lat": 37.7, "lng": -122.4, "address": "1 Long Street, Somewhere"})
+    client.post('/api/bookings/', json={"station_id": 1, "user_id": sample_user.id,
+                                        "start_time": "2025-07-08T10:00:00Z", "end_time": "2025-07-08T11:00:00Z"})
+    return client
+
+def test_sparse_fields_on_station_lists(host):
+    """?fields= keeps only the named keys, in order"""
+    stations = host.get('/api/host/stations?fields=station_id,lat,lng,nope').get_json()["stations"]
+    assert stations == [{"station_id": 1, "lat": 37.7, "lng": -122.4}]
+    nearby = host.get('/api/nearby_stations?lat=1&lng=2&fields=id').get_json()["stations"]
+    assert nearby == [{"id": 1}, {"id": 2}]
+
+def test_per_collection_fields_on_dashboard(host):
+    """fields[collection] narrows one list; others follow the plain fields param or stay whole"""
+    data = host.get('/api/dashboard?fields[bookings]=booking_id&fields[payments]=amount').get_json()
+    assert data["bookings"] == [{"booking_id": 1}]
+    assert data["payments"] == [{"amount": 1000}]
+    assert data["reviews"] == []
+
+def test_msgpack_matches_json(host):
+    """Accept: application/msgpack returns the same payload, datetimes included"""
+    as_json = host.get('/api/dashboard')
+    as_msgpack = host.get('/api/dashboard', headers={"Accept": "application/msgpack"})
+    assert as_msgpack.mimetype == "application/msgpack"
+    assert "Accept" in as_msgpack.headers["Vary"]
+    assert msgpack.unpackb(as_msgpack.data) == as_json.get_json()
+    assert len(as_msgpack.data) < len(as_json.data)
+
+def test_json_is_default(client):
+    """Browsers and clients without a preference still get JSON"""
+    response = client.get('/api/nearby_stations?lat=1&lng=2', headers={"Accept": "*/*"})
+    assert response.mimetype == "application/json"
+
+def test_batch_sub_responses_are_embedded_in_msgpack(host):
+    """A MessagePack batch carries decoded sub-responses, not nested binary blobs"""
+    response = host.post('/api/batch', json={"requests": [{"id": "r", "path": "/api/stations/1/reviews?fields=rating"}]},
+                         headers={"Accept": "application/msgpack"})
+    assert msgpack.unpackb(response.data)["responses"] == [{"id": "r", "status": 200, "body": {"reviews": []}}]
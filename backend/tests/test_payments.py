@@ -1,11 +1,13 @@
 import pytest
+import responses
+from services.payments import CheckoutSessionCache, checkout_idempotency_key
 
 def test_create_checkout_session_success(client, mocker):
     """Should create a Stripe checkout session and return session URL"""
     # Mock Stripe API response
     mock_session = mocker.Mock()
     mock_session.url = "https://checkout.stripe.com/test-session"
-    mock_create = mocker.patch("stripe.checkout.Session.create", return_value=mock_session)
+    mock_create = mocker.patch("stripe.checkout.SessionService.create", return_value=mock_session)
 
     data = {
         "booking_id": 1,
@@ -47,3 +49,78 @@ def test_stripe_webhook_invalid_signature(client, mocker):
     response = client.post("/api/payments/webhook", data=payload, headers={"Stripe-Signature": sig_header})
     assert response.status_code == 400
     assert "error" in response.get_json()
+
+def test_checkout_retry_reuses_cached_session(client, mocker):
+    """Retrying the same booking checkout should not create a second session"""
+    mock_session = mocker.Mock()
+    mock_session.url = "https://checkout.stripe.com/test-session"
+    mock_create = mocker.patch("stripe.checkout.SessionService.create", return_value=mock_session)
+
+    data = {
+        "booking_id": 7,
+        "amount": 2500,
+        "currency": "usd",
+        "success_url": "https://localhost/success",
+        "cancel_url": "https://localhost/cancel"
+    }
+    first = client.post("/api/payments/checkout", json=data)
+    second = client.post("/api/payments/checkout", json=data)
+    assert first.get_json() == second.get_json()
+    mock_create.assert_called_once()
+    options = mock_create.call_args.kwargs["options"]
+    assert options["idempotency_key"] == checkout_idempotency_key(7, 2500, "usd", "https://localhost/success", "https://localhost/cancel")
+
+@responses.activate
+def test_checkout_against_local_stripe_stub(app, client):
+    """Checkout should talk to a configured Stripe base URL with an idempotency key"""
+    from routes.api import stripe_service
+    app.config["STRIPE_API_BASE"] = "http://stripe.local"
+    stripe_service.init_app(app)
+    responses.add(
+        responses.POST,
+        "http://stripe.local/v1/checkout/sessions",
+        json={"id": "cs_test_1", "object": "checkout.session", "url": "https://checkout.stripe.com/c/cs_test_1"},
+        status=200
+    )
+    data = {
+        "booking_id": 3,
+        "amount": 1200,
+        "currency": "usd",
+        "success_url": "https://localhost/success",
+        "cancel_url": "https://localhost/cancel"
+    }
+    response = client.post("/api/payments/checkout", json=data)
+    assert response.status_code == 200
+    assert response.get_json()["checkout_url"] == "https://checkout.stripe.com/c/cs_test_1"
+    assert len(responses.calls) == 1
+    assert responses.calls[0].request.headers["Idempotency-Key"] == checkout_idempotency_key(3, 1200, "usd", "https://localhost/success", "https://localhost/cancel")
+
+def test_idempotency_key_depends_on_amount_and_currency():
+    """Different amounts or currencies must not share a checkout session"""
+    urls = ("https://a/ok", "https://a/no")
+    base = checkout_idempotency_key(1, 1000, "usd", *urls)
+    assert base == checkout_idempotency_key(1, 1000, "USD", *urls)
+    assert base != checkout_idempotency_key(1, 1500, "usd", *urls)
+    assert base != checkout_idempotency_key(1, 1000, "eur", *urls)
+
+def test_checkout_with_new_urls_gets_a_new_session(client, mocker):
+    """Only the redirect URLs change: a new key and session, not Stripe's reused-key error or the old redirect"""
+    sessions = [mocker.Mock(url="https://checkout.stripe.com/a"), mocker.Mock(url="https://checkout.stripe.com/b")]
+    mock_create = mocker.patch("stripe.checkout.SessionService.create", side_effect=sessions)
+    data = {"booking_id": 8, "amount": 2500, "currency": "usd",
+            "success_url": "https://localhost/success", "cancel_url": "https://localhost/cancel"}
+    first = client.post("/api/payments/checkout", json=data).get_json()
+    second = client.post("/api/payments/checkout", json=dict(data, success_url="https://localhost/done",
+                                                              cancel_url="https://localhost/back")).get_json()
+    assert (first["checkout_url"], second["checkout_url"]) == (sessions[0].url, sessions[1].url)
+    keys = [call.kwargs["options"]["idempotency_key"] for call in mock_create.call_args_list]
+    assert len(set(keys)) == 2
+
+def test_checkout_session_cache_expires(mocker):
+    """Cached checkout URLs should expire after the TTL"""
+    clock = mocker.patch("services.payments.time.monotonic", return_value=100.0)
+    cache = CheckoutSessionCache(ttl=60)
+    cache.set("key", "https://checkout.stripe.com/a")
+    assert cache.get("key") == "https://checkout.stripe.com/a"
+    clock.return_value = 161.0
+    assert cache.get("key") is None
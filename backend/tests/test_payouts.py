@@ -0,0 +1,68 @@
+import pandas as pd
+import pytest
+from jobs.columnar import read_columnar, write_columnar
+from jobs.payouts import host_earnings, reconcile_payments, run
+
+@pytest.fixture
+def frames():
+    payments = pd.DataFrame({
+        "payment_id": ["pi_1", "pi_2", "pi_3", "pi_4", "pi_5", "pi_6", "pi_1"],
+        "booking_id": [1, 2, 3, 3, 99, 4, 1],
+        "amount": [1000, 2000, 1500, 1500, 700, 400, 1000],
+        "currency": ["usd", "usd", "usd", "usd", "usd", "usd", "usd"],
+        "status": ["paid", "succeeded", "paid", "paid", "paid", "failed", "paid"],
+    })
+    bookings = pd.DataFrame({
+        "booking_id": [1, 2, 3, 4],
+        "station_id": [10, 11, 12, 10],
+    })
+    stations = pd.DataFrame({
+        "station_id": [10, 11, 12],
+        "host_id": [100, 100, 200],
+    })
+    return payments, bookings, stations
+
+def test_reconcile_payments_attributes_hosts(frames):
+    """Completed payments are matched to the host owning the booked station"""
+    ledger, exceptions = reconcile_payments(*frames, fee_rate=0.1)
+    assert sorted(ledger["payment_id"]) == ["pi_1", "pi_2", "pi_3"]
+    assert dict(zip(ledger["payment_id"], ledger["host_id"])) == {"pi_1": 100, "pi_2": 100, "pi_3": 200}
+    assert (ledger["fee"] + ledger["net"] == ledger["amount"]).all()
+    reasons = dict(zip(exceptions["payment_id"], exceptions["reason"]))
+    assert reasons == {"pi_4": "duplicate_payment", "pi_5": "unmatched_booking"}
+
+def test_host_earnings_totals(frames):
+    """Per-host totals sum gross, fee and net amounts"""
+    ledger, _ = reconcile_payments(*frames, fee_rate=0.1)
+    summary = host_earnings(ledger).set_index("host_id")
+    assert summary.loc[100, "bookings"] == 2
+    assert summary.loc[100, "gross"] == 3000
+    assert summary.loc[100, "platform_fee"] == 300
+    assert summary.loc[100, "net"] == 2700
+    assert summary.loc[200, "gross"] == 1500
+
+def test_run_writes_columnar_output(tmp_path, frames):
+    """The job writes a columnar earnings file that round-trips"""
+    payments, bookings, stations = frames
+    payments.to_csv(tmp_path / "payments.csv", index=False)
+    bookings.to_csv(tmp_path / "bookings.csv", index=False)
+    stations.to_csv(tmp_path / "stations.csv", index=False)
+    written, summary, _ = run(
+        tmp_path / "payments.csv", tmp_path / "bookings.csv", tmp_path / "earnings.npz",
+        stations_path=tmp_path / "stations.csv", fee_rate=0.1
+    )
+    loaded = read_columnar(written)
+    assert list(loaded.columns) == list(summary.columns)
+    assert loaded["net"].sum() == summary["net"].sum()
+
+def test_missing_columns_rejected(frames):
+    """Inputs without the required columns raise a clear error"""
+    payments, bookings, stations = frames
+    with pytest.raises(ValueError):
+        reconcile_payments(payments.drop(columns=["status"]), bookings, stations)
+
+def test_write_columnar_adds_npz_suffix(tmp_path):
+    """Non-parquet outputs are written as .npz archives"""
+    written = write_columnar(pd.DataFrame({"a": [1, 2]}), tmp_path / "out")
+    assert written.endswith(".npz")
+    assert read_columnar(written)["a"].tolist() == [1, 2]
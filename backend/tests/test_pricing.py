@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from services.pricing import PricingEngine, StationArrays, occupancy
+
+def login(client, user):
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user.id)
+        sess['_fresh'] = True
+
+@pytest.fixture
+def host(client, sample_user):
+    login(client, sample_user)
+    return client
+
+def test_occupancy_matches_per_station_loop():
+    """The bincount pass agrees with a naive per-station overlap sum"""
+    rng = np.random.default_rng(3)
+    ids = np.arange(1, 51)
+    station = rng.integers(1, 60, 500)  # some bookings at unknown stations
+    start = rng.integers(0, 20, 500) * 1800.0
+    end = start + 3600.0
+    window = (7200.0, 7200.0 + 4 * 3600)
+    expected = [
+        min(sum(max(0.0, min(e, window[1]) - max(s, window[0])) for st, s, e in zip(station, start, end) if st == sid)
+            / (window[1] - window[0]), 1.0)
+        for sid in ids
+    ]
+    assert np.allclose(occupancy(ids, station, start, end, *window), expected)
+
+def test_price_combines_band_occupancy_and_host_rules():
+    """Peak local hour, half-booked window and host cap all apply in one pass"""
+    engine = PricingEngine(bands=((16, 21, 1.3),), occupancy_weight=0.5, window_hours=4)
+    # 02:00 UTC is 18:00 at lng -120 (UTC-8) and 02:00 at lng 0
+    stations = StationArrays([2, 1, 3], [10, 10, 20], [0, 0, 0], [0.0, -120.0, -120.0], [0.40, 0.40, 0.40])
+    bookings = (np.array([1]), np.array([2 * 3600.0]), np.array([4 * 3600.0]))
+    prices = engine.price(stations, bookings, {20: {"max_price": 0.5}}, 2 * 3600)
+    assert stations.ids.tolist() == [1, 2, 3]
+    assert prices["price"].tolist() == [round(0.40 * 1.3 * 1.25, 3), 0.40, 0.5]
+
+def test_quotes_are_cached_per_bucket_and_key():
+    """A bucket's prices are computed once; a new key recomputes"""
+    engine = PricingEngine(bucket_minutes=15)
+    calls = []
+    def load():
+        calls.append(1)
+        return StationArrays([1], [1], [0], [0], [0.3]), (np.array([]), np.array([]), np.array([])), {}
+    engine.quote("v1", 1000, load)
+    engine.quote("v1", 1000 + 10 * 60, load)
+    engine.quote("v1", 1000 + 20 * 60, load)
+    engine.quote("v2", 1000 + 20 * 60, load)
+    assert len(calls) == 3
+
+def test_quote_endpoint_prices_a_viewport(host):
+    """Quotes cover stations in the bbox and react to bookings and host rules"""
+    inside = host.post('/api/host/stations', json={"name": "A", "lat": 37.77, "lng": -122.42, "address": "a",
+                                                   "price_per_kwh": 0.40}).get_json()
+    host.post('/api/host/stations', json={"name": "B", "lat": 40.0, "lng": -74.0, "address": "b"})
+    url = '/api/pricing/quote?bbox=37,-123,38,-122&at=2025-07-08T10:00:00Z'  # 02:00 local, off-peak
+    quote = host.get(url).get_json()
+    assert quote["bucket_start"] == "2025-07-08T10:00:00+00:00"
+    assert quote["valid_until"] == "2025-07-08T10:15:00+00:00"
+    assert quote["quotes"] == [{"station_id": inside["station_id"], "price_per_kwh": 0.32, "base_price": 0.40,
+                                "occupancy": 0.0, "time_band_multiplier": 0.8}]
+
+    host.post('/api/bookings/', json={"station_id": inside["station_id"], "user_id": 1,
+                                      "start_time": "2025-07-08T10:00:00Z", "end_time": "2025-07-08T12:00:00Z"})
+    assert host.get(url).get_json()["quotes"][0]["price_per_kwh"] == 0.4  # 0.32 * (1 + 0.5 * 0.5)
+
+    assert host.put('/api/host/pricing', json={"max_price": 0.35}).status_code == 200
+    assert host.get(url + '&fields=price_per_kwh').get_json()["quotes"] == [{"price_per_kwh": 0.35}]
+
+def test_quote_and_rule_validation(host):
+    """Region is required; rules must be numeric with min <= max"""
+    assert host.get('/api/pricing/quote').status_code == 400
+    assert host.get('/api/pricing/quote?stations=1&at=nope').status_code == 400
+    assert host.put('/api/host/pricing', json={"multiplier": "x"}).status_code == 400
+    assert host.put('/api/host/pricing', json={"min_price": 0.5, "max_price": 0.4}).status_code == 400
+    assert host.get('/api/host/pricing').get_json()["rule"] == {}
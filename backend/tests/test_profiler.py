@@ -0,0 +1,94 @@
+import json
+import os
+import sys
+import time
+import pytest
+from backend.app import create_app, db
+from models.user import User
+from services.profiler import ProfileTriggers, collapse_stack
+
+ADMIN = {"X-Admin-Token": "admin-secret"}
+
+@pytest.fixture
+def profiled_app(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROFILER_ENABLED", "true")
+    monkeypatch.setenv("PROFILER_SLOW_MS", "100000")
+    monkeypatch.setenv("PROFILER_INTERVAL_MS", "1")
+    monkeypatch.setenv("PROFILER_DIR", str(tmp_path))
+    monkeypatch.setenv("PROFILER_ADMIN_TOKEN", "admin-secret")
+    app = create_app("testing")
+    app.config.update({"TESTING": True, "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'db.sqlite'}"})
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+def wait_for_captures(directory, count, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        captures = [n for n in os.listdir(directory) if n.endswith(".json")]
+        if len(captures) >= count:
+            return sorted(captures)
+        time.sleep(0.01)
+    return sorted(n for n in os.listdir(directory) if n.endswith(".json"))
+
+def test_admin_requires_token(profiled_app):
+    """The profiler admin endpoint is hidden without the admin token"""
+    client = profiled_app.test_client()
+    assert client.get("/api/admin/profiler").status_code == 404
+    for wrong in ("admin-secreT", "admin-secret\u00e9"):
+        assert client.get("/api/admin/profiler", headers={"X-Admin-Token": wrong}).status_code == 404
+    assert client.get("/api/admin/profiler", headers=ADMIN).status_code == 200
+
+def test_armed_route_captures_next_requests(profiled_app, tmp_path):
+    """Arming a route profiles exactly the next N requests to it"""
+    client = profiled_app.test_client()
+    response = client.post("/api/admin/profiler", json={"route": "/api/nearby_stations", "count": 2}, headers=ADMIN)
+    assert response.get_json()["armed"] == {"/api/nearby_stations": 2}
+    for _ in range(3):
+        client.get("/api/nearby_stations?lat=37.7&lng=-122.4")
+    client.get("/api/health")
+    captures = wait_for_captures(tmp_path, 2)
+    time.sleep(0.05)
+    assert len([n for n in os.listdir(tmp_path) if n.endswith(".json")]) == 2
+    with open(tmp_path / captures[0]) as f:
+        capture = json.load(f)
+    assert capture["endpoint"] == "api.nearby_stations"
+    assert capture["targeted"] is True
+    assert os.path.exists(tmp_path / captures[0].replace(".json", ".folded"))
+    status = client.get("/api/admin/profiler", headers=ADMIN).get_json()
+    assert status["armed"] == {}
+
+def test_slow_requests_include_sql_timeline(profiled_app, tmp_path):
+    """Slow requests are captured with their SQL statements"""
+    user = User(email="profiled@example.com", name="Profiled User")
+    db.session.add(user)
+    db.session.commit()
+    user_id = user.id
+    # Force the user loader to hit the database during the request
+    db.session.expunge_all()
+    profiled_app.config["PROFILER_SLOW_MS"] = 0
+    client = profiled_app.test_client()
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user_id)
+        sess["_fresh"] = True
+    assert client.get("/api/profile").status_code == 200
+    captures = wait_for_captures(tmp_path, 1)
+    with open(tmp_path / captures[-1]) as f:
+        capture = json.load(f)
+    assert any(span["type"] == "sql" and "users" in span["name"] for span in capture["timeline"])
+
+def test_collapse_stack_is_root_first():
+    """Collapsed stacks list the outermost frame first"""
+    stack = collapse_stack(sys._getframe())
+    assert stack.split(";")[-1].startswith("test_collapse_stack_is_root_first")
+
+def test_triggers_are_shared_through_file(tmp_path):
+    """A trigger armed by one worker can be claimed by another"""
+    path = str(tmp_path / "triggers")
+    ProfileTriggers(path).arm("/api/dashboard", 1)
+    other = ProfileTriggers(path)
+    assert other.is_armed("/api/dashboard")
+    assert other.claim("/api/dashboard") is True
+    assert other.claim("/api/dashboard") is False
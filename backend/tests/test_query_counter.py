@@ -0,0 +1,80 @@
+import logging
+import pytest
+from backend.app import db
+from models import Car, User
+from services.query_counter import QueryBudgetExceeded, count_queries
+
+# Per-endpoint query budgets: (method, path, max queries, max repeats of one statement)
+ENDPOINT_BUDGETS = [
+    ("GET", "/api/health", 0, 0),
+    ("GET", "/api/nearby_stations?lat=37.7&lng=-122.4", 0, 0),
+    ("GET", "/api/stations/1/availability?date=2025-08-10", 0, 0),
+    ("GET", "/api/stations/1/reviews", 0, 0),
+    ("GET", "/api/profile", 1, 1),
+    ("GET", "/api/dashboard", 1, 1),
+    ("GET", "/api/host/stations", 1, 1),
+    ("GET", "/api/geolocation", 1, 1),
+]
+
+def login(client, user):
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user.id)
+        sess['_fresh'] = True
+
+@pytest.fixture
+def cars_with_owners(app):
+    """Five cars, each owned by a different user"""
+    users = [User(email=f"owner{i}@example.com", name=f"Owner {i}") for i in range(5)]
+    db.session.add_all(users)
+    db.session.commit()
+    db.session.add_all([
+        Car(user_id=u.id, make="Tesla", model="Model 3", year=2022, license_plate=f"EV{i}")
+        for i, u in enumerate(users)
+    ])
+    db.session.commit()
+    db.session.expunge_all()
+
+@pytest.mark.parametrize("method,path,max_queries,max_repeats", ENDPOINT_BUDGETS)
+def test_endpoint_query_budget(client, sample_user, query_budget, method, path, max_queries, max_repeats):
+    """Each endpoint stays within its SQL query budget"""
+    login(client, sample_user)
+    db.session.expunge_all()
+    with query_budget(max_queries=max_queries, max_repeats=max_repeats):
+        response = client.open(path, method=method)
+    assert response.status_code < 500
+
+def test_lazy_relationship_loop_is_flagged(app, cars_with_owners):
+    """Loading Car.user per row trips the repeat budget"""
+    with pytest.raises(QueryBudgetExceeded, match="likely N\\+1"):
+        with count_queries(max_repeats=1):
+            [car.user.name for car in Car.query.all()]
+
+def test_eager_loading_stays_within_budget(app, cars_with_owners):
+    """Eager-loading the relationship keeps the query count flat"""
+    with count_queries(max_queries=1, max_repeats=1) as stats:
+        cars = Car.query.options(db.joinedload(Car.user)).all()
+        [car.user.name for car in cars]
+    assert stats.count == 1
+
+@pytest.mark.fresh_app
+def test_request_n_plus_one_is_logged(app, cars_with_owners, caplog):
+    """Repeated statements inside one request are logged as likely N+1"""
+    app.config["QUERY_REPEAT_THRESHOLD"] = 3
+
+    @app.route("/_test/cars")
+    def list_cars():
+        return {"owners": [car.user.name for car in Car.query.all()]}
+
+    with caplog.at_level(logging.WARNING, logger="services.query_counter"):
+        response = app.test_client().get("/_test/cars")
+    assert response.status_code == 200
+    assert any("Possible N+1" in r.getMessage() for r in caplog.records)
+
+def test_query_headers(app, client, sample_user):
+    """Query count and DB time can be exposed as response headers"""
+    app.config["QUERY_COUNTER_HEADERS"] = True
+    login(client, sample_user)
+    db.session.expunge_all()
+    response = client.get("/api/profile")
+    assert int(response.headers["X-Query-Count"]) >= 1
+    assert response.headers["Server-Timing"].startswith("db;dur=")
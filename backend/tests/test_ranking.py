@@ -0,0 +1,123 @@
+import numpy as np
+import pytest
+
+from backend.app import db
+from models import Car
+from routes import api
+from services.ranking import GridIndex, StationCatalogue, StationRanker, haversine_km, score, top_k
+
+def login(client, user):
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user.id)
+        sess['_fresh'] = True
+
+@pytest.fixture
+def host(client, sample_user):
+    login(client, sample_user)
+    return client
+
+def test_grid_index_finds_every_point_in_radius():
+    """Cells around the circle cover all points within it, and few outside"""
+    rng = np.random.default_rng(7)
+    lat, lng = rng.uniform(37.0, 38.5, 20000), rng.uniform(-123.0, -121.5, 20000)
+    index = GridIndex(lat, lng, cell_deg=0.05)
+    candidates = index.within(37.77, -122.42, 5.0)
+    inside = np.flatnonzero(haversine_km(37.77, -122.42, lat, lng) <= 5.0)
+    assert set(inside) <= set(candidates.tolist())
+    assert len(candidates) < 3 * len(inside)
+    assert len(index.within(0.0, 0.0, 5.0)) == 0
+
+def test_top_k_matches_full_sort():
+    """The partial sort returns the same best k as sorting every score"""
+    rng = np.random.default_rng(1)
+    scores, distance = rng.random(5000), rng.random(5000)
+    assert top_k(scores, 10, distance).tolist() == np.argsort(-scores)[:10].tolist()
+    assert top_k(scores[:3], 10, distance[:3]).tolist() == np.argsort(-scores[:3]).tolist()
+
+def test_score_trades_distance_for_price_and_availability():
+    """A slightly farther, cheaper, free station beats a close, dear, busy one"""
+    weights = {'distance': 0.4, 'price': 0.25, 'rating': 0.2, 'availability': 0.15}
+    scores = score(np.array([1.0, 2.0]), 10.0, np.array([0.6, 0.3]), np.array([np.nan, 4.0]),
+                   np.array([True, True]), np.array([0.9, 0.0]), weights)
+    assert scores[1] > scores[0]
+    assert scores[1] == pytest.approx(0.4 * 0.8 + 0.25 + 0.2 * 0.75 + 0.15)
+
+def test_rank_best_orders_by_score(host):
+    """Ranking mode only returns stations in the radius, best first"""
+    near = host.post('/api/host/stations', json={"name": "Near", "lat": 37.771, "lng": -122.42,
+                                                 "address": "a", "price_per_kwh": 0.60}).get_json()
+    cheap = host.post('/api/host/stations', json={"name": "Cheap", "lat": 37.79, "lng": -122.42,
+                                                  "address": "b", "price_per_kwh": 0.25}).get_json()
+    host.post('/api/host/stations', json={"name": "Far", "lat": 38.5, "lng": -122.42, "address": "c"})
+    host.put(f'/api/host/stations/{near["station_id"]}', json={"available": False})
+
+    data = host.get('/api/nearby_stations?lat=37.77&lng=-122.42&rank=best&radius_km=5').get_json()
+    assert [s["id"] for s in data["stations"]] == [cheap["station_id"], near["station_id"]]
+    assert data["stations"][0]["score"] > data["stations"][1]["score"]
+    assert data["stations"][0]["distance_km"] == pytest.approx(2.22, abs=0.01)
+    assert data["car_id"] is None
+    top = host.get('/api/nearby_stations?lat=37.77&lng=-122.42&rank=best&radius_km=5&k=1&fields=id').get_json()
+    assert top["stations"] == [{"id": cheap["station_id"]}]
+
+def test_older_car_weights_distance_more(host, sample_user):
+    """A short-range car prefers the close station the default weights pass over"""
+    host.post('/api/host/stations', json={"name": "Near", "lat": 37.771, "lng": -122.42,
+                                          "address": "a", "price_per_kwh": 0.45})
+    host.post('/api/host/stations', json={"name": "Cheap", "lat": 37.79, "lng": -122.42,
+                                          "address": "b", "price_per_kwh": 0.25})
+    url = '/api/nearby_stations?lat=37.77&lng=-122.42&rank=best&radius_km=5'
+    assert host.get(url).get_json()["stations"][0]["name"] == "Cheap"
+
+    car = Car(user_id=sample_user.id, make="Nissan", model="Leaf", year=2013, license_plate="EV1")
+    db.session.add(car)
+    db.session.commit()
+    data = host.get(url).get_json()
+    assert data["car_id"] == car.id
+    assert data["stations"][0]["name"] == "Near"
+    assert host.get(url + f'&car_id={car.id + 1}').status_code == 404
+
+def test_rank_parameter_validation(client):
+    """Radius and k are bounded; anonymous ranking works without a car"""
+    base = '/api/nearby_stations?lat=37.77&lng=-122.42&rank=best'
+    assert client.get(base + '&radius_km=0').status_code == 400
+    assert client.get(base + '&k=500').status_code == 400
+    assert client.get(base + '&k=x').status_code == 400
+    assert client.get(base).get_json() == {"stations": [], "car_id": None}
+
+def test_unquoted_stations_are_left_out():
+    """A candidate missing from the price quotes is skipped, not scored with a neighbour's price"""
+    catalogue = StationCatalogue([1, 2, 3], [37.77] * 3, [-122.42, -122.421, -122.422], [True] * 3)
+    quotes = (np.array([1, 3]), np.array([0.3, 0.5]), np.zeros(2))
+    positions, _, price, _ = StationRanker().rank(catalogue, 37.77, -122.42, 5.0, 10, quotes)
+    assert dict(zip(catalogue.ids[positions].tolist(), price.tolist())) == {1: 0.3, 3: 0.5}
+    empty = (np.array([], dtype=np.int64), np.empty(0), np.empty(0))
+    assert len(StationRanker().rank(catalogue, 37.77, -122.42, 5.0, 10, empty)[0]) == 0
+
+def test_stations_without_numeric_coordinates_are_skipped(host):
+    """A station stored with bad coordinates does not break ranking for everyone"""
+    good = host.post('/api/host/stations', json={"name": "Good", "lat": 37.771, "lng": -122.42,
+                                                 "address": "a"}).get_json()
+    api.stations_db.append(dict(good, station_id=good["station_id"] + 1, lat="x"))
+    api.station_feed.record(good["station_id"] + 1, api.stations_db[-1])
+    data = host.get('/api/nearby_stations?lat=37.77&lng=-122.42&rank=best').get_json()
+    assert [s["id"] for s in data["stations"]] == [good["station_id"]]
+
+@pytest.mark.parametrize("coords", ["lat=nan&lng=1", "lat=inf&lng=1", "lat=1&lng=nan", "lat=91&lng=1", "lat=1&lng=-181"])
+def test_non_finite_or_out_of_range_origin_is_rejected(client, coords):
+    """The origin is checked before it reaches the grid index"""
+    assert client.get(f'/api/nearby_stations?rank=best&{coords}').status_code == 400
+    assert client.get(f'/api/nearby_stations?{coords}').status_code == 400
+
+def test_station_deleted_while_ranking_is_skipped(host, monkeypatch):
+    """A station removed after the catalogue was built is left out instead of failing the request"""
+    ids = [host.post('/api/host/stations', json={"name": name, "lat": 37.771, "lng": -122.42,
+                                                 "address": name}).get_json()["station_id"] for name in "ab"]
+    quote = api._quote
+
+    def delete_then_quote(now):
+        api.stations_db[:] = [s for s in api.stations_db if s["station_id"] != ids[0]]
+        return quote(now)
+
+    monkeypatch.setattr(api, "_quote", delete_then_quote)
+    data = host.get('/api/nearby_stations?lat=37.77&lng=-122.42&rank=best').get_json()
+    assert [s["id"] for s in data["stations"]] == [ids[1]]
@@ -0,0 +1,78 @@
+import gzip
+import pytest
+from backend.app.static_assets import IMMUTABLE_CACHE_CONTROL, StaticAssetManifest
+
+BUNDLE = "console.log('evxchange');\n" * 200
+
+@pytest.fixture
+def build_dir(tmp_path):
+    (tmp_path / "static" / "js").mkdir(parents=True)
+    (tmp_path / "index.html").write_text("<html><body>evxchange</body></html>")
+    (tmp_path / "static" / "js" / "main.1a2b3c4d.js").write_text(BUNDLE)
+    return tmp_path
+
+@pytest.fixture
+def manifest_client(app, build_dir):
+    app.extensions["static_assets"] = StaticAssetManifest(build_dir)
+    return app.test_client()
+
+def test_manifest_indexes_build_tree(build_dir):
+    """All build files are loaded once with precomputed gzip variants"""
+    manifest = StaticAssetManifest(build_dir)
+    assert "index.html" in manifest
+    asset = manifest.get("static/js/main.1a2b3c4d.js")
+    assert asset.cache_control == IMMUTABLE_CACHE_CONTROL
+    assert gzip.decompress(asset.encodings["gzip"]).decode() == BUNDLE
+    # Small files are not worth compressing
+    assert manifest.get("index.html").encodings == {}
+
+def test_serves_gzip_with_immutable_cache(manifest_client):
+    """Hashed bundles are sent precompressed and cached forever"""
+    response = manifest_client.get("/static/js/main.1a2b3c4d.js", headers={"Accept-Encoding": "gzip, deflate"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Cache-Control"] == IMMUTABLE_CACHE_CONTROL
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert gzip.decompress(response.data).decode() == BUNDLE
+
+def test_serves_brotli_when_accepted(manifest_client):
+    """Brotli is preferred over gzip for clients that accept both"""
+    brotli = pytest.importorskip("brotli")
+    response = manifest_client.get("/static/js/main.1a2b3c4d.js", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["Content-Encoding"] == "br"
+    assert response.headers["ETag"].endswith('-br"')
+    assert brotli.decompress(response.data).decode() == BUNDLE
+
+def test_prebuilt_brotli_variant_is_served(app, build_dir):
+    """A .br file written by the frontend build is used as is"""
+    (build_dir / "static" / "js" / "main.1a2b3c4d.js.br").write_bytes(b"prebuilt")
+    app.extensions["static_assets"] = StaticAssetManifest(build_dir)
+    response = app.test_client().get("/static/js/main.1a2b3c4d.js", headers={"Accept-Encoding": "br"})
+    assert (response.headers["Content-Encoding"], response.data) == ("br", b"prebuilt")
+
+def test_serves_identity_without_accept_encoding(manifest_client):
+    """Clients that do not accept gzip get the raw bytes"""
+    response = manifest_client.get("/static/js/main.1a2b3c4d.js", headers={"Accept-Encoding": ""})
+    assert "Content-Encoding" not in response.headers
+    assert response.data.decode() == BUNDLE
+
+def test_etag_revalidation(manifest_client):
+    """A matching If-None-Match returns 304 without a body"""
+    first = manifest_client.get("/")
+    assert first.headers["Cache-Control"] == "no-cache"
+    response = manifest_client.get("/", headers={"If-None-Match": first.headers["ETag"]})
+    assert response.status_code == 304
+    assert response.data == b""
+
+def test_unknown_paths_fall_back_to_index(manifest_client):
+    """Client-side routes and traversal attempts get index.html"""
+    for path in ("/dashboard", "/../../etc/passwd"):
+        response = manifest_client.get(path)
+        assert response.status_code == 200
+        assert b"evxchange" in response.data
+
+def test_missing_build_returns_501(app, client):
+    """Without a React build the catch-all route explains how to build it"""
+    app.extensions.pop("static_assets", None)
+    response = client.get("/")
+    assert response.status_code == 501
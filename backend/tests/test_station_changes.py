@@ -0,0 +1,77 @@
+import pytest
+
+from backend.app import db
+from models import Station
+from services.change_feed import ChangeFeed
+
+def login(client, user):
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user.id)
+        sess['_fresh'] = True
+
+@pytest.fixture
+def host(client, sample_user):
+    login(client, sample_user)
+    return client
+
+def create(client, name):
+    return client.post('/api/host/stations', json={"name": name, "lat": 1.0, "lng": 2.0, "address": "x"}).get_json()
+
+def test_delta_contains_only_changes_since_version(host):
+    """Creates, updates and deletes after V come back once each, deletes as tombstones"""
+    a, b = create(host, "A"), create(host, "B")
+    first = host.get('/api/stations/changes').get_json()
+    assert [c["station_id"] for c in first["changes"]] == [a["station_id"], b["station_id"]]
+    assert first["version"] == b["version"] == 2
+
+    host.put(f'/api/host/stations/{a["station_id"]}', json={"name": "A1"})
+    host.put(f'/api/host/stations/{a["station_id"]}', json={"name": "A2"})
+    host.delete(f'/api/host/stations/{b["station_id"]}')
+    delta = host.get(f'/api/stations/changes?since={first["version"]}&epoch={first["epoch"]}').get_json()
+    assert delta["reset"] is False
+    assert [(c["station_id"], c["deleted"]) for c in delta["changes"]] == [(a["station_id"], False), (b["station_id"], True)]
+    assert delta["changes"][0]["station"]["name"] == "A2"
+    assert delta["changes"][0]["station"]["version"] == 4
+    assert delta["changes"][1]["station"] is None
+
+    empty = host.get(f'/api/stations/changes?since={delta["version"]}&epoch={delta["epoch"]}').get_json()
+    assert empty["changes"] == [] and empty["version"] == delta["version"]
+
+def test_paging_and_epoch_reset(host):
+    """limit pages through the log; a stale epoch restarts from version 0"""
+    for name in "ABC":
+        create(host, name)
+    page = host.get('/api/stations/changes?limit=2').get_json()
+    assert len(page["changes"]) == 2 and page["has_more"] is True
+    rest = host.get(f'/api/stations/changes?since={page["version"]}').get_json()
+    assert len(rest["changes"]) == 1 and rest["has_more"] is False
+    stale = host.get('/api/stations/changes?since=3&epoch=old').get_json()
+    assert stale["reset"] is True and len(stale["changes"]) == 3
+    assert host.get('/api/stations/changes?since=x').status_code == 400
+
+def test_compaction_keeps_latest_state_and_tombstones():
+    """Superseded entries are dropped without changing what any client receives"""
+    feed = ChangeFeed(compact_slack=0)
+    for i in range(10):
+        feed.record(1, {"n": i})
+    feed.record(2, {"n": 0})
+    feed.record(2)
+    assert len(feed._entries) <= 2 * 2
+    for since in (0, 5, 11):
+        changes, version, _ = feed.since(since)
+        assert [(c["id"], c["deleted"]) for c in changes] == ([(1, False), (2, True)] if since < 10 else [(2, True)])
+        assert version == 12
+
+def test_station_model_versions_and_tombstones(app, sample_user):
+    """Station rows get increasing versions on insert/update; soft deletes stay visible"""
+    station = Station(user_id=sample_user.id, name="S", address="a", latitude=1, longitude=2, price_per_kwh=0.3)
+    other = Station(user_id=sample_user.id, name="T", address="b", latitude=1, longitude=2, price_per_kwh=0.3)
+    db.session.add_all([station, other])
+    db.session.commit()
+    assert sorted([station.version, other.version]) == [1, 2]
+    station.price_per_kwh = 0.35
+    db.session.commit()
+    assert station.version == 3
+    other.soft_delete()
+    db.session.commit()
+    assert [(s.id, s.deleted_at is not None) for s in Station.changes_since(2)] == [(station.id, False), (other.id, True)]
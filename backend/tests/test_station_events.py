@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from services.station_events import InProcessBroker
+
+def login(client, user):
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user.id)
+        sess['_fresh'] = True
+
+def read_events(response, count):
+    """Parse the next ``count`` events from a streaming response, skipping comments"""
+    events = []
+    for chunk in response.response:
+        chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+        fields = dict(line.split(": ", 1) for line in chunk.strip().splitlines() if not line.startswith(":") and ": " in line)
+        if "event" in fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+            if len(events) == count:
+                return events
+    return events
+
+@pytest.fixture
+def stream_config(app):
+    app.config.update(SSE_HEARTBEAT_SECONDS=0.01, SSE_MAX_STREAM_SECONDS=0.5)
+
+def test_booking_is_pushed_to_station_stream(client, stream_config):
+    """A new booking reaches subscribers of that station only"""
+    stream = client.get('/api/stations/7/availability/stream', buffered=False)
+    assert stream.mimetype == "text/event-stream"
+    for station_id in (8, 7):
+        client.post('/api/bookings/', json={"station_id": station_id, "user_id": 1,
+                                            "start_time": "2025-07-08T10:00:00Z", "end_time": "2025-07-08T11:00:00Z"})
+    [(kind, event)] = read_events(stream, 1)
+    stream.close()
+    assert kind == "booking.created"
+    assert event["station_id"] == 7
+    assert event["data"]["start"] == "2025-07-08T10:00:00+00:00"
+
+def test_viewport_stream_sees_station_changes(client, sample_user, stream_config):
+    """Stations inside the bbox are followed through create, availability change and delete"""
+    login(client, sample_user)
+    stream = client.get('/api/stations/stream?bbox=37,-123,38,-122', buffered=False)
+    inside = client.post('/api/host/stations', json={"name": "SF", "lat": 37.77, "lng": -122.42, "address": "a"}).get_json()
+    client.post('/api/host/stations', json={"name": "LA", "lat": 34.05, "lng": -118.24, "address": "b"})
+    client.put(f'/api/host/stations/{inside["station_id"]}', json={"available": False})
+    client.delete(f'/api/host/stations/{inside["station_id"]}')
+    events = read_events(stream, 3)
+    stream.close()
+    assert [kind for kind, _ in events] == ["station.created", "station.updated", "station.deleted"]
+    assert events[1][1]["data"]["station"]["available"] is False
+
+def test_closed_streams_unsubscribe_without_being_read(app, client):
+    """HEAD requests and streams closed before their first frame leave no subscriber behind"""
+    broker = app.extensions["station_events"]
+    for _ in range(3):
+        client.head('/api/stations/1/availability/stream').close()
+    client.get('/api/stations/1/availability/stream', buffered=False).close()
+    assert not broker._subscribers
+
+def test_stream_requires_a_filter(client):
+    """Stations or bbox is required and validated"""
+    assert client.get('/api/stations/stream').status_code == 400
+    assert client.get('/api/stations/stream?bbox=1,2,3').status_code == 400
+    assert client.get('/api/stations/stream?stations=a').status_code == 400
+
+def test_slow_subscriber_is_dropped_without_blocking():
+    """A full subscriber queue closes that subscriber; others keep receiving"""
+    broker = InProcessBroker(queue_size=2)
+    slow = broker.subscribe(stations=[1])
+    fast = broker.subscribe(stations=[1])
+    for _ in range(3):
+        broker.publish({"type": "booking.created", "station_id": 1})
+        fast.get(timeout=0)
+    assert slow.closed and not fast.closed
+    assert broker.publish({"type": "booking.created", "station_id": 1}) == 1
@@ -0,0 +1,83 @@
+import io
+import json
+
+from services.geocoding import GeocodingService, LocalGeocoder
+from services.station_import import StationImporter, read_rows
+
+def login(client, user):
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user.id)
+        sess['_fresh'] = True
+
+CSV = """name,address,lat,lng,price_per_kwh,available
+Depot 1,1 Fleet Street,37.7749,-122.4194,0.35,true
+Depot 2,2 Fleet St,37.7800,-122.4100,,no
+Depot 1 again,1 fleet st.,37.77491,-122.41941,,
+Broken,,37.1,-122.1,,
+Far,3 Fleet St,95,-122.1,,
+"""
+
+def test_csv_import_validates_and_deduplicates(client, sample_user):
+    """Valid rows are created; bad rows and near-identical stations are reported by line"""
+    login(client, sample_user)
+    response = client.post('/api/host/stations/import', data=CSV, content_type='text/csv')
+    assert response.status_code == 200
+    summary = response.get_json()
+    assert (summary["rows"], summary["created"], summary["duplicates"], summary["failed"]) == (5, 2, 1, 2)
+    assert [(e["line"], e["error"]) for e in summary["errors"]] == [
+        (4, "Duplicate of an existing station"), (5, "Missing address"), (6, "lat must be between -90 and 90")]
+
+    stations = client.get('/api/host/stations').get_json()["stations"]
+    assert [(s["name"], s.get("price_per_kwh"), s["available"]) for s in stations] == [
+        ("Depot 1", 0.35, True), ("Depot 2", None, False)]
+    # Re-uploading the same file creates nothing new
+    again = client.post('/api/host/stations/import', data=CSV, content_type='text/csv').get_json()
+    assert (again["created"], again["duplicates"]) == (0, 3)
+
+def test_ndjson_import_geocodes_in_batches(app, client, sample_user):
+    """Rows without coordinates are geocoded once per batch and inserted batch by batch"""
+    backend = LocalGeocoder()
+    app.extensions["geocoding"] = GeocodingService(backend)
+    app.config["IMPORT_BATCH_SIZE"] = 2
+    login(client, sample_user)
+    lines = [json.dumps({"name": f"S{i}", "address": f"{i} Grid Ave"}) for i in range(5)]
+    body = "\n".join(lines[:2] + ["not json", "[1, 2]"] + lines[2:]) + "\n"
+    summary = client.post('/api/host/stations/import?format=ndjson', data=body,
+                          content_type='application/octet-stream').get_json()
+    assert (summary["created"], summary["failed"]) == (5, 2)
+    assert [e["line"] for e in summary["errors"]] == [3, 4]
+    assert backend.calls == 3
+    changes = client.get('/api/stations/changes?since=0').get_json()
+    assert len(changes["changes"]) == 5
+
+def test_import_limits_and_format(app, client, sample_user):
+    """Unknown formats are rejected; the row cap stops the import but keeps inserted batches"""
+    login(client, sample_user)
+    assert client.post('/api/host/stations/import', data=CSV, content_type='text/plain').status_code == 415
+    summary = client.post('/api/host/stations/import', data=CSV.replace(",37.7800,-122.4100", ",,"),
+                          content_type='text/csv').get_json()
+    assert summary["errors"][0] == {"line": 3, "error": "lat and lng are required"}
+
+    app.config["IMPORT_MAX_ROWS"] = 1
+    app.config["IMPORT_MAX_ERRORS"] = 0
+    summary = client.post('/api/host/stations/import', data=CSV.replace("Fleet", "Harbor"),
+                          content_type='text/csv').get_json()
+    assert (summary["rows"], summary["created"], summary["aborted"]) == (1, 1, True)
+    assert summary["errors"] == [{"line": 3, "error": "Stopped after 1 rows"}]
+
+def test_importer_inserts_while_reading():
+    """Each batch is inserted as soon as it is full, before later rows are read"""
+    stream = io.BytesIO(b"name,address,lat,lng\n" + b"".join(
+        b"S%d,%d Main St,37.0,-122.%d\n" % (i, i, i) for i in range(10)))
+    read = [0]
+
+    def counted(rows):
+        for item in rows:
+            read[0] += 1
+            yield item
+
+    inserted = []
+    importer = StationImporter(lambda batch: inserted.append((len(batch), read[0])), batch_size=4)
+    importer.run(counted(read_rows(stream, "csv")))
+    assert inserted == [(4, 4), (4, 8), (2, 10)]
+    assert not stream.closed
@@ -0,0 +1,81 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.app import db
+from jobs.station_snapshot import build, read_manifest, read_snapshot
+from models import Station
+
+def add_station(user, **overrides):
+    fields = dict(user_id=user.id, name="S", address="1 Long Address Street", latitude=37.774929,
+                  longitude=-122.419416, price_per_kwh=0.31, available=True)
+    fields.update(overrides)
+    station = Station(**fields)
+    db.session.add(station)
+    return station
+
+@pytest.fixture
+def stations(app, sample_user):
+    created = [add_station(sample_user, latitude=37 + i / 100, price_per_kwh=0.3 + i / 100) for i in range(5)]
+    db.session.commit()
+    return created
+
+def test_full_build_round_trips(stations, tmp_path):
+    """Coordinates survive to ~1 m, prices to 0.001, availability and ratings exactly"""
+    reviews = pd.DataFrame({"station_id": [stations[0].id, stations[0].id], "rating": [4, 5]})
+    manifest = build(db.session.connection(), tmp_path, reviews=reviews)
+    version, snapshot = read_snapshot(tmp_path / manifest["file"])
+    assert version == manifest["version"] == max(s.version for s in stations)
+    assert snapshot["id"].tolist() == [s.id for s in stations]
+    assert np.allclose(snapshot["lat"], [s.latitude for s in stations], atol=1e-5)
+    assert np.allclose(snapshot["price_per_kwh"], [s.price_per_kwh for s in stations], atol=1e-3)
+    assert snapshot["rating"].iloc[0] == 4.5 and snapshot["rating"].iloc[1:].isna().all()
+    assert manifest["bytes"] < 5 * 40
+
+def test_incremental_build_matches_full_rebuild(stations, sample_user, tmp_path):
+    """Only changed rows are re-read; updates, soft deletes and inserts are merged in"""
+    conn = db.session.connection()
+    first = build(conn, tmp_path / "inc")
+    assert build(conn, tmp_path / "inc") is None
+
+    stations[1].available = False
+    stations[2].soft_delete()
+    add_station(sample_user, latitude=40.0)
+    db.session.commit()
+    second = build(db.session.connection(), tmp_path / "inc")
+    assert second["version"] > first["version"]
+    full = build(db.session.connection(), tmp_path / "full", full=True)
+
+    _, incremental = read_snapshot(tmp_path / "inc" / second["file"])
+    _, rebuilt = read_snapshot(tmp_path / "full" / full["file"])
+    pd.testing.assert_frame_equal(incremental, rebuilt)
+    assert stations[2].id not in incremental["id"].tolist()
+    assert not incremental.set_index("id").loc[stations[1].id, "available"]
+
+def test_snapshot_served_with_etag(client, app, stations, tmp_path):
+    """The latest snapshot is served with an ETag; revalidation returns 304"""
+    app.config["STATION_SNAPSHOT_DIR"] = str(tmp_path)
+    assert client.get('/api/stations/snapshot').status_code == 404
+    manifest = build(db.session.connection(), tmp_path)
+    response = client.get('/api/stations/snapshot')
+    assert response.status_code == 200
+    assert response.headers["ETag"] == f'"{manifest["etag"]}"'
+    assert response.headers["X-Snapshot-Version"] == str(manifest["version"])
+    assert "public" in response.headers["Cache-Control"]
+    assert len(response.data) == manifest["bytes"]
+    revalidated = client.get('/api/stations/snapshot', headers={"If-None-Match": response.headers["ETag"]})
+    assert revalidated.status_code == 304
+    assert read_manifest(tmp_path)["file"] == manifest["file"]
+
+def test_web_app_does_not_import_pandas():
+    """Serving the snapshot only reads the manifest; pandas stays in the job"""
+    code = "import sys; from backend.app import create_app; create_app('testing'); print('pandas' in sys.modules)"
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([root, os.path.join(root, "backend")]))
+    result = subprocess.run([sys.executable, "-c", code], cwd=os.path.join(root, "backend"), env=env,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
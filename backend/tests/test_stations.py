@@ -73,3 +73,13 @@ def test_delete_station(client):
     get_resp = client.get('/api/host/stations')
     stations = get_resp.get_json()["stations"]
     assert all(s["station_id"] != station_id for s in stations)
+
+@pytest.mark.parametrize("field,value", [("lat", "x"), ("lat", 91), ("lng", -181), ("price_per_kwh", "abc"),
+                                         ("price_per_kwh", -0.1), ("price_per_kwh", "nan")])
+def test_invalid_numbers_are_rejected(client, field, value):
+    """Bad coordinates or prices are 400s and never reach the shared pricing inputs"""
+    payload = {"name": "Numbers", "lat": 37.0, "lng": -122.0, "address": "1 Number St", field: value}
+    assert client.post('/api/host/stations', json=payload).status_code == 400
+    station = client.post('/api/host/stations', json=dict(payload, **{field: 10})).get_json()
+    assert client.put(f'/api/host/stations/{station["station_id"]}', json={field: value}).status_code == 400
+    assert client.get('/api/pricing/quote?stations=%d' % station["station_id"]).status_code == 200
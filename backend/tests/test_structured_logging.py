@@ -0,0 +1,78 @@
+import io
+import json
+import logging
+import queue
+import sys
+
+import pytest
+
+from services.structured_logging import RequestQueueHandler, SamplingFilter, StructuredLogging
+
+CONFIG = {"LOG_FORMAT": "json", "LOG_LEVEL": "INFO", "LOG_SAMPLE_RATE": 1.0,
+          "LOG_SAMPLE_RATES": {}, "LOG_QUEUE_SIZE": 100}
+
+@pytest.fixture
+def pipeline():
+    """Structured logging writing to a buffer; root handlers restored afterwards"""
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    stream = io.StringIO()
+    logs = StructuredLogging()
+    logs.install(CONFIG, stream=stream)
+    yield logs, stream
+    logs.stop()
+    root.handlers[:] = handlers
+    root.setLevel(level)
+
+def records(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+def test_records_are_written_as_json(pipeline):
+    """The listener thread writes one JSON object per record"""
+    logs, stream = pipeline
+    logging.getLogger("routes.api").info("booked %s", 42)
+    logs.stop()
+    [record] = records(stream)
+    assert record["message"] == "booked 42"
+    assert record["level"] == "INFO"
+    assert record["logger"] == "routes.api"
+
+def test_request_context_is_captured(app, pipeline):
+    """Method, path and request id are attached on the request thread"""
+    logs, stream = pipeline
+    with app.test_request_context("/api/bookings/", method="POST", headers={"X-Request-ID": "abc"}):
+        logging.getLogger("routes.api").warning("conflict")
+    logs.stop()
+    [record] = records(stream)
+    assert (record["method"], record["path"], record["request_id"]) == ("POST", "/api/bookings/", "abc")
+
+def test_tracebacks_are_formatted_off_the_request_thread(pipeline):
+    """logger.exception only enqueues; the traceback is rendered by the listener"""
+    logs, stream = pipeline
+    record = logging.LogRecord("routes.api", logging.ERROR, __file__, 1, "Stripe failed", None, None)
+    try:
+        raise RuntimeError("stripe down")
+    except RuntimeError:
+        record.exc_info = sys.exc_info()
+    prepared = logs.handler.prepare(record)
+    assert prepared.exc_text is None
+    logs.handler.handle(record)
+    logs.stop()
+    [line] = records(stream)
+    assert "RuntimeError: stripe down" in line["exc_info"]
+
+def test_full_queue_drops_instead_of_blocking():
+    """A full queue drops records and counts them"""
+    handler = RequestQueueHandler(queue.Queue(maxsize=1))
+    for i in range(3):
+        handler.handle(logging.LogRecord("x", logging.INFO, __file__, 1, f"m{i}", None, None))
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 2
+
+def test_sampling_keeps_warnings_and_samples_info():
+    """INFO is sampled (per-logger overrides win); WARNING and above always pass"""
+    sampler = SamplingFilter(rate=0.0, rates={"routes": 1.0})
+    make = lambda name, level: logging.LogRecord(name, level, __file__, 1, "m", None, None)
+    assert not sampler.filter(make("services.metrics", logging.INFO))
+    assert sampler.filter(make("routes.api", logging.INFO))
+    assert sampler.filter(make("services.metrics", logging.WARNING))
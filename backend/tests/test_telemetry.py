@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+from routes import api
+from services.telemetry import TelemetryStore
+
+TOKEN = "test-telemetry-token"
+
+def login(client, user):
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user.id)
+        sess['_fresh'] = True
+
+@pytest.fixture
+def session(app, client, sample_user):
+    """A logged-in host with one station and one booking on it"""
+    app.config["TELEMETRY_INGEST_TOKEN"] = TOKEN
+    login(client, sample_user)
+    station = client.post('/api/host/stations', json={"name": "A", "lat": 37.7, "lng": -122.4,
+                                                      "address": "a"}).get_json()
+    booking = client.post('/api/bookings/', json={"station_id": station["station_id"], "user_id": 999,
+                                                  "start_time": "2025-07-08T10:00:00Z",
+                                                  "end_time": "2025-07-08T12:00:00Z"}).get_json()
+    return client, booking["booking_id"]
+
+def readings(booking_id, start, n, step=5.0):
+    ts = start + step * np.arange(n)
+    return np.full(n, booking_id), ts, 0.01 * np.arange(n), np.linspace(10, 20, n)
+
+def test_rollups_match_naive_grouping():
+    """Split batches merge into the same buckets as one pass over all readings"""
+    store = TelemetryStore()
+    booking, ts, kwh, kw = readings(1, 1_751_968_800.0, 2000)
+    for part in np.array_split(np.arange(2000), 7):
+        store.append(booking[part], ts[part], kwh[part], kw[part])
+    series = store.series(1, "1m")
+    assert len(series) == 2000 * 5 // 60 + 1
+    start, count, energy, avg_kw, max_kw = series[3]
+    in_bucket = (ts // 60) * 60 == start
+    assert count == in_bucket.sum()
+    assert energy == pytest.approx(kwh[in_bucket].max() - kwh[ts < start].max())
+    assert avg_kw == pytest.approx(kw[in_bucket].astype(np.float32).mean(), rel=1e-6)
+    assert sum(point[1] for point in store.series(1, "1h")) == 2000
+    assert store.series(2, "1m") == []
+
+def test_energy_totals_agree_across_resolutions():
+    """Increments between buckets are counted, so minute and hour totals match the meter"""
+    store = TelemetryStore()
+    booking, ts, kwh, kw = readings(1, 1_751_968_800.0, 120)
+    store.append(booking, ts, kwh, kw)
+    minute_total = sum(point[2] for point in store.series(1, "1m"))
+    hour_total = sum(point[2] for point in store.series(1, "1h"))
+    assert minute_total == pytest.approx(hour_total) == pytest.approx(kwh[-1] - kwh[0])
+
+def test_column_files_are_replayed_on_startup(tmp_path):
+    """A new store rebuilds rollups from disk and drops a torn trailing row"""
+    store = TelemetryStore(str(tmp_path))
+    store.append(*readings(3, 1_751_968_800.0, 100))
+    (worker,) = tmp_path.iterdir()
+    with open(worker / "kw.f4", "ab") as f:
+        f.write(np.float32(5).tobytes())  # crashed mid-batch: only one column got the row
+    replayed = TelemetryStore(str(tmp_path))
+    assert replayed.readings == 100
+    assert replayed.series(3, "1m") == store.series(3, "1m")
+
+def test_ingest_and_chart_a_session(session):
+    """Valid rows are stored, bad rows counted; the session owner's host sees rollups"""
+    client, booking_id = session
+    booking, ts, kwh, kw = readings(booking_id, 1_751_968_800.0, 24)
+    rows = np.column_stack([booking, ts, kwh, kw]).tolist()
+    rows += [[booking_id + 1, ts[0], 0, 0], [booking_id, ts[0], -1, 0]]
+    response = client.post('/api/telemetry', json={"readings": rows}, headers={"X-Telemetry-Token": TOKEN})
+    assert response.status_code == 202
+    assert response.get_json() == {"accepted": 24, "rejected": 2}
+
+    points = client.get(f'/api/bookings/{booking_id}/telemetry').get_json()["points"]
+    assert [p["readings"] for p in points] == [12, 12]
+    assert points[0] == {"start": "2025-07-08T10:00:00+00:00", "readings": 12, "energy_kwh": 0.11,
+                         "avg_kw": pytest.approx(12.391, abs=1e-3), "max_kw": pytest.approx(14.783, abs=1e-3)}
+    hourly = client.get(f'/api/bookings/{booking_id}/telemetry?resolution=1h&fields=energy_kwh').get_json()
+    assert hourly["points"] == [{"energy_kwh": 0.23}]
+
+def test_ingest_requires_token_and_limits_batches(app, session):
+    """Ingestion is hidden without the token; oversized or malformed batches are refused"""
+    client, booking_id = session
+    row = [[booking_id, 1_751_968_800.0, 0.0, 7.0]]
+    assert client.post('/api/telemetry', json={"readings": row}).status_code == 404
+    for wrong in (TOKEN.upper(), TOKEN + "\u00e9"):
+        assert client.post('/api/telemetry', json={"readings": row}, headers={"X-Telemetry-Token": wrong}).status_code == 404
+    headers = {"X-Telemetry-Token": TOKEN}
+    assert client.post('/api/telemetry', json={"readings": [[1, 2]]}, headers=headers).status_code == 400
+    app.config["TELEMETRY_MAX_BATCH"] = 1
+    assert client.post('/api/telemetry', json={"readings": row * 2}, headers=headers).status_code == 413
+    assert client.get(f'/api/bookings/{booking_id}/telemetry?resolution=5m').status_code == 400
+    assert client.get('/api/bookings/99/telemetry').status_code == 404
+
+def test_millisecond_timestamps_are_rejected(session):
+    """ts in milliseconds would spill the bucket into the booking bits of the rollup key"""
+    client, booking_id = session
+    booking, ts, kwh, kw = readings(booking_id, 1_751_968_800_000.0, 12, step=5000.0)
+    rows = np.column_stack([booking, ts, kwh, kw]).tolist()
+    response = client.post('/api/telemetry', json={"readings": rows}, headers={"X-Telemetry-Token": TOKEN})
+    assert response.get_json() == {"accepted": 0, "rejected": 12}
+    assert all(not table.bookings for table in api.telemetry_store.rollups.values())
+
+def test_replay_skips_out_of_range_timestamps(tmp_path):
+    """Files written before the ts bound do not leak readings into other bookings"""
+    store = TelemetryStore(str(tmp_path))
+    store.append(*readings(1, 1_751_968_800_000.0, 10, step=5000.0))
+    store.append(*readings(2, 1_751_968_800.0, 10))
+    replayed = TelemetryStore(str(tmp_path))
+    assert set(replayed.rollups["1m"].bookings) == {2}
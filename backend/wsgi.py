@@ -6,4 +6,5 @@ if db_url and db_url.startswith("postgres://"):
     os.environ["DATABASE_URL"] = db_url.replace("postgres://", "postgresql://", 1)
 
 from backend.app import create_app
-app = create_app()
+# The WSGI entry point serves production unless FLASK_ENV says otherwise (pool profile, see database.py)
+app = create_app(os.getenv("FLASK_ENV", "production"))